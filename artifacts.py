@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+
+# Artifacts ship next to the code, so resolve them from here rather than the CWD
+ARTIFACT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODEL_FILE = 'neural_net_model.h5'
+ENCODERS_FILE = 'label_encoders.bin'
+SCALER_FILE = 'standard_scaler.bin'
+NUMPY_MODEL_FILE = 'neural_net_model.npz'
+FUSED_MODEL_FILE = 'neural_net_model_fused.npz'
+INT8_MODEL_FILE = 'neural_net_model_int8.tflite'
+
+# Inference backends accepted by predictor() / predict_package_suspects(backend=)
+BACKENDS = ('keras', 'numpy', 'numpy-float16', 'fused', 'int8')
+
+class ArtifactRegistry:
+    """
+    Loads the model, label encoders and scaler on first use and caches them
+    for the life of the process. Load times are recorded in `timings`
+    (seconds per step) so cold-start latency can be tracked.
+    """
+
+    def __init__(self, base_dir=ARTIFACT_DIR, model_file=MODEL_FILE,
+                 encoders_file=ENCODERS_FILE, scaler_file=SCALER_FILE,
+                 numpy_model_file=NUMPY_MODEL_FILE, fused_model_file=FUSED_MODEL_FILE,
+                 int8_model_file=INT8_MODEL_FILE, unseen_code=0):
+        self.base_dir = base_dir
+        self.model_file = model_file
+        self.numpy_model_file = numpy_model_file
+        self.fused_model_file = fused_model_file
+        self.int8_model_file = int8_model_file
+        self.encoders_file = encoders_file
+        self.scaler_file = scaler_file
+        # Code for categorical values the encoders never saw (None raises)
+        self.unseen_code = unseen_code
+        self.timings = {}
+        self._cache = {}
+        self._lock = threading.RLock()
+        self._warm_thread = None
+
+    def path(self, filename):
+        return os.path.join(self.base_dir, filename)
+
+    def _get(self, key, loader):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._cache:
+                start = time.perf_counter()
+                self._cache[key] = loader()
+                self.timings[key] = time.perf_counter() - start
+            return self._cache[key]
+
+    def _load_keras(self):
+        from tensorflow import keras
+        return keras
+
+    def _load_model(self):
+        keras = self._cache['tensorflow_import']
+        return keras.models.load_model(self.path(self.model_file), compile=False)
+
+    def _model_source(self):
+        # What an exported graph must have been built from to be current; a
+        # bundle shipped without its .h5 serves whatever graph it has
+        from disk_cache import file_digest
+        h5_path = self.path(self.model_file)
+        return {'model': file_digest(h5_path)} if os.path.exists(h5_path) else None
+
+    def _current_npz(self):
+        # The .npz export of the model, (re-)exported if missing or built from another .h5
+        import numpy_backend
+        npz_path = self.path(self.numpy_model_file)
+        source = self._model_source()
+        if not os.path.exists(npz_path) or (source and numpy_backend.export_source(npz_path) != source):
+            numpy_backend.export_npz(self.path(self.model_file), npz_path)
+        return npz_path
+
+    def _load_numpy_model(self, dtype):
+        import numpy_backend
+        return numpy_backend.NumpyModel.load(self._current_npz(), dtype=dtype)
+
+    def _load_fused_model(self):
+        import numpy_backend
+        fused_path = self.path(self.fused_model_file)
+        source = self._model_source()
+        if source:
+            source['scaler'] = numpy_backend.scaler_digest(self.scaler)
+        if not os.path.exists(fused_path) or (source and numpy_backend.export_source(fused_path) != source):
+            numpy_backend.fuse_scaler(self._current_npz(), self.scaler, fused_path)
+        return numpy_backend.NumpyModel.load(fused_path)
+
+    def _load_int8_model(self):
+        import quantized_backend
+        tflite_path = self.path(self.int8_model_file)
+        if not os.path.exists(tflite_path):
+            # Calibration needs real exports, so this one can't be built on demand
+            raise FileNotFoundError(f"{tflite_path} not found; export it with "
+                                    f"`python quantized_backend.py <representative exports>`")
+        return quantized_backend.Int8Model(tflite_path)
+
+    def _load_joblib(self, filename):
+        from joblib import load
+        return load(self.path(filename))
+
+    @property
+    def model(self):
+        # Timed separately so the TensorFlow import and deserialization show up
+        # as their own entries in timings
+        self._get('tensorflow_import', self._load_keras)
+        return self._get('model', self._load_model)
+
+    @property
+    def label_encoders(self):
+        return self._get('label_encoders', lambda: self._load_joblib(self.encoders_file))
+
+    @property
+    def encoders(self):
+        # label_encoders compiled to vectorized lookups (see encoders.py)
+        # Loaded first so startup timings don't count the load twice
+        label_encoders = self.label_encoders
+
+        def compile():
+            from encoders import compile_encoders
+            return compile_encoders(label_encoders, self.unseen_code)
+        return self._get('encoders', compile)
+
+    @property
+    def scaler(self):
+        return self._get('scaler', lambda: self._load_joblib(self.scaler_file))
+
+    def predictor(self, backend='keras'):
+        """
+        Return an object with a keras-style predict(inputs, batch_size, verbose)
+        for the named backend. Objects that already have predict are passed through.
+        """
+        if not isinstance(backend, str):
+            return backend
+        if backend == 'keras':
+            return self.model
+        if backend == 'numpy':
+            return self._get('numpy_model', lambda: self._load_numpy_model('float32'))
+        if backend == 'numpy-float16':
+            return self._get('numpy_model_float16', lambda: self._load_numpy_model('float16'))
+        if backend == 'fused':
+            return self._get('fused_model', self._load_fused_model)
+        if backend == 'int8':
+            return self._get('int8_model', self._load_int8_model)
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+    def predictor_loaded(self, backend='keras'):
+        # Whether predictor(backend) would return without loading anything
+        keys = {'keras': 'model', 'numpy': 'numpy_model', 'numpy-float16': 'numpy_model_float16',
+                'fused': 'fused_model', 'int8': 'int8_model'}
+        return not isinstance(backend, str) or self.is_loaded(keys.get(backend))
+
+    def backend_file(self, backend='keras'):
+        # The artifact a backend's predictor is loaded from
+        files = {'keras': self.model_file, 'numpy': self.numpy_model_file,
+                 'numpy-float16': self.numpy_model_file, 'fused': self.fused_model_file,
+                 'int8': self.int8_model_file}
+        if backend not in files:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+        return files[backend]
+
+    @property
+    def categorical_cols(self):
+        return list(self.label_encoders.keys())
+
+    def is_loaded(self, key):
+        return key in self._cache
+
+    def warm(self):
+        # Load everything now; returns the timings for convenience
+        self.encoders
+        self.scaler
+        self.model
+        return self.startup_timings()
+
+    def warm_async(self, on_ready=None):
+        """
+        Warm the registry on a daemon thread. on_ready, if given, is called on
+        that thread with the timings dict once everything is loaded.
+        """
+        def run():
+            timings = self.warm()
+            if on_ready is not None:
+                on_ready(timings)
+
+        with self._lock:
+            if self._warm_thread is None:
+                self._warm_thread = threading.Thread(target=run, name='artifact-warmup', daemon=True)
+                self._warm_thread.start()
+        return self._warm_thread
+
+    def startup_timings(self):
+        timings = dict(self.timings)
+        timings['total'] = sum(timings.values())
+        return timings
+
+# Per-process registry shared by model.py and the GUI
+registry = ArtifactRegistry()
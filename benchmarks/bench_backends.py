@@ -0,0 +1,90 @@
+"""
+Parity, throughput and footprint of the inference backends on the same scaled
+feature matrix (raw features for the fused artifact, which scales them
+itself). Backends whose artifact isn't there (the int8 .tflite until
+quantized_backend.py has exported one) are skipped.
+
+    python -m benchmarks.bench_backends --rows 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, BACKENDS, registry
+from benchmarks.bench_features import best_of, random_cartons
+from features import engineer_frame_features, numerical_cols
+
+# Run in a fresh interpreter: import the backend, score a small batch, then
+# report elapsed time and peak RSS. VmHWM is used rather than ru_maxrss, which
+# Linux carries over from the parent across fork/exec.
+COLD_START = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import numpy as np
+from artifacts import registry
+predictor = registry.predictor({backend!r})
+inputs = {{col: np.zeros((512, 1), dtype=np.int32) for col in registry.categorical_cols}}
+inputs['numerical_input'] = np.zeros((512, {features}), dtype=np.float32)
+predictor.predict(inputs, batch_size=512, verbose=0)
+seconds = time.perf_counter() - start
+with open('/proc/self/status') as status:
+    hwm_kb = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+print(json.dumps({{'seconds': seconds, 'rss_mb': hwm_kb / 1024}}))
+"""
+
+def cold_start(backend):
+    code = COLD_START.format(root=ARTIFACT_DIR, backend=backend, features=len(numerical_cols))
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    backends = []
+    for backend in args.backends:
+        if os.path.exists(registry.path(registry.backend_file(backend))):
+            backends.append(backend)
+        else:
+            print(f"{backend:>14}  skipped: {registry.backend_file(backend)} not found")
+
+    # Code 0 of every categorical: the network's full input signature, from the artifacts
+    features = engineer_frame_features(random_cartons(args.rows))
+    inputs = {col: np.zeros((args.rows, 1), dtype=np.int32) for col in registry.categorical_cols}
+    inputs['numerical_input'] = registry.scaler.transform(features)
+    # Fused artifacts scale in their first layer, so they are fed the raw features
+    raw_inputs = dict(inputs, numerical_input=features)
+
+    reference = None
+    if 'keras' in backends:
+        reference = registry.predictor('keras').predict(inputs, batch_size=args.batch_size, verbose=0)
+
+    for backend in backends:
+        predictor = registry.predictor(backend)
+        backend_inputs = raw_inputs if getattr(predictor, 'fused_scaler', None) else inputs
+        preds = predictor.predict(backend_inputs, batch_size=args.batch_size, verbose=0)
+        seconds = best_of(lambda: predictor.predict(backend_inputs, batch_size=args.batch_size, verbose=0),
+                          args.repeat)
+        stats = cold_start(backend)
+        line = (f"{backend:>14}  {args.rows / seconds:>12,.0f} rows/s  "
+                f"cold start {stats['seconds']:6.2f}s  peak RSS {stats['rss_mb']:7.1f} MB")
+        if reference is not None and backend != 'keras':
+            diff = float(np.abs(preds.astype(np.float64) - reference).max())
+            line += f"  max |diff| vs keras {diff:.2e}"
+            if backend == 'numpy' and diff > args.tolerance:
+                raise SystemExit(f"numpy backend differs from keras by {diff} > {args.tolerance}")
+        print(line)
+
+if __name__ == "__main__":
+    main()
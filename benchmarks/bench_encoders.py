@@ -0,0 +1,58 @@
+"""
+Parity and throughput of the compiled categorical encoders in encoders.py
+against LabelEncoder.transform(values.astype(str)). label_encoders.bin
+currently holds no columns, so a synthetic encoder is fitted here.
+
+    python -m benchmarks.bench_encoders --rows 1000000 --categories 40
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from benchmarks.bench_features import best_of
+from encoders import CompiledEncoder
+
+def random_column(rows, categories, seed=0, unseen=0.0):
+    rng = np.random.default_rng(seed)
+    labels = np.array([f"PKG_{i:03d}" for i in range(categories)] + ['NEW_TYPE'], dtype=object)
+    picks = rng.integers(0, categories, rows)
+    picks[rng.random(rows) < unseen] = categories
+    return pd.Series(labels[picks])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fitted = LabelEncoder().fit(random_column(10_000, args.categories).astype(str))
+    compiled = CompiledEncoder.from_label_encoder(fitted, unseen_code=0)
+
+    check = pd.concat([random_column(50_000, args.categories, seed=1), pd.Series([np.nan, 7, 'PKG_001'])],
+                      ignore_index=True)
+    known = check.astype(str).isin(fitted.classes_).to_numpy()
+    expected = fitted.transform(check[known].astype(str))
+    np.testing.assert_array_equal(compiled.transform(check)[0][known], expected)
+    print(f"parity: {known.sum()} known values encode identically")
+
+    column = random_column(1_000, args.categories, unseen=0.01)
+    codes, unseen = compiled.transform(column)
+    print(f"unseen: {unseen} of {len(column)} rows mapped to code 0 "
+          f"(LabelEncoder raises); codes span {codes.min()}..{codes.max()}")
+
+    for rows in args.rows:
+        column = random_column(rows, args.categories, seed=2)
+        sklearn = best_of(lambda: fitted.transform(column.astype(str)), args.repeat)
+        vectorized = best_of(lambda: compiled.transform(column), args.repeat)
+        # As read by model.py, which parses categorical columns to category dtype
+        categories = column.astype('category')
+        from_category = best_of(lambda: compiled.transform(categories), args.repeat)
+        print(f"{rows:>12,} rows  LabelEncoder {rows / sklearn:>14,.0f} rows/s  "
+              f"compiled {rows / vectorized:>14,.0f} rows/s ({sklearn / vectorized:4.1f}x)  "
+              f"from category dtype {rows / from_category:>14,.0f} rows/s ({sklearn / from_category:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Scoring a synthetic export with N models: N separate runs (each reading,
+validating and engineering the file itself) against one ensemble pass that
+shares those stages, with parity between the two. Every member uses the
+production bundle, so the difference is the shared work alone.
+
+    python -m benchmarks.bench_ensemble --rows 1000000 --models 3 --backend fused
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from artifacts import BACKENDS, registry
+from benchmarks.synthetic import write_synthetic
+from ensemble import Ensemble, EnsembleMember, predict_ensemble_suspects
+
+def timed(fn):
+    # The scoring functions print progress; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--models", type=int, default=3)
+    parser.add_argument("--backend", choices=BACKENDS, default="fused")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    members = [EnsembleMember(f"m{i}", registry, args.backend) for i in range(args.models)]
+    ensemble = Ensemble(members)
+    singles = [Ensemble([member]) for member in members]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic(os.path.join(tmp, 'cartons.csv'), args.rows)
+        run = lambda models: predict_ensemble_suspects(path, models, 0.5, args.batch_size)
+
+        timed(lambda: run(singles[0]))  # load artifacts and trace the model
+        separate, separate_seconds = timed(lambda: [run(single) for single in singles])
+        shared, shared_seconds = timed(lambda: run(ensemble))
+
+    diff = max(float(np.abs(shared[f'Probability_{member.name}'].to_numpy() - result['Probability']).max())
+               for member, result in zip(members, separate))
+    print(f"parity vs separate runs: max |diff| {diff:.2e}")
+    for label, seconds in [(f'{args.models} separate', separate_seconds), ('one pass', shared_seconds)]:
+        print(f"{label:<12} {seconds:8.3f}s  {args.rows * args.models / seconds:>12,.0f} row-models/s  "
+              f"{separate_seconds / seconds:5.2f}x")
+
+if __name__ == "__main__":
+    main()
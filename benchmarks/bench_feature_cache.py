@@ -0,0 +1,55 @@
+"""
+Re-scoring a synthetic export with and without the feature cache: a plain
+predict_package_suspects run, the first cached run (builds the entry) and a
+warm run that maps the stored matrix, with parity against the plain run.
+
+    python -m benchmarks.bench_feature_cache --rows 1000000 --backend fused
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from artifacts import BACKENDS
+from benchmarks.synthetic import write_synthetic
+from feature_cache import FeatureCache
+from model import predict_package_suspects
+
+def timed(fn):
+    # The scoring functions print progress; keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--backend", choices=BACKENDS, default="fused")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic(os.path.join(tmp, 'cartons.csv'), args.rows)
+        cache = FeatureCache(os.path.join(tmp, 'features'))
+        run = lambda **kwargs: predict_package_suspects(path, 0.5, args.batch_size, args.backend, **kwargs)
+
+        timed(lambda: run())  # load artifacts and trace the model
+        plain, plain_seconds = timed(lambda: run())
+        _, cold_seconds = timed(lambda: run(features=cache))
+        warm, warm_seconds = timed(lambda: run(features=cache))
+        entry_mb = sum(os.path.getsize(os.path.join(cache.cache_dir, name))
+                       for name in os.listdir(cache.cache_dir)) / 1024 ** 2
+
+    diff = float(np.abs(warm['Probability'].to_numpy(np.float64) - plain['Probability']).max())
+    print(f"parity vs plain run: max |diff| {diff:.2e}")
+    for label, seconds in [('plain', plain_seconds), ('cache build', cold_seconds), ('cache hit', warm_seconds)]:
+        print(f"{label:<12} {seconds:8.3f}s  {args.rows / seconds:>12,.0f} rows/s  {plain_seconds / seconds:5.2f}x")
+    print(f"entry size   {entry_mb:,.1f} MB")
+
+if __name__ == "__main__":
+    main()
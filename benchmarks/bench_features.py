@@ -0,0 +1,146 @@
+"""
+Parity check and throughput benchmark for the NumPy feature kernel in
+features.py against the original per-column pandas pipeline.
+
+    python -m benchmarks.bench_features --rows 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import engineer_feature_matrix, numerical_cols
+
+def reference_features(df):
+    # The per-column pandas pipeline that predict_package_suspects used
+    # before features.py; kept verbatim as the parity baseline
+    df = df.copy()
+    #Volume
+    df['Volume'] = df['Length']*df['Width']*df['Height']
+    #Weight/Volume Ratio
+    df['weight_to_volume'] = df['Weight']/df['Volume']
+    #Dimension Ratios
+    df['length_to_width'] = df['Length']/df['Width']
+    df['length_to_height'] = df['Length']/df['Height']
+    df['width_to_height'] = df['Width']/df['Height']
+
+    df['length_squared'] = df['Length']**2
+    df['width_squared'] = df['Width']**2
+    df['height_squared'] = df['Height']**2
+
+
+    df['dimension_std'] = df[['Length', 'Width', 'Height']].std(axis=1)
+
+    df['base_area_to_height'] = (df['Length']*df['Width'])/df['Height']
+
+    df['log_weight'] = np.log(df['Weight']+1)
+
+    df['cubed_length'] = df['Length']**3
+    df['cubed_width'] = df['Width']**3
+    df['cubed_height'] = df['Height']**3
+
+    df['cube_root_volume'] = df['Volume']**(1/3)
+
+    df['square_root_volume'] = df['Volume']**(1/2)
+
+    df['weight*volume'] = df['Weight']*df['Volume']
+
+    df['weight*length'] = df['Weight']*df['Length']
+
+    df['length/(width+height)'] = df['Length'] / (df['Width'] + df['Height'])
+    df['width/(length+height)'] = df['Width'] / (df['Length'] + df['Height'])
+    df['height/(length+width)'] = df['Height'] / (df['Length'] + df['Width'])
+
+    df['weight/volume'] = df['Weight']/df['Volume']
+
+    df['weight**2/volume'] = (df['Weight']**2)/df['Volume']
+
+    # Surface Area
+    df['Surface_Area'] = 2 * (
+        df['Length'] * df['Width'] +
+        df['Length'] * df['Height'] +
+        df['Width'] * df['Height']
+    )
+
+    # Diagonal Length
+    df['Diagonal'] = np.sqrt(
+        df['Length']**2 + df['Width']**2 + df['Height']**2
+    )
+
+    # Dimension Comparison Features
+
+    # Max, Min, and Range of Dimensions
+    df['max_dimension'] = df[['Length', 'Width', 'Height']].max(axis=1)
+    df['min_dimension'] = df[['Length', 'Width', 'Height']].min(axis=1)
+    df['dimension_range'] = df['max_dimension'] - df['min_dimension']
+
+    # Fractions of Dimensions
+    df['total_dimension'] = df['Length'] + df['Width'] + df['Height']
+    df['length_fraction'] = df['Length'] / df['total_dimension']
+    df['width_fraction'] = df['Width'] / df['total_dimension']
+    df['height_fraction'] = df['Height'] / df['total_dimension']
+    # Composite & Interaction Features
+    df['weight_times_total_dimension'] = df['Weight'] * df['total_dimension']
+
+    # Differences Between Dimensions
+    df['diff_length_width'] = abs(df['Length'] - df['Width'])
+    df['diff_length_height'] = abs(df['Length'] - df['Height'])
+    df['diff_width_height'] = abs(df['Width'] - df['Height'])
+    # Efficiency Metrics
+    df['SA_to_Volume'] = df['Surface_Area'] / (df['Volume'] + 1e-8)  # add epsilon to avoid division by 0
+
+    # Log transformations of composite features
+    df['log_Surface_Area'] = np.log(df['Surface_Area']+1)
+
+    df['log_SA_to_Volume'] = np.log(df['SA_to_Volume']+1)
+    return df[numerical_cols].values
+
+def random_cartons(rows, seed=0):
+    # Dimensions in mm and weight in g, roughly matching standard_scaler.bin
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Length': np.clip(rng.normal(316, 83, rows), 60, 900).round(0),
+        'Width': np.clip(rng.normal(213, 61, rows), 50, 700).round(0),
+        'Height': np.clip(rng.normal(207, 70, rows), 30, 700).round(0),
+        'Weight': np.clip(rng.normal(4858, 4460, rows), 100, 40000).round(1),
+    })
+
+def check_parity(rows=100_000, rtol=1e-6):
+    df = random_cartons(rows, seed=1)
+    expected = reference_features(df).astype(np.float32)
+    actual = engineer_feature_matrix(df['Length'], df['Width'], df['Height'], df['Weight'])
+    for i, name in enumerate(numerical_cols):
+        np.testing.assert_allclose(actual[:, i], expected[:, i], rtol=rtol, atol=0, err_msg=name)
+    print(f"parity: {rows} rows, {len(numerical_cols)} features within rtol={rtol}")
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-reference", action="store_true",
+                        help="Only time the kernel (the pandas path needs several GB at 10M rows)")
+    args = parser.parse_args()
+
+    check_parity()
+    for rows in args.rows:
+        df = random_cartons(rows)
+        out = np.empty((rows, len(numerical_cols)), dtype=np.float32, order='F')
+        kernel = best_of(lambda: engineer_feature_matrix(
+            df['Length'], df['Width'], df['Height'], df['Weight'], out=out), args.repeat)
+        line = f"{rows:>10} rows  kernel {rows / kernel:>14,.0f} rows/s"
+        if not args.skip_reference:
+            reference = best_of(lambda: reference_features(df), args.repeat)
+            line += f"  pandas {rows / reference:>14,.0f} rows/s  speedup {reference / kernel:.1f}x"
+        print(line)
+
+if __name__ == "__main__":
+    main()
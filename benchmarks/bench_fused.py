@@ -0,0 +1,72 @@
+"""
+Parity and per-row savings of the fused artifact (StandardScaler folded into
+the first Dense layer, see numpy_backend.fuse_scaler) against the two-stage
+scaler.transform + network path.
+
+    python -m benchmarks.bench_fused --rows 1000000
+"""
+import argparse
+
+import numpy as np
+
+from artifacts import registry
+from benchmarks.bench_features import best_of, random_cartons
+from features import engineer_frame_features
+
+def check_fused_parity(rows=2_000, batch_size=512, tolerance=1e-5, keras=True, features=None):
+    """
+    Compare the fused artifact against scaler.transform + network (the numpy
+    backend, and keras unless keras=False) on random cartons; raises
+    AssertionError when they differ by more than tolerance.
+    """
+    if features is None:
+        features = engineer_frame_features(random_cartons(rows, seed=1))
+    scaler = registry.scaler
+    preds = registry.predictor('fused').predict({'numerical_input': features}, batch_size=batch_size)
+    scaled = {'numerical_input': scaler.transform(features)}
+    references = {'numpy': registry.predictor('numpy').predict(scaled, batch_size=batch_size)}
+    if keras:
+        references['keras'] = registry.predictor('keras').predict(scaled, batch_size=batch_size, verbose=0)
+    for name, reference in references.items():
+        diff = float(np.abs(preds.astype(np.float64) - reference).max())
+        print(f"fused parity vs {name} two-stage: {len(features)} rows, max |diff| {diff:.2e}")
+        if diff > tolerance:
+            raise AssertionError(f"fused artifact differs from the {name} two-stage path by {diff} > {tolerance}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    parser.add_argument("--skip-keras", action="store_true", help="Compare against the numpy backend only")
+    args = parser.parse_args()
+
+    features = engineer_frame_features(random_cartons(args.rows))
+    scaler = registry.scaler
+    numpy_model = registry.predictor('numpy')
+    fused_model = registry.predictor('fused')
+
+    def two_stage():
+        return numpy_model.predict({'numerical_input': scaler.transform(features)}, batch_size=args.batch_size)
+
+    def fused():
+        return fused_model.predict({'numerical_input': features}, batch_size=args.batch_size)
+
+    try:
+        check_fused_parity(batch_size=args.batch_size, tolerance=args.tolerance, keras=not args.skip_keras,
+                           features=features)
+    except AssertionError as e:
+        raise SystemExit(str(e))
+
+    scale_only = best_of(lambda: scaler.transform(features), args.repeat)
+    staged = best_of(two_stage, args.repeat)
+    folded = best_of(fused, args.repeat)
+    print(f"scaler.transform alone  {scale_only / args.rows * 1e9:8.1f} ns/row "
+          f"(plus a {features.shape[1] * features.itemsize} B/row copy)")
+    print(f"two-stage               {staged / args.rows * 1e9:8.1f} ns/row  {args.rows / staged:>12,.0f} rows/s")
+    print(f"fused                   {folded / args.rows * 1e9:8.1f} ns/row  {args.rows / folded:>12,.0f} rows/s  "
+          f"saves {(staged - folded) / args.rows * 1e9:.1f} ns/row ({staged / folded:.2f}x)")
+
+if __name__ == "__main__":
+    main()
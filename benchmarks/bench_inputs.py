@@ -0,0 +1,83 @@
+"""
+Parse time and peak memory of reading a wide export: the old full
+pd.read_csv against the projected readers in readers.py for CSV, Parquet
+and Arrow IPC. Each read runs in a fresh interpreter so peak RSS is its own.
+
+    python -m benchmarks.bench_inputs --rows 500000 --extra-columns 120
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ARTIFACT_DIR
+from benchmarks.bench_features import random_cartons
+
+READ = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+from readers import read_input
+
+def rss_kb(field):
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field))
+
+before = rss_kb('VmRSS:')
+start = time.perf_counter()
+df = pd.read_csv({path!r}) if {full!r} else read_input({path!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'peak_mb': (rss_kb('VmHWM:') - before) / 1024,
+                   'frame_mb': df.memory_usage(deep=True).sum() / 1024 ** 2, 'columns': df.shape[1]}}))
+"""
+
+def wide_export(rows, extra_columns, seed=0):
+    # The scoring columns plus a mix of numeric and text columns nobody reads
+    rng = np.random.default_rng(seed)
+    df = random_cartons(rows, seed)
+    df.insert(0, 'SKU', np.arange(rows))
+    df.insert(1, 'DESCRIPTION', 'CARTON ' + pd.Series(np.arange(rows) % 997).astype(str))
+    extra = {}
+    for i in range(extra_columns):
+        if i % 3 == 0:
+            extra[f'note_{i}'] = np.array(['PALLET', 'LAYER', 'EACH', 'CASE'])[rng.integers(0, 4, rows)]
+        else:
+            extra[f'metric_{i}'] = rng.normal(size=rows).round(4)
+    return pd.concat([df, pd.DataFrame(extra)], axis=1)
+
+def measure(path, full=False):
+    code = READ.format(root=ARTIFACT_DIR, path=path, full=full)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--extra-columns", type=int, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df = wide_export(args.rows, args.extra_columns)
+        paths = {fmt: os.path.join(tmp, f"export.{fmt}") for fmt in ('csv', 'parquet', 'arrow')}
+        df.to_csv(paths['csv'], index=False)
+        df.to_parquet(paths['parquet'], index=False)
+        df.to_feather(paths['arrow'])
+        del df
+
+        print(f"{args.rows:,} rows x {args.extra_columns + 6} columns; "
+              f"CSV {os.path.getsize(paths['csv']) / 1024 ** 2:.0f} MB")
+        baseline = measure(paths['csv'], full=True)
+        runs = [('full read_csv', baseline), ('projected csv', measure(paths['csv']))]
+        runs += [(f"projected {fmt}", measure(paths[fmt])) for fmt in ('parquet', 'arrow')]
+        for name, stats in runs:
+            print(f"{name:>18}  {stats['seconds']:7.2f}s ({baseline['seconds'] / stats['seconds']:5.1f}x)  "
+                  f"peak +{stats['peak_mb']:7.1f} MB ({baseline['peak_mb'] / max(stats['peak_mb'], 1e-9):5.1f}x)  "
+                  f"frame {stats['frame_mb']:7.1f} MB, {stats['columns']} columns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Scaling of the process-pool scorer with worker count, for both sharding
+modes: byte ranges of one large file and whole files spread across workers.
+Every run is checked against the serial streaming path.
+
+    python -m benchmarks.bench_parallel --rows 2000000 --workers 1 2 4 8
+
+Scaling is bounded by the physical cores available; wall time includes pool
+start-up and each worker's artifact load.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import registry
+from benchmarks.bench_features import random_cartons
+from model import stream_package_suspects
+from parallel import score_files_parallel, stream_package_suspects_parallel
+
+def write_export(path, rows, seed=0):
+    df = random_cartons(rows, seed)
+    df.insert(0, 'SKU', np.arange(rows) + seed * rows)
+    df.insert(1, 'DESCRIPTION', 'CARTON ' + pd.Series(np.arange(rows) % 997).astype(str))
+    df.to_csv(path, index=False)
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def check_same(path, reference):
+    actual, expected = pd.read_csv(path), pd.read_csv(reference)
+    if not actual['SKU'].equals(expected['SKU']):
+        raise SystemExit(f"{path}: rows out of order")
+    diff = float(np.abs(actual['Probability'] - expected['Probability']).max())
+    if diff > 1e-6:
+        raise SystemExit(f"{path}: probabilities differ from serial run by {diff}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--files", type=int, default=8, help="Files in the whole-file run (rows split evenly)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--shard-mb", type=int, default=16)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        big = os.path.join(tmp, 'big.csv')
+        write_export(big, args.rows)
+        files = []
+        for i in range(args.files):
+            files.append(os.path.join(tmp, f"site_{i}.csv"))
+            write_export(files[-1], args.rows // args.files, seed=i + 1)
+
+        # Serial runs are timed warm; each parallel run pays for its own pool
+        registry.scaler, registry.predictor(args.backend)
+        serial_big = os.path.join(tmp, 'serial_big.csv')
+        serial = timed(lambda: stream_package_suspects(big, serial_big, 0.5, backend=args.backend))
+        serial_files = [f"{path}.serial" for path in files]
+        serial_many = timed(lambda: [stream_package_suspects(path, out, 0.5, backend=args.backend)
+                                     for path, out in zip(files, serial_files)])
+        print(f"{os.cpu_count()} CPUs, {args.rows:,} rows, backend {args.backend}")
+        print(f"{'serial':>10}  one file {args.rows / serial:>10,.0f} rows/s  "
+              f"{args.files} files {args.rows / serial_many:>10,.0f} rows/s")
+
+        for workers in sorted(set(args.workers)):
+            out_big = os.path.join(tmp, f"par_big_{workers}.csv")
+            one = timed(lambda: stream_package_suspects_parallel(
+                big, out_big, 0.5, workers=workers, backend=args.backend,
+                shard_bytes=args.shard_mb * 1024 ** 2))
+            check_same(out_big, serial_big)
+
+            jobs = [(path, f"{path}.w{workers}") for path in files]
+            many = timed(lambda: list(score_files_parallel(jobs, 0.5, workers=workers, backend=args.backend)))
+            for (_, out), reference in zip(jobs, serial_files):
+                check_same(out, reference)
+
+            print(f"{workers:>3} workers  one file {args.rows / one:>10,.0f} rows/s ({serial / one:4.1f}x)  "
+                  f"{args.files} files {args.rows / many:>10,.0f} rows/s ({serial_many / many:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Per-stage timings of the scoring pipeline on synthetic exports of growing
+size: input read, input validation, feature engineering, categorical encoding, scaling,
+predict and output, plus the GUI's post-processing (building the threshold
+index and one filter/sort pass) for sizes the GUI would realistically load.
+Stages run chunk by chunk, as the streaming path does.
+
+A table goes to stderr and one JSON document to stdout, so runs can be
+archived and compared:
+
+    python -m benchmarks.bench_pipeline --rows 10000 100000 1000000 10000000 > run.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+import numpy as np
+import pandas as pd
+
+from artifacts import ARTIFACT_DIR, BACKENDS, registry
+from benchmarks.synthetic import write_synthetic
+from features import engineer_frame_features
+from model import DEFAULT_CHUNK_SIZE, write_results
+from readers import iter_input
+from scored_cartons import ScoredCartons
+from threshold_index import ThresholdIndex
+from validation import validate_frame
+
+STAGES = ['read', 'validate', 'features', 'encoding', 'scaling', 'predict', 'output', 'gui_index', 'gui_filter']
+
+class StageClock:
+    """
+    Accumulates wall time per stage; lap(stage) charges the time since the
+    previous lap to that stage.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self._last = time.perf_counter()
+
+    def restart(self):
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.seconds[stage] += now - self._last
+        self._last = now
+
+def run_pipeline(path, output_path, output_format='csv', backend='keras', batch_size=512,
+                 chunk_size=DEFAULT_CHUNK_SIZE, threshold=0.5, keep_results=False):
+    predictor = registry.predictor(backend)
+    fused = getattr(predictor, 'fused_scaler', None)
+    encoders = registry.encoders
+    scaler = registry.scaler
+
+    clock = StageClock()
+    kept = []
+    rows = 0
+    with ExitStack() as stack:
+        write = write_results(output_path, output_format, stack)
+        chunks = iter_input(path, chunk_size)
+        clock.restart()
+        for chunk in chunks:
+            clock.lap('read')
+            chunk, _ = validate_frame(chunk)
+            clock.lap('validate')
+            features = engineer_frame_features(chunk)
+            clock.lap('features')
+            inputs = {col: encoders[col].transform(chunk[col])[0].reshape(-1, 1) for col in encoders}
+            clock.lap('encoding')
+            inputs['numerical_input'] = features if fused else scaler.transform(features)
+            clock.lap('scaling')
+            probs = predictor.predict(inputs, batch_size=batch_size, verbose=0).flatten()
+            clock.lap('predict')
+            results = chunk[['SKU', 'DESCRIPTION']].copy()
+            results['Suspect'] = (probs > threshold).astype(int)
+            results['Probability'] = probs
+            write(results)
+            clock.lap('output')
+            rows += len(results)
+            if keep_results:
+                kept.append(ScoredCartons.from_pandas(results))
+            clock.restart()
+
+    if keep_results:
+        results = ScoredCartons.concat(kept)
+        clock.restart()
+        index = ThresholdIndex(results)
+        clock.lap('gui_index')
+        selected = index.rows(threshold)
+        index.sorted_positions(selected, 'SKU')
+        index.select(threshold)
+        clock.lap('gui_filter')
+    return rows, clock.seconds
+
+def environment(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ARTIFACT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'backend': args.backend,
+        'batch_size': args.batch_size,
+        'chunk_size': args.chunk_size,
+        'input_format': args.input_format,
+        'output_format': args.output_format,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--backend", choices=BACKENDS, default="keras")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--input-format", choices=['csv', 'parquet', 'arrow'], default='csv')
+    parser.add_argument("--output-format", choices=['csv', 'parquet'], default='csv')
+    parser.add_argument("--gui-max-rows", type=int, default=1_000_000,
+                        help="Largest size for which the GUI stages are timed (they hold every result in memory)")
+    parser.add_argument("--data-dir", help="Keep generated inputs here and reuse them across runs")
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        out_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+        # Load artifacts and trace the model before anything is timed
+        warm_path = write_synthetic(os.path.join(out_dir, 'warm.csv'), 1024)
+        run_pipeline(warm_path, os.path.join(out_dir, 'warm_out.csv'), backend=args.backend,
+                     batch_size=args.batch_size)
+
+        results = []
+        print(f"{'rows':>12}  " + "  ".join(f"{stage:>10}" for stage in STAGES) + f"  {'total':>8}  rows/s",
+              file=sys.stderr)
+        for rows in args.rows:
+            path = os.path.join(data_dir, f"synthetic_{rows}.{args.input_format}")
+            if not os.path.exists(path):
+                write_synthetic(path, rows)
+            output_path = os.path.join(out_dir, f"scored_{rows}.{args.output_format}")
+            scored, seconds = run_pipeline(path, output_path, args.output_format, args.backend, args.batch_size,
+                                           args.chunk_size, keep_results=rows <= args.gui_max_rows)
+            os.remove(output_path)
+            total = sum(seconds.values())
+            results.append({
+                'rows': scored,
+                'total_seconds': total,
+                'rows_per_second': scored / total if total else None,
+                'stages': {stage: {'seconds': value, 'rows_per_second': scored / value if value else None}
+                           for stage, value in seconds.items()
+                           if value or not stage.startswith('gui_')},
+            })
+            print(f"{scored:>12,}  " + "  ".join(
+                f"{seconds[stage]:>9.3f}s" if seconds[stage] or not stage.startswith('gui_') else f"{'-':>10}"
+                for stage in STAGES) + f"  {total:>7.2f}s  {scored / total:,.0f}", file=sys.stderr)
+
+    json.dump({'environment': environment(args), 'results': results}, sys.stdout, indent=2)
+    print()
+
+if __name__ == "__main__":
+    main()
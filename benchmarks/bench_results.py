@@ -0,0 +1,68 @@
+"""
+Resident size of scored results as a DataFrame versus ScoredCartons, the
+pandas round trip, and the GUI's index build and refilter over each. The
+results are synthetic (SKU/DESCRIPTION cardinalities like a real export),
+so no model run is needed.
+
+    python -m benchmarks.bench_results --rows 1000000 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scored_cartons import ScoredCartons
+from threshold_index import ThresholdIndex
+
+def synthetic_results(rows, skus=200_000, descriptions=5_000, text_skus=False, seed=0):
+    rng = np.random.default_rng(seed)
+    sku = rng.integers(100_000, 100_000 + skus, rows)
+    names = np.array([f"ITEM {i:05d} {size}CT" for i, size in enumerate(rng.integers(1, 48, descriptions))],
+                     dtype=object)
+    probability = rng.beta(0.5, 4, rows).astype(np.float32)
+    return pd.DataFrame({
+        'SKU': sku.astype(str).astype(object) if text_skus else sku,
+        'DESCRIPTION': names[rng.integers(0, descriptions, rows)],
+        'Suspect': (probability > 0.5).astype(int),
+        'Probability': probability,
+    })
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def refilter(index):
+    # What one slider move does in the GUI: filter, sort by SKU, format the visible rows
+    rows = index.rows(0.3)
+    index.sorted_positions(rows, 'SKU')
+    return index.probability_text[rows][slice(0, 50)].to_numpy()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000])
+    parser.add_argument("--text-skus", action="store_true", help="Use string SKUs instead of integers")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'DataFrame MB':>13} {'compact MB':>11} {'ratio':>6} "
+          f"{'convert s':>10} {'index s':>8} {'refilter ms':>12}")
+    for rows in args.rows:
+        df = synthetic_results(rows, text_skus=args.text_skus)
+        frame_bytes = df.memory_usage(deep=True, index=False).sum()
+        cartons, convert_seconds = timed(lambda: ScoredCartons.from_pandas(df))
+
+        back = cartons.to_pandas()
+        assert back.dtypes.equals(df.dtypes)
+        for col in df.columns:
+            assert np.array_equal(back[col].to_numpy(), df[col].to_numpy()), col
+
+        index, index_seconds = timed(lambda: ThresholdIndex(cartons))
+        refilter(index)
+        _, refilter_seconds = timed(lambda: refilter(index))
+        print(f"{rows:>12,} {frame_bytes / 1024 ** 2:>13,.1f} {cartons.nbytes / 1024 ** 2:>11,.1f} "
+              f"{frame_bytes / cartons.nbytes:>5.1f}x {convert_seconds:>10.2f} {index_seconds:>8.2f} "
+              f"{refilter_seconds * 1000:>12.1f}")
+
+if __name__ == "__main__":
+    main()
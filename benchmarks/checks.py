@@ -0,0 +1,101 @@
+"""
+Fast correctness checks on small inputs, meant to be run routinely (before a
+commit, after retraining or re-exporting) rather than as part of a benchmark:
+
+    python -m benchmarks.checks
+    python -m benchmarks.checks features fused --skip-keras
+
+features  the vectorised feature kernel matches the original row-wise pandas
+          pipeline, column by column in numerical_cols order
+fused     the fused artifact (scaler folded into the first Dense layer)
+          matches scaler.transform + network
+evaluate  evaluate.py sweeps a labeled export in the training layout ('Is
+          Suspect', 'Carton Length', 'SKU Description', no DESCRIPTION) as
+          CSV and Parquet, and its counts match thresholding directly
+
+Each check runs on a few thousand rows in seconds; the exit status is the
+number of checks that failed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import evaluate
+from benchmarks.bench_features import check_parity, random_cartons
+from benchmarks.bench_fused import check_fused_parity
+
+CHECK_ROWS = 2_000
+
+def training_layout(rows, seed=2):
+    # A labeled export as the training notebook reads it: site columns, 'Carton *' measurements, 'Is Suspect'
+    rng = np.random.default_rng(seed)
+    cartons = random_cartons(rows, seed)
+    return pd.DataFrame({
+        'Shelf': rng.choice(['A01', 'B07', 'C12'], rows),
+        'Carton Length': cartons['Length'],
+        'Carton Width': cartons['Width'],
+        'Carton Height': cartons['Height'],
+        'Carton Weight': cartons['Weight'],
+        'SKU': np.arange(rows),
+        'SKU Description': 'CASE',
+        'Is Suspect': np.where(rng.random(rows) < 0.2, 'Yes', 'No'),
+    })
+
+def check_training_layout(rows=CHECK_ROWS, backend='numpy'):
+    """
+    Run evaluate.py end to end on a training-layout export written as CSV and
+    as Parquet, then check the swept confusion counts against thresholding
+    the probabilities directly.
+    """
+    df = training_layout(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, 'labeled.csv'), os.path.join(tmp, 'labeled.parquet')]
+        df.to_csv(paths[0], index=False)
+        df.to_parquet(paths[1], index=False)
+        curve_path = os.path.join(tmp, 'curve.csv')
+        evaluate.main([*paths, '--backend', backend, '--points', '11', '--curve', curve_path])
+        curve = pd.read_csv(curve_path)
+        probabilities, labels = evaluate.score_labeled(paths, backend=backend)
+    assert len(labels) == 2 * rows, f"{len(labels)} labeled rows scored, expected {2 * rows}"
+    assert len(curve) == 11, f"curve has {len(curve)} points, expected 11"
+    for point in curve.itertuples():
+        flagged = probabilities > np.float32(point.threshold)
+        expected = (int((flagged & labels).sum()), int((flagged & ~labels).sum()))
+        assert (point.tp, point.fp) == expected, f"threshold {point.threshold}: tp/fp {(point.tp, point.fp)} != {expected}"
+
+CHECKS = {
+    'features': lambda args: check_parity(rows=args.rows),
+    'fused': lambda args: check_fused_parity(rows=args.rows, keras=not args.skip_keras),
+    'evaluate': lambda args: check_training_layout(rows=args.rows),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("checks", nargs="*", help=f"Checks to run (default: all of {', '.join(CHECKS)})")
+    parser.add_argument("--rows", type=int, default=CHECK_ROWS)
+    parser.add_argument("--skip-keras", action="store_true", help="Don't load TensorFlow for the fused check")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown check {', '.join(unknown)}; choose from {', '.join(CHECKS)}")
+
+    failures = 0
+    for name in args.checks or CHECKS:
+        start = time.perf_counter()
+        try:
+            CHECKS[name](args)
+        except (Exception, SystemExit) as e:
+            # A crash (or a CLI exiting early) fails the check just like a mismatch
+            failures += 1
+            print(f"FAIL {name}: {type(e).__name__}: {e}", file=sys.stderr)
+        else:
+            print(f"ok   {name} ({time.perf_counter() - start:.2f}s)")
+    sys.exit(failures)
+
+if __name__ == "__main__":
+    main()
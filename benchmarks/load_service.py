@@ -0,0 +1,78 @@
+"""
+Load generator for scoring_service.py. Opens --concurrency keep-alive
+connections to a running service, each sending POST /score requests of
+--records cartons back to back for --duration seconds, then prints
+client-side p50/p99 latency and throughput next to the service's /stats.
+
+    python scoring_service.py --port 8765 &
+    python -m benchmarks.load_service --port 8765 --concurrency 64 --records 1
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_features import random_cartons
+
+async def request(reader, writer, method, path, body=b''):
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = next(int(line.split(b':', 1)[1]) for line in head.split(b'\r\n')
+                  if line.lower().startswith(b'content-length:'))
+    return status, json.loads(await reader.readexactly(length))
+
+async def client(host, port, bodies, stop_at, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, 'POST', '/score', bodies[i % len(bodies)])
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+async def run(args):
+    cartons = random_cartons(args.records * 256, seed=2)
+    cartons.insert(0, 'SKU', [str(i) for i in range(len(cartons))])
+    records = cartons.to_dict('records')
+    bodies = [json.dumps(records[i:i + args.records]).encode() for i in range(0, len(records), args.records)]
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, bodies, start + args.duration, latencies, errors)
+                           for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    _, server_stats = await request(reader, writer, 'GET', '/stats')
+    writer.close()
+
+    latency_ms = np.array(latencies) * 1000
+    print(f"{args.concurrency} connections x {args.records} records/request for {elapsed:.1f}s")
+    if len(latency_ms):
+        print(f"client  p50 {np.percentile(latency_ms, 50):7.2f} ms  p99 {np.percentile(latency_ms, 99):7.2f} ms  "
+              f"{len(latency_ms) / elapsed:9,.0f} req/s  {len(latency_ms) * args.records / elapsed:10,.0f} rows/s"
+              f"  errors {len(errors)}")
+    print(f"server  {json.dumps(server_stats)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--records", type=int, default=1, help="Cartons per request")
+    parser.add_argument("--duration", type=float, default=10.0)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Synthetic carton exports in the production input schema (SKU, DESCRIPTION,
+Length/Width/Height/Weight in mm and g, and every categorical column in
+label_encoders.bin drawn from its fitted classes), so the pipeline can be
+benchmarked without site data.
+
+    python -m benchmarks.synthetic cartons.csv --rows 1000000
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from artifacts import registry
+from benchmarks.bench_features import random_cartons
+
+DESCRIPTION_WORDS = np.array(['CASE', 'TRAY', 'SHRINK', 'BOX', 'PACK', 'DISPLAY', 'BAG', 'BUNDLE'])
+
+# Rows per generated block when writing; bounds memory for 10M+ row files
+WRITE_BLOCK_ROWS = 1_000_000
+
+def synthetic_cartons(rows, seed=0, first_sku=0, outlier_rate=0.02, artifacts=registry):
+    """
+    Return a frame of `rows` cartons. A small share are outliers (very flat,
+    very long or unusually heavy for their size) so probabilities spread out
+    the way they do on real exports.
+    """
+    rng = np.random.default_rng(seed)
+    df = random_cartons(rows, seed)
+    outliers = rng.random(rows) < outlier_rate
+    kind = rng.integers(0, 3, rows)
+    df.loc[outliers & (kind == 0), 'Height'] = rng.uniform(5, 30, rows)[outliers & (kind == 0)].round(0)
+    df.loc[outliers & (kind == 1), 'Length'] = rng.uniform(900, 1500, rows)[outliers & (kind == 1)].round(0)
+    df.loc[outliers & (kind == 2), 'Weight'] *= rng.uniform(3, 8, rows)[outliers & (kind == 2)].round(1)
+
+    skus = np.arange(first_sku, first_sku + rows)
+    df.insert(0, 'SKU', skus)
+    words = DESCRIPTION_WORDS[skus % len(DESCRIPTION_WORDS)]
+    df.insert(1, 'DESCRIPTION', pd.Series(words).str.cat(pd.Series(skus % 5000).astype(str), sep=' '))
+    for col, encoder in artifacts.label_encoders.items():
+        df[col] = pd.Categorical.from_codes(rng.integers(0, len(encoder.classes_), rows), encoder.classes_)
+    return df
+
+def write_synthetic(path, rows, seed=0, artifacts=registry):
+    """
+    Write a synthetic export to path (.csv, .parquet or .arrow/.feather) block
+    by block and return path. Blocks use derived seeds, so a given (rows,
+    seed) always produces the same file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    writer = None
+    try:
+        for start in range(0, rows, WRITE_BLOCK_ROWS):
+            block = synthetic_cartons(min(WRITE_BLOCK_ROWS, rows - start), seed=seed * 7919 + start,
+                                      first_sku=start, artifacts=artifacts)
+            if ext in ('.parquet', '.arrow', '.feather'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(block, preserve_index=False)
+                if writer is None:
+                    writer = (pq.ParquetWriter(path, table.schema) if ext == '.parquet'
+                              else pa.ipc.new_file(path, table.schema))
+                writer.write_table(table)
+            else:
+                block.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="Destination .csv, .parquet or .arrow file")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic(args.output, args.rows, args.seed)
+    print(f"Wrote {args.rows:,} cartons to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Shared plumbing for the on-disk caches (prediction_cache, feature_cache):
+content hashing of input files and a directory of entries named
+"<fingerprint>-<input digest><suffix>", evicted least-recently-used once the
+directory exceeds max_bytes. Entries whose fingerprint is no longer current
+are dropped on every eviction pass.
+"""
+import hashlib
+import os
+
+from artifacts import registry
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'SUSPECT_GENIE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'suspect_genie', 'predictions'),
+)
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class DiskCache:
+    """
+    Base for a directory of cache entries. Subclasses set `suffix`, implement
+    current_fingerprints() and, when an entry spans several files, override
+    entry_files().
+    """
+    suffix = ''
+
+    def __init__(self, cache_dir, max_bytes, artifacts=registry):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.artifacts = artifacts
+        self._digests = {}
+
+    def current_fingerprints(self):
+        # Fingerprints an entry may carry and still be served
+        raise NotImplementedError
+
+    def digest(self, path):
+        # Content hashes are memoized per (path, size, mtime) within a session
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if memo_key not in self._digests:
+            self._digests[memo_key] = file_digest(path)
+        return self._digests[memo_key]
+
+    def entry_name(self, fingerprint, input_path):
+        return os.path.join(self.cache_dir, f"{fingerprint}-{self.digest(input_path)}{self.suffix}")
+
+    def entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith(self.suffix)]
+
+    def entry_files(self, path):
+        return [path]
+
+    def remove(self, path):
+        for file in self.entry_files(path):
+            if os.path.exists(file):
+                os.remove(file)
+
+    def evict(self):
+        current = tuple(f"{fingerprint}-" for fingerprint in self.current_fingerprints())
+        entries = []
+        for path in self.entries():
+            if not os.path.basename(path).startswith(current):
+                # Built from other artifacts or code; can never be hit again
+                self.remove(path)
+                continue
+            size = sum(os.path.getsize(file) for file in self.entry_files(path) if os.path.exists(file))
+            entries.append((os.path.getmtime(path), size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def clear(self):
+        for path in self.entries():
+            self.remove(path)
@@ -0,0 +1,53 @@
+"""
+Compiled categorical encoders. Each fitted LabelEncoder from
+label_encoders.bin is turned into a pandas Index lookup once; transform then
+factorizes the column, converts and looks up only its distinct values, and
+maps every row with a single take. Values the encoder never saw get a
+reserved code instead of aborting the whole file.
+"""
+import numpy as np
+import pandas as pd
+
+# Code given to unseen values. The embeddings were trained with exactly
+# len(classes_) rows, so the reserved code has to be one of the known codes.
+DEFAULT_UNSEEN_CODE = 0
+
+class CompiledEncoder:
+    """
+    Vectorized stand-in for LabelEncoder.transform(values.astype(str)) with
+    identical codes for known values. unseen_code=None keeps sklearn's
+    behaviour of raising ValueError on unseen values. Holds no per-call
+    state, so one instance can be shared by concurrent scorers.
+    """
+
+    def __init__(self, classes, unseen_code=DEFAULT_UNSEEN_CODE):
+        self.classes = pd.Index(np.asarray(classes).astype(str))
+        if unseen_code is not None and not 0 <= unseen_code < len(self.classes):
+            raise ValueError(f"unseen_code {unseen_code} is outside the encoder's "
+                             f"{len(self.classes)} known codes")
+        self.unseen_code = unseen_code
+
+    @classmethod
+    def from_label_encoder(cls, encoder, unseen_code=DEFAULT_UNSEEN_CODE):
+        return cls(encoder.classes_, unseen_code)
+
+    def transform(self, values):
+        """
+        Returns (codes, unseen): the code of every value and how many rows
+        held a value the encoder never saw.
+        """
+        # NaN is kept as its own value so it becomes 'nan', as astype(str) does
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        lookup = self.classes.get_indexer(pd.Index(uniques).astype(str))
+        unseen = lookup < 0
+        if not unseen.any():
+            return lookup[codes], 0
+        if self.unseen_code is None:
+            missing = pd.Index(uniques)[unseen]
+            raise ValueError(f"y contains previously unseen labels: {list(missing.astype(str))}")
+        lookup[unseen] = self.unseen_code
+        return lookup[codes], int(np.isin(codes, np.flatnonzero(unseen)).sum())
+
+def compile_encoders(label_encoders, unseen_code=DEFAULT_UNSEEN_CODE):
+    return {col: CompiledEncoder.from_label_encoder(encoder, unseen_code)
+            for col, encoder in label_encoders.items()}
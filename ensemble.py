@@ -0,0 +1,273 @@
+"""
+Score one export with several models in a single pass: the production
+network next to retrained candidates or per-site models. Each model is an
+artifact bundle (network, label encoders, scaler) loaded through its own
+ArtifactRegistry. Per chunk, the file is read, validated and feature
+engineered once; categorical encoding runs once per distinct set of
+encoders and scaling once per distinct scaler (fused backends need none),
+and every model predicts from that shared matrix.
+
+    python ensemble.py exports/site_a.csv --model prod=. --model retrained=models/v2:fused \\
+        --combine mean --weights 2,1 --output site_a_ensemble.csv
+
+Results carry one Probability_<name> column per model; Probability and
+Suspect are the combined score and its flag at --threshold.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+from artifacts import ARTIFACT_DIR, BACKENDS, MODEL_FILE, ArtifactRegistry, registry
+from features import engineer_frame_features, numerical_cols
+from model import DEFAULT_CHUNK_SIZE, encode_categoricals, write_stream
+from profiling import NULL_PROFILE, StageProfile, resolve_profile
+from readers import iter_input, read_input
+from validation import Quarantine, report_rejects, validate_frame
+
+COMBINE_METHODS = ('mean', 'median', 'max', 'min')
+
+class EnsembleMember:
+    """
+    One named model: an artifact bundle, the backend to run it on and its
+    weight in a weighted mean.
+    """
+
+    def __init__(self, name, artifacts=registry, backend='keras', weight=1.0):
+        self.name = name
+        self.artifacts = artifacts
+        self.backend = backend
+        self.weight = weight
+
+    @property
+    def predictor(self):
+        return self.artifacts.predictor(self.backend)
+
+    @property
+    def fused(self):
+        return bool(getattr(self.predictor, 'fused_scaler', None))
+
+def load_member(spec, weight=1.0, default_backend='keras'):
+    """
+    Member from a NAME=PATH[:BACKEND] spec. PATH is a bundle directory (the
+    usual artifact file names inside) or a .h5 network whose encoders and
+    scaler sit next to it.
+    """
+    name, sep, location = spec.partition('=')
+    if not sep or not name or not location:
+        raise ValueError(f"Expected NAME=PATH[:BACKEND], got {spec!r}")
+    backend = default_backend
+    path, colon, suffix = location.rpartition(':')
+    if colon and suffix in BACKENDS:
+        location, backend = path, suffix
+    if os.path.isdir(location):
+        artifacts = ArtifactRegistry(base_dir=location)
+    else:
+        artifacts = ArtifactRegistry(base_dir=os.path.dirname(os.path.abspath(location)),
+                                     model_file=os.path.basename(location))
+    if os.path.abspath(artifacts.base_dir) == ARTIFACT_DIR and artifacts.model_file == MODEL_FILE:
+        artifacts = registry  # the production bundle is shared with the rest of the process
+    return EnsembleMember(name, artifacts, backend, weight)
+
+def _scaler_key(scaler):
+    # Scalers with the same parameters transform identically, wherever they were loaded from
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{scaler.with_mean}/{scaler.with_std}".encode())
+    for values in (scaler.mean_, scaler.scale_):
+        if values is not None:
+            digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def _encoder_key(artifacts):
+    return tuple((col, tuple(encoder.classes), encoder.unseen_code)
+                 for col, encoder in sorted(artifacts.encoders.items()))
+
+class Ensemble:
+    """
+    Several members scored from shared inputs and combined with `combine`
+    (mean, weighted by the members' weights, or median/max/min).
+    """
+
+    def __init__(self, members, combine='mean'):
+        if not members:
+            raise ValueError("An ensemble needs at least one model")
+        names = [member.name for member in members]
+        if len(set(names)) < len(names):
+            raise ValueError(f"Model names must be unique: {', '.join(names)}")
+        if combine not in COMBINE_METHODS:
+            raise ValueError(f"Unknown combine method {combine!r}; expected one of {', '.join(COMBINE_METHODS)}")
+        self.members = members
+        self.combine = combine
+        self._keys = None
+
+    @property
+    def names(self):
+        return [member.name for member in self.members]
+
+    @property
+    def categorical_cols(self):
+        # Every categorical column any member's encoders need, in first-seen order
+        columns = []
+        for member in self.members:
+            columns += [col for col in member.artifacts.categorical_cols if col not in columns]
+        return columns
+
+    def load(self):
+        """
+        Load every bundle and group members that share encoders or scalers;
+        called on first use. Returns the number of distinct encoder sets and
+        scalers.
+        """
+        if self._keys is None:
+            keys = {}
+            for member in self.members:
+                scaler = member.artifacts.scaler
+                if getattr(scaler, 'n_features_in_', len(numerical_cols)) != len(numerical_cols):
+                    raise ValueError(f"Model {member.name!r}: scaler expects {scaler.n_features_in_} features, "
+                                     f"features.py defines {len(numerical_cols)}")
+                member.predictor  # load now so the first chunk isn't charged for it
+                # Fused backends take unscaled features, so they need no scaler group
+                keys[member.name] = (_encoder_key(member.artifacts),
+                                     None if member.fused else _scaler_key(scaler))
+            self._keys = keys
+        encoder_keys = {encoder_key for encoder_key, _ in self._keys.values()}
+        scaler_keys = {scaler_key for _, scaler_key in self._keys.values()} - {None}
+        return len(encoder_keys), len(scaler_keys)
+
+    def predict(self, df, batch_size=512, verbose=0, profile=NULL_PROFILE):
+        """
+        Per-member probabilities for a validated frame, as {name: array}.
+        """
+        self.load()
+        with profile.stage('features', rows=len(df)):
+            features = engineer_frame_features(df)
+        encoded, scaled = {}, {None: features}
+        probabilities = {}
+        for member in self.members:
+            encoder_key, scaler_key = self._keys[member.name]
+            if encoder_key not in encoded:
+                encoded[encoder_key] = encode_categoricals(df, member.artifacts, profile)
+            if scaler_key not in scaled:
+                with profile.stage('scaling', rows=len(df)):
+                    scaled[scaler_key] = member.artifacts.scaler.transform(features)
+            model_inputs = dict(encoded[encoder_key], numerical_input=scaled[scaler_key])
+            with profile.stage(f'predict[{member.name}]', rows=len(df)):
+                probabilities[member.name] = member.predictor.predict(
+                    model_inputs, batch_size=batch_size, verbose=verbose).flatten()
+        return probabilities
+
+    def combined(self, probabilities):
+        stacked = np.stack([probabilities[name] for name in self.names])
+        if self.combine == 'mean':
+            weights = np.array([member.weight for member in self.members], dtype=np.float64)
+            return (np.tensordot(weights / weights.sum(), stacked, axes=1)).astype(stacked.dtype)
+        return getattr(np, self.combine)(stacked, axis=0)
+
+    def score_frame(self, df, threshold, batch_size=512, verbose=0, profile=None, quarantine=None):
+        """
+        Validate and score a frame of raw inputs with every member: the usual
+        SKU/DESCRIPTION/Suspect/Probability columns (combined score) plus a
+        Probability_<name> column per member.
+        """
+        profile = resolve_profile(profile)
+        df, rejects = validate_frame(df, profile)
+        report_rejects(rejects, quarantine)
+        probabilities = self.predict(df, batch_size, verbose, profile)
+        with profile.stage('output', rows=len(df)):
+            score = self.combined(probabilities)
+            results = df[['SKU', 'DESCRIPTION']].copy()
+            results['Suspect'] = (score > threshold).astype(int)
+            results['Probability'] = score
+            for name, probs in probabilities.items():
+                results[f'Probability_{name}'] = probs
+        return results
+
+    def _read_columns(self):
+        # Categorical columns of the production bundle come from the readers' own projection
+        return [col for col in self.categorical_cols if col not in registry.categorical_cols]
+
+def iter_ensemble_suspects(csv_path, ensemble, threshold, batch_size=512, chunk_size=DEFAULT_CHUNK_SIZE,
+                           profile=None, quarantine=None):
+    """
+    Score a CSV (or Parquet/Arrow IPC file) chunk by chunk with every member
+    of the ensemble, reading the file once.
+    """
+    profile = resolve_profile(profile)
+    ensemble.load()
+    chunks = iter_input(csv_path, chunk_size, extra_columns=ensemble._read_columns())
+    while True:
+        with profile.stage('read') as stage:
+            chunk = next(chunks, None)
+            stage.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        yield ensemble.score_frame(chunk, threshold, batch_size, profile=profile, quarantine=quarantine)
+
+def predict_ensemble_suspects(csv_path, ensemble, threshold, batch_size=512, profile=None, quarantine=None):
+    # Whole-file counterpart of predict_package_suspects
+    profile = resolve_profile(profile)
+    ensemble.load()
+    with profile.stage('read') as stage:
+        df = read_input(csv_path, extra_columns=ensemble._read_columns())
+        stage.rows = len(df)
+    return ensemble.score_frame(df, threshold, batch_size, profile=profile, quarantine=quarantine)
+
+def parse_weights(text, count):
+    weights = [float(weight) for weight in text.split(',')]
+    if len(weights) != count:
+        raise ValueError(f"--weights has {len(weights)} values for {count} models")
+    if min(weights) < 0 or not sum(weights):
+        raise ValueError("--weights must be non-negative and not all zero")
+    return weights
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV/Parquet/Arrow export to score")
+    parser.add_argument("--model", action="append", required=True, metavar="NAME=PATH[:BACKEND]",
+                        help="A model bundle directory or .h5 network; repeat for each model")
+    parser.add_argument("--combine", choices=COMBINE_METHODS, default="mean",
+                        help="How member probabilities become the ensemble score")
+    parser.add_argument("--weights", help="Comma-separated weights for --combine mean, in --model order")
+    parser.add_argument("-o", "--output", help="Results file (default: <name>_ensemble.csv next to the input)")
+    parser.add_argument("--format", choices=['csv', 'parquet'], default=None,
+                        help="Output format (default: from --output's extension, else csv)")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--backend", choices=BACKENDS, default="keras", help="Backend for models without :BACKEND")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings to stderr")
+    args = parser.parse_args(argv)
+
+    try:
+        weights = parse_weights(args.weights, len(args.model)) if args.weights else [1.0] * len(args.model)
+        ensemble = Ensemble([load_member(spec, weight, args.backend) for spec, weight in zip(args.model, weights)],
+                            args.combine)
+        encoder_sets, scalers = ensemble.load()
+    except (ValueError, OSError) as e:
+        parser.exit(2, f"Error: {e}\n")
+    print(f"Loaded {len(ensemble.members)} models ({encoder_sets} encoder sets, {scalers} distinct scalers)",
+          file=sys.stderr)
+
+    output_format = args.format or ('parquet' if (args.output or '').lower().endswith('.parquet') else 'csv')
+    stem = os.path.splitext(args.input)[0]
+    output = args.output or f"{stem}_ensemble.{output_format}"
+    quarantine = Quarantine(f"{os.path.splitext(output)[0]}_rejects.csv", replace=True)
+    profile = StageProfile() if args.profile else None
+
+    start = time.perf_counter()
+    chunks = iter_ensemble_suspects(args.input, ensemble, args.threshold, args.batch_size, args.chunk_size,
+                                    profile, quarantine)
+    rows = write_stream(chunks, output, output_format, progress=True, profile=resolve_profile(profile))
+    seconds = time.perf_counter() - start
+    if quarantine.rows:
+        print(quarantine.summary(), file=sys.stderr)
+    print(f"{args.input}: {rows:,} rows x {len(ensemble.members)} models in {seconds:.2f}s "
+          f"({rows / seconds if seconds else 0:,.0f} rows/s) -> {output}", file=sys.stderr)
+    if profile is not None:
+        print(profile.format(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Threshold sweep over labeled exports. The files are scored once; the
+confusion matrix, precision, recall and F-beta at every candidate threshold
+then come from the sorted probabilities of each class, so a 1,000-point
+sweep costs two sorts and a binary search per threshold instead of one
+scoring run per threshold.
+
+    python evaluate.py labeled_export.csv --curve curve.csv --beta 2
+
+The curve is written as CSV (or Parquet for a .parquet path) and the
+recommended operating point is printed: the threshold with the best F-beta,
+or with --min-recall the most precise threshold that keeps that recall.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import BACKENDS, registry
+from model import DEFAULT_CHUNK_SIZE, predict_probabilities
+from readers import ID_COLS, column_map, input_columns, iter_input
+from validation import report_rejects, validate_frame
+
+# Columns tried, in order, when --label isn't given
+LABEL_COLUMNS = ['suspect_flag', 'Is Suspect']
+TRUE_LABELS = {'yes', 'y', 'true', 't', '1', 'suspect'}
+
+DEFAULT_POINTS = 1001
+
+def find_label_column(path, label=None):
+    columns = input_columns(path)
+    candidates = [label] if label else LABEL_COLUMNS
+    for col in candidates:
+        if col in columns:
+            return col
+    raise KeyError(f"{path} has no label column (looked for {', '.join(candidates)})")
+
+def check_input(path, label=None):
+    # Raises if path can't be read or lacks a label or a column scoring needs
+    columns = input_columns(path)
+    column_map(columns, extra_columns=[find_label_column(path, label)], optional_columns=ID_COLS)
+
+def parse_labels(values):
+    """
+    Boolean suspect labels from a 0/1, boolean or Yes/No column; missing
+    labels come back as NaN in a float array so callers can drop them.
+    """
+    values = pd.Series(values)
+    missing = values.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        labels = values.fillna(0).to_numpy() != 0
+    else:
+        labels = values.astype(str).str.strip().str.lower().isin(TRUE_LABELS).to_numpy()
+    return np.where(missing, np.nan, labels.astype(np.float64))
+
+def score_labeled(paths, label=None, batch_size=512, chunk_size=DEFAULT_CHUNK_SIZE, backend='keras'):
+    """
+    Score labeled files chunk by chunk and return (probabilities, labels) for
+    every valid row with a label; rows failing validation are skipped. Files
+    may use the training exports' column names ('Carton Length', ...) and
+    need no SKU or DESCRIPTION.
+    """
+    probabilities, labels = [], []
+    for path in paths:
+        label_col = find_label_column(path, label)
+        for chunk in iter_input(path, chunk_size, extra_columns=[label_col], optional_columns=ID_COLS):
+            chunk, rejects = validate_frame(chunk)
+            report_rejects(rejects)
+            chunk_labels = parse_labels(chunk[label_col])
+            keep = ~np.isnan(chunk_labels)
+            probs = predict_probabilities(chunk, batch_size, verbose=0, backend=backend)
+            probabilities.append(probs[keep])
+            labels.append(chunk_labels[keep].astype(bool))
+    if not probabilities:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=bool)
+    return np.concatenate(probabilities), np.concatenate(labels)
+
+def sweep(probabilities, labels, thresholds, beta=1.0):
+    """
+    Confusion matrix and metrics at each threshold, flagging rows with
+    probability > threshold exactly as scoring does. Each class's
+    probabilities are sorted once; the count of that class at or below a
+    threshold is then a binary search (the cumulative count of the sorted
+    class), which gives every cell of the confusion matrix.
+    """
+    probabilities = np.asarray(probabilities)
+    labels = np.asarray(labels, dtype=bool)
+    # NaN probabilities are never flagged; -inf keeps them below every threshold
+    probabilities = np.where(np.isnan(probabilities), -np.inf, probabilities)
+    positives = np.sort(probabilities[labels])
+    negatives = np.sort(probabilities[~labels])
+    # Scoring compares in the probabilities' dtype (float32 for every backend)
+    cutoffs = np.asarray(thresholds, dtype=np.float64).astype(probabilities.dtype)
+
+    fn = np.searchsorted(positives, cutoffs, side='right')
+    tn = np.searchsorted(negatives, cutoffs, side='right')
+    tp = len(positives) - fn
+    fp = len(negatives) - tn
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), np.nan)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), np.nan)
+        b2 = beta * beta
+        f_beta = (1 + b2) * precision * recall / (b2 * precision + recall)
+    f_beta = np.nan_to_num(f_beta, nan=0.0)
+
+    return pd.DataFrame({
+        'threshold': np.asarray(thresholds, dtype=np.float64),
+        'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+        'precision': precision,
+        'recall': recall,
+        'f_beta': f_beta,
+        'flagged_fraction': (tp + fp) / max(len(labels), 1),
+    })
+
+def recommend(curve, min_recall=None):
+    """
+    The curve row to operate at: best F-beta, or the most precise threshold
+    with recall >= min_recall. Ties go to the higher threshold (fewer flags).
+    """
+    if min_recall is not None:
+        eligible = curve[curve['recall'] >= min_recall]
+        if eligible.empty:
+            raise ValueError(f"No threshold reaches recall {min_recall}")
+        scores = eligible['precision'].fillna(0.0)
+    else:
+        eligible = curve
+        scores = curve['f_beta']
+    best = eligible[scores == scores.max()]
+    return best.iloc[-1]
+
+def write_curve(curve, path):
+    if str(path).endswith('.parquet'):
+        curve.to_parquet(path, index=False)
+    else:
+        curve.to_csv(path, index=False)
+
+def format_point(row, beta):
+    return (f"threshold {row['threshold']:.3f}: precision {row['precision']:.3f}, recall {row['recall']:.3f}, "
+            f"F{beta:g} {row['f_beta']:.3f}, flags {int(row['tp'] + row['fp']):,} "
+            f"({row['flagged_fraction']:.2%}), tp {int(row['tp']):,} fp {int(row['fp']):,} fn {int(row['fn']):,}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Labeled CSV/Parquet/Arrow exports")
+    parser.add_argument("--label", help=f"Label column (default: first of {', '.join(LABEL_COLUMNS)})")
+    parser.add_argument("--curve", default="threshold_curve.csv", help="Where to write the per-threshold metrics")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS, help="Thresholds evenly spaced over [0, 1]")
+    parser.add_argument("--beta", type=float, default=1.0, help="F-beta weighting; >1 favours recall")
+    parser.add_argument("--min-recall", type=float,
+                        help="Recommend the most precise threshold with at least this recall instead")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    # Every file is checked before any is scored, so a bad one fails fast and by name
+    for path in args.inputs:
+        try:
+            check_input(path, args.label)
+        except (OSError, KeyError, ValueError) as e:
+            parser.exit(2, f"Error: can't evaluate '{path}': {e.args[0] if isinstance(e, KeyError) else e}\n")
+
+    # Load artifacts first so the scoring time reflects scoring only
+    registry.scaler, registry.encoders, registry.predictor(args.backend)
+    start = time.perf_counter()
+    probabilities, labels = score_labeled(args.inputs, args.label, args.batch_size, args.chunk_size, args.backend)
+    scored = time.perf_counter() - start
+    if not len(labels):
+        parser.exit(2, "No labeled rows to evaluate\n")
+
+    start = time.perf_counter()
+    thresholds = np.linspace(0.0, 1.0, args.points)
+    curve = sweep(probabilities, labels, thresholds, args.beta)
+    swept = time.perf_counter() - start
+    write_curve(curve, args.curve)
+
+    print(f"Scored {len(labels):,} labeled rows ({int(labels.sum()):,} suspects) in {scored:.2f}s; "
+          f"swept {len(thresholds):,} thresholds in {swept * 1000:.1f} ms -> {args.curve}", file=sys.stderr)
+    default = sweep(probabilities, labels, [0.5], args.beta).iloc[0]
+    print(f"At 0.5:      {format_point(default, args.beta)}")
+    print(f"Recommended: {format_point(recommend(curve, args.min_recall), args.beta)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+On-disk cache of engineered model inputs, so re-scoring the same export with
+another threshold or a retrained network skips parsing and feature
+engineering. Each entry is one file holding a small JSON schema header and
+the raw (unscaled) float32 feature matrix plus the encoded categorical codes,
+each block aligned so it can be memory-mapped zero-copy; SKU and DESCRIPTION
+sit next to it in a Parquet file.
+
+Entries are keyed by the input's content hash and a fingerprint of the
+feature definitions (features.py, the feature order, the label encoders and
+the unseen-value code). The scaler and network are deliberately not part of
+the key: those are what the cached matrix is for.
+"""
+import hashlib
+import json
+import os
+import struct
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from artifacts import registry
+from disk_cache import DEFAULT_CACHE_DIR, DiskCache, file_digest
+from features import numerical_cols
+from readers import ID_COLS
+
+# Kept out of the prediction cache's own directory, like the score store
+DEFAULT_FEATURE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'features')
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+MAGIC = b'SGFEAT1\0'
+ALIGNMENT = 64
+
+def feature_fingerprint(artifacts=registry):
+    """
+    Hash of everything that determines the cached matrix: the feature and
+    validation code, the column order, the label encoders and the
+    unseen-value code.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for module in ('features.py', 'validation.py'):
+        digest.update(file_digest(os.path.join(os.path.dirname(os.path.abspath(__file__)), module)).encode())
+    digest.update(json.dumps(numerical_cols).encode())
+    encoders_path = artifacts.path(artifacts.encoders_file)
+    if os.path.exists(encoders_path):
+        digest.update(file_digest(encoders_path).encode())
+    digest.update(f"unseen_code={artifacts.unseen_code}".encode())
+    return digest.hexdigest()
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def write_feature_file(path, inputs):
+    """
+    Write a dict of 2-D arrays (numerical_input plus one column per
+    categorical) as header + aligned C-ordered blocks. Block offsets are
+    relative to the first aligned byte after the header.
+    """
+    arrays = {name: np.ascontiguousarray(value, dtype=np.float32 if name == 'numerical_input' else np.int32)
+              for name, value in inputs.items()}
+    blocks = []
+    offset = 0
+    for name, array in arrays.items():
+        blocks.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset})
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({'version': 1, 'rows': len(arrays['numerical_input']), 'numerical_cols': numerical_cols,
+                         'blocks': blocks}).encode()
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header)) + header)
+        for block in blocks:
+            f.seek(data_start + block['offset'])
+            arrays[block['name']].tofile(f)
+        f.truncate(data_start + offset)
+
+def read_feature_file(path):
+    """
+    Map a feature file's blocks read-only. Returns a dict of arrays backed by
+    the file, or None if it isn't a feature file for the current column order.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        (length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(length))
+    if header['numerical_cols'] != numerical_cols:
+        return None
+    data_start = _aligned(len(MAGIC) + 4 + length)
+    inputs = {}
+    for block in header['blocks']:
+        shape = tuple(block['shape'])
+        if not header['rows']:
+            # An empty file region can't be mapped
+            inputs[block['name']] = np.empty(shape, dtype=block['dtype'])
+        else:
+            inputs[block['name']] = np.memmap(path, dtype=block['dtype'], mode='r',
+                                              offset=data_start + block['offset'], shape=shape)
+    return inputs
+
+class FeatureCache(DiskCache):
+    """
+    Memory-mapped model inputs per (input content, feature fingerprint).
+    get() returns (identifiers frame, inputs dict) or None; put() stores them.
+    Entries are evicted least-recently-used once the directory exceeds
+    max_bytes, and entries for other fingerprints are dropped on every put.
+    """
+    suffix = '.features'
+
+    def __init__(self, cache_dir=DEFAULT_FEATURE_DIR, max_bytes=DEFAULT_MAX_BYTES, artifacts=registry):
+        super().__init__(cache_dir, max_bytes, artifacts)
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = feature_fingerprint(self.artifacts)
+        return self._fingerprint
+
+    def current_fingerprints(self):
+        return [self.fingerprint]
+
+    def entry_path(self, input_path):
+        return self.entry_name(self.fingerprint, input_path)
+
+    def entry_files(self, path):
+        # The matrix plus the identifiers stored next to it
+        return [path, f"{path}.ids.parquet"]
+
+    def get(self, input_path):
+        path = self.entry_path(input_path)
+        ids_path = f"{path}.ids.parquet"
+        if not (os.path.exists(path) and os.path.exists(ids_path)):
+            return None
+        inputs = read_feature_file(path)
+        if inputs is None:
+            return None
+        os.utime(path)  # mark as recently used
+        return pd.read_parquet(ids_path), inputs
+
+    def put(self, input_path, identifiers, inputs):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(input_path)
+        token = uuid.uuid4().hex
+        tmp_ids, tmp_path = f"{path}.ids.parquet.{token}.tmp", f"{path}.{token}.tmp"
+        try:
+            identifiers[ID_COLS].to_parquet(tmp_ids, index=False)
+            write_feature_file(tmp_path, inputs)
+            # The matrix is moved last: an entry counts only once it exists
+            os.replace(tmp_ids, f"{path}.ids.parquet")
+            os.replace(tmp_path, path)
+        finally:
+            for tmp in (tmp_ids, tmp_path):
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        self.evict()
+        return path
@@ -0,0 +1,229 @@
+"""
+Declarative feature definitions shared by training (NN.ipynb) and scoring.
+
+Each feature names the features or raw sources it is computed from, so the
+definitions form a dependency graph (Length, Width -> base_area -> Volume ->
+cube_root_volume, ...). FEATURES.compile() orders the graph once into a plan
+that evaluates every node exactly once in float64, writes the model inputs
+straight into a preallocated float32 matrix and drops each intermediate
+after its last use. Raw sources carry aliases, so the training exports'
+'Carton Length'-style columns and the scoring exports' 'Length'-style
+columns go through the same definitions.
+
+The order in which model inputs are defined is the column order expected by
+standard_scaler.bin and the network's numerical_input (numerical_cols).
+"""
+import numpy as np
+import pandas as pd
+
+class FeatureRegistry:
+    """
+    Raw sources plus derived features, each derived one a function of the
+    nodes named in its inputs (checked when compiled, so definitions can
+    refer ahead). Nodes with output=True are model inputs, in definition
+    order; the rest are shared intermediates.
+    """
+
+    def __init__(self):
+        self.sources = []
+        self.aliases = {}
+        self.nodes = {}
+        self.outputs = []
+        self._plan = None
+
+    def _add(self, name, inputs, fn, output):
+        if name in self.nodes:
+            raise ValueError(f"Feature {name!r} is already defined")
+        self.nodes[name] = (tuple(inputs), fn)
+        if output:
+            self.outputs.append(name)
+        self._plan = None
+
+    def source(self, name, aliases=(), output=True):
+        # A raw input column; aliases are the names other exports use for it
+        self.sources.append(name)
+        self.aliases[name] = (name, *aliases)
+        self._add(name, (), None, output)
+
+    def define(self, name, inputs, fn, output=True):
+        self._add(name, inputs, fn, output)
+
+    def intermediate(self, name, inputs, fn):
+        self._add(name, inputs, fn, output=False)
+
+    def resolve(self, columns):
+        """
+        Map each source to the column that provides it in `columns`,
+        accepting any of its aliases.
+        """
+        columns = set(columns)
+        resolved, missing = {}, []
+        for source in self.sources:
+            found = next((alias for alias in self.aliases[source] if alias in columns), None)
+            if found is None:
+                missing.append(' / '.join(self.aliases[source]))
+            else:
+                resolved[source] = found
+        if missing:
+            raise KeyError(f"Missing feature source columns: {', '.join(missing)}")
+        return resolved
+
+    def compile(self):
+        # Cached until the next definition; the plan is immutable once built
+        if self._plan is None:
+            self._plan = FeaturePlan(self)
+        return self._plan
+
+class FeaturePlan:
+    """
+    The registry's nodes in dependency order, each evaluated once. Calling
+    the plan with one array per source returns the (n, len(outputs)) float32
+    matrix, column-major so each feature is a contiguous write.
+    """
+
+    def __init__(self, registry):
+        self.sources = list(registry.sources)
+        self.outputs = list(registry.outputs)
+        column = {name: i for i, name in enumerate(self.outputs)}
+
+        # Depth-first from each output, so only nodes a model input needs are
+        # evaluated; definitions may refer to nodes defined further down
+        order, done, visiting = [], set(), set()
+
+        def visit(name, dependent=None):
+            if name in done:
+                return
+            if name not in registry.nodes:
+                raise ValueError(f"Feature {dependent!r} depends on undefined {name!r}")
+            if name in visiting:
+                raise ValueError(f"Feature {name!r} depends on itself")
+            visiting.add(name)
+            for dependency in registry.nodes[name][0]:
+                visit(dependency, name)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+        for name in self.outputs:
+            visit(name)
+
+        last_use = {}
+        for position, name in enumerate(order):
+            for dependency in registry.nodes[name][0]:
+                last_use[dependency] = position
+        self.steps = []
+        for position, name in enumerate(order):
+            inputs, fn = registry.nodes[name]
+            release = tuple(node for node, last in last_use.items() if last == position)
+            self.steps.append((name, inputs, fn, column.get(name), release))
+
+    def __call__(self, sources, out=None):
+        values = {name: np.asarray(sources[name], dtype=np.float64) for name in self.sources}
+        rows = len(values[self.sources[0]])
+        if out is None:
+            out = np.empty((rows, len(self.outputs)), dtype=np.float32, order='F')
+        for name, inputs, fn, col, release in self.steps:
+            if fn is not None:
+                values[name] = fn(*(values[node] for node in inputs))
+            if col is not None:
+                out[:, col] = values[name]
+            for node in release:
+                del values[node]
+        return out
+
+FEATURES = FeatureRegistry()
+
+# Raw measurements (mm and g), named as in scoring exports and training exports
+FEATURES.source('Length', ['Carton Length'])
+FEATURES.source('Width', ['Carton Width'])
+FEATURES.source('Height', ['Carton Height'])
+FEATURES.source('Weight', ['Carton Weight'])
+
+# Shared intermediates, in the same operation order as the original pandas pipeline
+FEATURES.intermediate('base_area', ['Length', 'Width'], lambda L, W: L * W)
+FEATURES.intermediate('L2', ['Length'], lambda L: L * L)
+FEATURES.intermediate('W2', ['Width'], lambda W: W * W)
+FEATURES.intermediate('H2', ['Height'], lambda H: H * H)
+
+FEATURES.define('Volume', ['base_area', 'Height'], lambda LW, H: LW * H)
+FEATURES.define('weight_to_volume', ['Weight', 'Volume'], lambda Wt, V: Wt / V)
+
+FEATURES.define('length_to_width', ['Length', 'Width'], lambda L, W: L / W)
+FEATURES.define('length_to_height', ['Length', 'Height'], lambda L, H: L / H)
+FEATURES.define('width_to_height', ['Width', 'Height'], lambda W, H: W / H)
+
+FEATURES.define('length_squared', ['L2'], lambda L2: L2)
+FEATURES.define('width_squared', ['W2'], lambda W2: W2)
+FEATURES.define('height_squared', ['H2'], lambda H2: H2)
+
+# Sample standard deviation (ddof=1) across the three dimensions
+FEATURES.intermediate('mean_dimension', ['total_dimension'], lambda total: total / 3)
+FEATURES.define('dimension_std', ['Length', 'Width', 'Height', 'mean_dimension'],
+                lambda L, W, H, m: np.sqrt(((L - m) ** 2 + (W - m) ** 2 + (H - m) ** 2) / 2))
+
+FEATURES.define('base_area_to_height', ['base_area', 'Height'], lambda LW, H: LW / H)
+FEATURES.define('log_weight', ['Weight'], lambda Wt: np.log(Wt + 1))
+
+FEATURES.define('cubed_length', ['L2', 'Length'], lambda L2, L: L2 * L)
+FEATURES.define('cubed_width', ['W2', 'Width'], lambda W2, W: W2 * W)
+FEATURES.define('cubed_height', ['H2', 'Height'], lambda H2, H: H2 * H)
+
+FEATURES.define('cube_root_volume', ['Volume'], np.cbrt)
+FEATURES.define('square_root_volume', ['Volume'], np.sqrt)
+
+FEATURES.define('weight*volume', ['Weight', 'Volume'], lambda Wt, V: Wt * V)
+FEATURES.define('weight*length', ['Weight', 'Length'], lambda Wt, L: Wt * L)
+
+FEATURES.define('length/(width+height)', ['Length', 'Width', 'Height'], lambda L, W, H: L / (W + H))
+FEATURES.define('width/(length+height)', ['Length', 'Width', 'Height'], lambda L, W, H: W / (L + H))
+FEATURES.define('height/(length+width)', ['Length', 'Width', 'Height'], lambda L, W, H: H / (L + W))
+
+# Same values as weight_to_volume; kept because the network was trained on both
+FEATURES.define('weight/volume', ['weight_to_volume'], lambda ratio: ratio)
+FEATURES.define('weight**2/volume', ['Weight', 'Volume'], lambda Wt, V: Wt * Wt / V)
+
+FEATURES.define('Surface_Area', ['base_area', 'Length', 'Width', 'Height'],
+                lambda LW, L, W, H: 2 * (LW + L * H + W * H))
+FEATURES.define('Diagonal', ['L2', 'W2', 'H2'], lambda L2, W2, H2: np.sqrt(L2 + W2 + H2))
+
+FEATURES.define('max_dimension', ['Length', 'Width', 'Height'], lambda L, W, H: np.fmax(np.fmax(L, W), H))
+FEATURES.define('min_dimension', ['Length', 'Width', 'Height'], lambda L, W, H: np.fmin(np.fmin(L, W), H))
+FEATURES.define('dimension_range', ['max_dimension', 'min_dimension'], lambda hi, lo: hi - lo)
+
+FEATURES.define('total_dimension', ['Length', 'Width', 'Height'], lambda L, W, H: L + W + H)
+FEATURES.define('length_fraction', ['Length', 'total_dimension'], lambda L, total: L / total)
+FEATURES.define('width_fraction', ['Width', 'total_dimension'], lambda W, total: W / total)
+FEATURES.define('height_fraction', ['Height', 'total_dimension'], lambda H, total: H / total)
+
+FEATURES.define('weight_times_total_dimension', ['Weight', 'total_dimension'], lambda Wt, total: Wt * total)
+
+FEATURES.define('diff_length_width', ['Length', 'Width'], lambda L, W: np.abs(L - W))
+FEATURES.define('diff_length_height', ['Length', 'Height'], lambda L, H: np.abs(L - H))
+FEATURES.define('diff_width_height', ['Width', 'Height'], lambda W, H: np.abs(W - H))
+
+# Epsilon avoids division by zero
+FEATURES.define('SA_to_Volume', ['Surface_Area', 'Volume'], lambda SA, V: SA / (V + 1e-8))
+FEATURES.define('log_Surface_Area', ['Surface_Area'], lambda SA: np.log(SA + 1))
+FEATURES.define('log_SA_to_Volume', ['SA_to_Volume'], lambda ratio: np.log(ratio + 1))
+
+# Order of the engineered features expected by standard_scaler.bin and the
+# network's numerical_input
+numerical_cols = list(FEATURES.outputs)
+
+def engineer_feature_matrix(length, width, height, weight, out=None):
+    """
+    Build the (n, len(numerical_cols)) float32 feature matrix from the raw
+    carton dimensions and weight; pass out to reuse a buffer across calls.
+    """
+    return FEATURES.compile()({'Length': length, 'Width': width, 'Height': height, 'Weight': weight}, out=out)
+
+def engineer_frame_features(df, out=None):
+    # Sources are looked up under any of their aliases ('Length' or 'Carton Length')
+    columns = FEATURES.resolve(df.columns)
+    return FEATURES.compile()({source: df[col] for source, col in columns.items()}, out=out)
+
+def feature_frame(df):
+    """
+    The model inputs for df as a DataFrame with numerical_cols columns and
+    df's index, computed exactly as at scoring time. Used for training.
+    """
+    return pd.DataFrame(engineer_frame_features(df), columns=numerical_cols, index=df.index)
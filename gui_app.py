@@ -13,14 +13,35 @@ from PyQt6.QtWidgets import (
     QSlider,
     QFrame,
     QSizePolicy,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QHeaderView
 )
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import (
+    Qt,
+    QSize,
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
+    pyqtSignal
+)
 from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QFontDatabase, QPixmap
-from model import predict_package_suspects
+from artifacts import registry
+from model import iter_package_suspects
+from prediction_cache import PredictionCache
+from profiling import StageProfile
+from scored_cartons import ScoredCartons
+from threshold_index import ThresholdIndex
+from validation import Quarantine, format_reasons
+import numpy as np
 import pandas as pd
+import threading
+import time
+
+# Process start reference for cold-start timing
+STARTUP_T0 = time.perf_counter()
 
 # Define color constants
 SYMBOTIC_GREEN = "#7AB80E"
@@ -50,6 +71,172 @@ class SectionFrame(QFrame):
     def layout(self):
         return self._layout
 
+# Delay before a burst of slider ticks is applied as one refilter
+REFILTER_DEBOUNCE_MS = 75
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+class PredictionWorker(QRunnable):
+    """
+    Scores a CSV off the UI thread, one streaming chunk at a time, so progress
+    can be reported and cancellation checked between chunks. The finished
+    signal carries a ThresholdIndex over the results, which are kept as
+    compact ScoredCartons chunk by chunk. Files already in the
+    prediction cache skip scoring entirely. Stage timings for the run are
+    collected in `profile`, rows failing input validation in `quarantine`.
+    """
+
+    def __init__(self, csv_path, threshold, cache=None):
+        super().__init__()
+        self.csv_path = csv_path
+        self.threshold = threshold
+        self.cache = cache
+        self.signals = WorkerSignals()
+        self.profile = StageProfile()
+        self.quarantine = Quarantine()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cached_results(self):
+        try:
+            return self.cache.get(self.csv_path, self.threshold)
+        except Exception as e:
+            print(f"Prediction cache unavailable: {e}")
+            return None
+
+    def store_results(self, results):
+        try:
+            # Category/Arrow columns write straight to dictionary-encoded Parquet
+            self.cache.put(self.csv_path, results.to_pandas(compact=True))
+        except Exception as e:
+            print(f"Could not cache predictions: {e}")
+
+    def build_index(self, results):
+        with self.profile.stage('gui_index', rows=len(results)):
+            return ThresholdIndex(results)
+
+    def run(self):
+        try:
+            if self.cache is not None:
+                with self.profile.stage('cache') as stage:
+                    cached = self.cached_results()
+                    stage.rows = 0 if cached is None else len(cached)
+                if cached is not None:
+                    self.signals.progress.emit(len(cached))
+                    self.signals.finished.emit(self.build_index(ScoredCartons.from_pandas(cached)))
+                    return
+            
+            chunks = []
+            rows = 0
+            for results in iter_package_suspects(self.csv_path, self.threshold, profile=self.profile,
+                                                 quarantine=self.quarantine):
+                if self._cancelled.is_set():
+                    self.signals.cancelled.emit()
+                    return
+                chunks.append(ScoredCartons.from_pandas(results))
+                rows += len(results)
+                self.signals.progress.emit(rows)
+            if self._cancelled.is_set():
+                self.signals.cancelled.emit()
+                return
+            results = ScoredCartons.concat(chunks)
+            if self.cache is not None:
+                with self.profile.stage('cache', rows=len(results)):
+                    self.store_results(results)
+            self.signals.finished.emit(self.build_index(results))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+class ResultsTableModel(QAbstractTableModel):
+    """
+    Read-only table model over the column arrays of a DataFrame or
+    ScoredCartons. Cells are only
+    formatted when the view asks for them, so just the visible rows are ever
+    materialized. Sorting reorders a row permutation with np.argsort instead
+    of going through QSortFilterProxyModel, whose lessThan would call back
+    into Python for every comparison. Columns with precomputed display
+    strings (passed as `display`) show those instead of a formatted value.
+    A `sort_provider(column, descending)` returning the row order can replace
+    the argsort when the data source has its own sort index.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = []
+        self._arrays = []
+        self._formatters = []
+        self._display = []
+        self._order = None
+        self._rows = 0
+        self.sort_provider = None
+
+    def set_dataframe(self, df, formatters=None, display=None, sort_provider=None):
+        formatters = formatters or {}
+        display = display or {}
+        self.beginResetModel()
+        self._columns = [str(col) for col in df.columns]
+        if isinstance(df, ScoredCartons):
+            self._arrays = [df.column(col) for col in df.columns]
+        else:
+            self._arrays = [df[col].to_numpy() for col in df.columns]
+        self._formatters = [formatters.get(col, str) for col in df.columns]
+        self._display = [display.get(col) for col in df.columns]
+        self.sort_provider = sort_provider
+        self._order = None
+        self._rows = len(df)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            row = index.row() if self._order is None else self._order[index.row()]
+            if self._display[index.column()] is not None:
+                return str(self._display[index.column()][row])
+            value = self._arrays[index.column()][row]
+            if value is None or value is pd.NA:
+                return ""
+            return self._formatters[index.column()](value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._columns[section]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if not 0 <= column < len(self._arrays):
+            return
+        descending = order == Qt.SortOrder.DescendingOrder
+        self.layoutAboutToBeChanged.emit()
+        if self.sort_provider is not None:
+            order_index = self.sort_provider(column, descending)
+        else:
+            values = self._arrays[column]
+            try:
+                order_index = np.argsort(values, kind='stable')
+            except TypeError:
+                # Mixed-type object columns: fall back to comparing as text
+                order_index = np.argsort(values.astype(str), kind='stable')
+            if descending:
+                order_index = order_index[::-1]
+        self._order = order_index
+        self.layoutChanged.emit()
+
 class CSVProcessorApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -57,7 +244,7 @@ class CSVProcessorApp(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
 
         # Add window icon
-        icon = QIcon("./Symbotic_Logo.png")
+        icon = QIcon(registry.path("Symbotic_Logo.png"))
         self.setWindowIcon(icon)
         # Also set the application-wide icon (shows in taskbar)
         app = QApplication.instance()
@@ -72,6 +259,15 @@ class CSVProcessorApp(QMainWindow):
         
         self.setup_ui()
 
+        # Load the model in the background so the window shows immediately;
+        # the first Process click only waits if warm-up hasn't finished yet
+        registry.warm_async(on_ready=self.on_artifacts_ready)
+
+    def on_artifacts_ready(self, timings):
+        # Runs on the warm-up thread, so only log here
+        breakdown = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+        print(f"Model artifacts ready ({breakdown})")
+
     def setup_ui(self):
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
@@ -137,7 +333,7 @@ class CSVProcessorApp(QMainWindow):
                 margin: -5px 0;
                 border-radius: 8px;
             }}
-            QTableWidget {{
+            QTableView {{
                 background-color: {SYMBOTIC_DARK};
                 color: white;
                 border: none;
@@ -145,11 +341,11 @@ class CSVProcessorApp(QMainWindow):
                 font-family: 'Cascadia Code', 'SF Mono', 'Consolas', monospace;
                 font-size: 13px;
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 8px;
                 border: none;
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {SYMBOTIC_GREEN};
             }}
             QHeaderView::section {{
@@ -341,6 +537,16 @@ class CSVProcessorApp(QMainWindow):
         """)
         stats_section.layout().addWidget(self.suspect_count_label)
         
+        # Per-stage timings of the last scoring run
+        self.profile_label = QLabel("")
+        self.profile_label.setStyleSheet(f"""
+            font-size: 12px;
+            color: {SYMBOTIC_LIGHT_GRAY};
+            margin-left: 2px;
+        """)
+        self.profile_label.setVisible(False)
+        stats_section.layout().addWidget(self.profile_label)
+        
         sidebar_layout.addWidget(stats_section)
         sidebar_layout.addStretch()  # This pushes everything up
         
@@ -357,7 +563,7 @@ class CSVProcessorApp(QMainWindow):
         bottom_logo.setFixedSize(160, 160)
         
         # Load and set the logo image
-        logo_path = "./Symbotic_Logo.png"
+        logo_path = registry.path("Symbotic_Logo.png")
         logo_pixmap = QPixmap(logo_path)
         bottom_logo.setPixmap(logo_pixmap.scaled(128, 128, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
         
@@ -405,9 +611,9 @@ class CSVProcessorApp(QMainWindow):
         content_layout.addWidget(header)
         
         # Create results table
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(0)
-        self.results_table.setRowCount(0)
+        self.results_model = ResultsTableModel(self)
+        self.results_table = QTableView()
+        self.results_table.setModel(self.results_model)
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.results_table.verticalHeader().setVisible(False)
         self.results_table.setSortingEnabled(True)
@@ -421,13 +627,23 @@ class CSVProcessorApp(QMainWindow):
         self.select_file_btn.clicked.connect(self.select_file)
         self.process_btn.clicked.connect(self.process_file)
         self.prob_slider.valueChanged.connect(self.update_probability_label)
-        self.prob_slider.valueChanged.connect(self.process_file)
+        self.prob_slider.valueChanged.connect(self.schedule_refilter)
         self.filter_suspects.stateChanged.connect(self.on_checkbox_changed)
         
+        # Slider ticks restart this timer, so only the last threshold in a
+        # burst of movement is applied
+        self.refilter_timer = QTimer(self)
+        self.refilter_timer.setSingleShot(True)
+        self.refilter_timer.setInterval(REFILTER_DEBOUNCE_MS)
+        self.refilter_timer.timeout.connect(self.apply_filters)
+        
         # Initialize variables
+        self.thread_pool = QThreadPool.globalInstance()
+        self.worker = None
+        self.results_index = None
+        self.prediction_cache = PredictionCache()
         self.selected_file = None
         self.process_btn.setEnabled(False)
-        self.current_results_df = None
 
         # After creating the controls, disable them initially
         self.filter_suspects.setEnabled(False)
@@ -446,66 +662,129 @@ class CSVProcessorApp(QMainWindow):
             self,
             "Select CSV File",
             "",
-            "CSV Files (*.csv);;All Files (*)"
+            "CSV Files (*.csv);;Parquet / Arrow Files (*.parquet *.pq *.arrow *.feather *.ipc);;All Files (*)"
         )
         
         if file_name:
+            self.cancel_worker()
             self.selected_file = file_name
+            self.results_index = None
             self.file_label.setText(f"Selected: {file_name}")
             self.process_btn.setEnabled(True)
             # Enable the filter controls
             self.filter_suspects.setEnabled(True)
             self.prob_slider.setEnabled(True)
     
-    def update_table(self, df):
-        self.results_table.setSortingEnabled(False)
-        
-        self.results_table.setRowCount(len(df))
-        self.results_table.setColumnCount(len(df.columns))
-        self.results_table.setHorizontalHeaderLabels(df.columns)
-        
-        for row in range(len(df)):
-            for col in range(len(df.columns)):
-                value = str(df.iloc[row, col])
-                item = QTableWidgetItem()
-                
-                if df.iloc[row, col] is not None:
-                    if isinstance(df.iloc[row, col], (int, float)):
-                        item.setData(Qt.ItemDataRole.DisplayRole, df.iloc[row, col])
-                    else:
-                        item.setText(value)
-                
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.results_table.setItem(row, col, item)
+    def update_table(self, df, formatters=None, display=None, sort_provider=None):
+        self.results_model.set_dataframe(df, formatters, display, sort_provider)
         
-        self.results_table.setSortingEnabled(True)
+        # Keep whatever column the user last sorted by
+        header = self.results_table.horizontalHeader()
+        if 0 <= header.sortIndicatorSection() < self.results_model.columnCount():
+            self.results_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
     
     def process_file(self):
+        if self.selected_file is None:
+            return  # Don't process if no file selected
+        
+        # While scoring, the Process button acts as Cancel
+        if self.worker is not None:
+            self.cancel_worker()
+            self.file_label.setText(f"Selected: {self.selected_file}")
+            return
+        
+        if self.results_index is not None:
+            self.apply_filters()
+            return
+        
+        self.worker = PredictionWorker(self.selected_file, threshold=0.5, cache=self.prediction_cache)
+        self.worker.signals.progress.connect(self.on_prediction_progress)
+        self.worker.signals.finished.connect(self.on_prediction_finished)
+        self.worker.signals.failed.connect(self.on_prediction_failed)
+        self.worker.signals.cancelled.connect(self.on_prediction_cancelled)
+        self.process_btn.setText("Cancel")
+        self.file_label.setText(f"Scoring: {self.selected_file}")
+        self.thread_pool.start(self.worker)
+    
+    def cancel_worker(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+            self.process_btn.setText("Process File")
+    
+    def is_current_worker(self):
+        # Signals from a cancelled or superseded worker are ignored
+        return self.worker is not None and self.sender() is self.worker.signals
+    
+    def on_prediction_progress(self, rows):
+        if self.is_current_worker():
+            self.file_label.setText(f"Scoring: {self.selected_file} ({rows:,} rows)")
+    
+    def on_prediction_finished(self, results_index):
+        if not self.is_current_worker():
+            return
+        self.show_profile(self.worker.profile)
+        quarantine = self.worker.quarantine
+        self.worker = None
+        self.process_btn.setText("Process File")
+        if quarantine.rows:
+            self.file_label.setText(f"Selected: {self.selected_file} ({quarantine.rows:,} invalid rows skipped: "
+                                    f"{format_reasons(quarantine.reasons)})")
+        else:
+            self.file_label.setText(f"Selected: {self.selected_file}")
+        self.results_index = results_index
+        self.apply_filters()
+    
+    def show_profile(self, profile):
+        total = profile.total_seconds
+        if not total:
+            self.profile_label.setVisible(False)
+            return
+        lines = [f"Stage timings ({total:.2f}s)"]
+        for name, stats in sorted(profile.stages.items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name}: {stats['seconds']:.2f}s ({stats['seconds'] / total * 100:.0f}%)")
+        self.profile_label.setText("\n".join(lines))
+        self.profile_label.setVisible(True)
+    
+    def on_prediction_failed(self, message):
+        if not self.is_current_worker():
+            return
+        self.worker = None
+        self.process_btn.setText("Process File")
+        self.file_label.setText(f"Error processing file: {message}")
+        print(f"Error processing file: {message}")
+    
+    def on_prediction_cancelled(self):
+        # The label is reset when cancelling; a cancelled worker that stops
+        # late must not overwrite a newer worker's status
+        if self.is_current_worker():
+            self.file_label.setText(f"Selected: {self.selected_file}")
+    
+    def schedule_refilter(self):
+        self.refilter_timer.start()
+    
+    def apply_filters(self):
         try:
-            if self.selected_file is None:
-                return  # Don't process if no file selected
+            if self.results_index is None:
+                return
             
-            if self.current_results_df is None:
-                self.current_results_df = predict_package_suspects(self.selected_file, threshold=0.5)
-            
-            results_df = self.current_results_df.copy()
-            
-            # Apply threshold filter first
             threshold = self.prob_slider.value() / 100.0
-            filtered_df = results_df[results_df['Probability'] >= threshold]
             
             # Always count suspect=1 entries regardless of checkbox
-            suspect_count = (filtered_df['Suspect'] == 1).sum()
+            suspect_count = self.results_index.suspect_count(threshold)
             self.suspect_count_label.setText(f"Suspect entries: {suspect_count}")
             
-            # Apply suspect filter if checkbox is checked
-            if self.filter_suspects.isChecked():
-                filtered_df = filtered_df[filtered_df['Suspect'] == 1]
+            # Threshold and suspect filters become a slice of the pre-sorted results;
+            # Probability stays numeric (so it sorts correctly) and is formatted per visible cell
+            results_index = self.results_index
+            rows = results_index.rows(threshold, suspects_only=self.filter_suspects.isChecked())
+            filtered = results_index.results.take(rows)
             
-            # Format probability as percentage
-            filtered_df['Probability'] = filtered_df['Probability'].apply(lambda x: f"{x*100:.2f}%")
+            def sort_provider(column, descending):
+                return results_index.sorted_positions(rows, filtered.columns[column], descending)
             
-            self.update_table(filtered_df)
+            self.update_table(filtered, display={'Probability': results_index.probability_text[rows]},
+                              sort_provider=sort_provider)
             
         except Exception as e:
             self.file_label.setText(f"Error processing file: {str(e)}")
@@ -519,12 +798,17 @@ class CSVProcessorApp(QMainWindow):
         else:
             # When showing all entries, allow full range 0-100
             self.prob_slider.setMinimum(0)
-        self.process_file()
+        self.apply_filters()
+    
+    def closeEvent(self, event):
+        self.cancel_worker()
+        super().closeEvent(event)
 
 def main():
     app = QApplication(sys.argv)
     window = CSVProcessorApp()
     window.show()
+    print(f"Window shown {time.perf_counter() - STARTUP_T0:.2f}s after start")
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -1,38 +1,190 @@
-import csv
+import argparse
+import glob
+import os
 import sys
-from model import process_csv_data
+import time
+from artifacts import BACKENDS
+from model import DEFAULT_CHUNK_SIZE, OUTPUT_EXTENSIONS, stream_package_suspects
+from profiling import StageProfile
+from parallel import score_files_parallel, stream_package_suspects_parallel
+from readers import INPUT_FORMATS
+from sku_memo import DEFAULT_STORE_DIR, ScoreStore
+from validation import Quarantine
 
-def read_csv_file(file_path):
+def parse_args(argv=None):
     """
-    Read CSV file and return list of dictionaries
+    Parse command line arguments
     """
-    try:
-        with open(file_path, 'r') as file:
-            csv_reader = csv.DictReader(file)
-            return list(csv_reader)
-    except FileNotFoundError:
-        print(f"Error: File '{file_path}' not found")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error reading CSV file: {e}")
-        sys.exit(1)
-
-def main():
-    # Check if file path is provided
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <csv_file_path>")
-        sys.exit(1)
-    
-    file_path = sys.argv[1]
-    
-    # Read CSV file
-    data = read_csv_file(file_path)
-    
-    # Process data
-    output = process_csv_data(data)
-    
-    # Print output
-    print(output)
+    parser = argparse.ArgumentParser(
+        description="Score carton exports (CSV, Parquet or Arrow IPC) for suspect freight without the GUI")
+    parser.add_argument("inputs", nargs="+",
+                        help="CSV/Parquet/Arrow files, glob patterns (quote them) or directories of them")
+    parser.add_argument("-o", "--output",
+                        help="Output path for a single input ('-' writes CSV to stdout)")
+    parser.add_argument("--output-dir",
+                        help="Directory for <name>_suspects.<format> outputs (default: next to each input)")
+    parser.add_argument("--format", choices=sorted(OUTPUT_EXTENSIONS), default=None,
+                        help="Output format (default: from --output's extension, else csv)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Suspect probability cutoff")
+    parser.add_argument("--batch-size", type=int, default=512, help="Rows per model.predict batch")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows read, engineered and scored at a time")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras",
+                        help="Inference engine (numpy variants do not need TensorFlow; int8 needs an exported "
+                             "quantized_backend.py model)")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Score each distinct dimension/weight/category tuple only once")
+    parser.add_argument("--score-store", metavar="DIR", nargs="?", const=True,
+                        help="Reuse and extend the persistent tuple->probability store (implies --dedupe)")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const=True,
+                        help="Print per-stage timings to stderr; also write them to FILE "
+                             "(Prometheus text for .prom/.txt, JSON otherwise)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="Measure each stage's own peak allocation with tracemalloc (slower)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes: files are spread across them, or a single file is split by rows")
+    return parser.parse_args(argv)
+
+def expand_inputs(patterns):
+    """
+    Resolve files, globs and directories to an ordered list of unique paths
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(path for path in glob.glob(os.path.join(pattern, '*'))
+                             if os.path.splitext(path)[1].lower() in INPUT_FORMATS)
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]  # missing files are reported when scored
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+def output_format_for(args):
+    if args.format:
+        return args.format
+    if args.output and args.output.lower().endswith('.parquet'):
+        return 'parquet'
+    return 'csv'
+
+def output_path_for(input_path, args, output_format):
+    if args.output:
+        return sys.stdout if args.output == '-' else args.output
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    directory = args.output_dir or os.path.dirname(input_path)
+    return os.path.join(directory, f"{stem}_suspects{OUTPUT_EXTENSIONS[output_format]}")
+
+def rejects_path_for(input_path, output):
+    # Rows that fail validation go next to the results (next to the input for stdout)
+    if output is sys.stdout:
+        stem = os.path.splitext(input_path)[0]
+    else:
+        stem = os.path.splitext(output)[0]
+        if stem.endswith('_suspects'):
+            stem = stem[:-len('_suspects')]
+    return f"{stem}_rejects.csv"
+
+def score_one(path, output, args, output_format, store, profile=None):
+    options = dict(
+        threshold=args.threshold,
+        batch_size=args.batch_size,
+        backend=args.backend,
+        dedupe=args.dedupe,
+        output_format=output_format,
+        quarantine=Quarantine(rejects_path_for(path, output), replace=True),
+    )
+    if args.workers > 1:
+        # Single file across processes: newline-aligned byte-range shards
+        return stream_package_suspects_parallel(path, output, workers=args.workers, **options)
+    return stream_package_suspects(path, output, chunk_size=args.chunk_size, store=store, profile=profile,
+                                   **options)
+
+def run_jobs(jobs, args, output_format, profile=None):
+    """
+    Score (input, output) jobs, yielding (input, output, rows, seconds, error)
+    in input order
+    """
+    if args.workers > 1 and len(jobs) > 1:
+        # Many files: one whole file per worker task
+        outputs = dict(jobs)
+        rejects_paths = {path: rejects_path_for(path, output) for path, output in jobs}
+        for path, rows, seconds, error in score_files_parallel(
+                jobs, args.threshold, workers=args.workers, batch_size=args.batch_size,
+                backend=args.backend, dedupe=args.dedupe, output_format=output_format,
+                rejects_paths=rejects_paths):
+            yield path, outputs[path], rows, seconds, error
+        return
+
+    store = None
+    for path, output in jobs:
+        start = time.perf_counter()
+        try:
+            if args.score_store and store is None:
+                store_dir = DEFAULT_STORE_DIR if args.score_store is True else args.score_store
+                store = ScoreStore(store_dir, backend=args.backend)
+            rows = score_one(path, output, args, output_format, store, profile)
+        except FileNotFoundError:
+            yield path, output, 0, time.perf_counter() - start, f"File '{path}' not found"
+            continue
+        except Exception as e:
+            yield path, output, 0, time.perf_counter() - start, str(e)
+            continue
+        yield path, output, rows, time.perf_counter() - start, None
+
+def main(argv=None):
+    args = parse_args(argv)
+    inputs = expand_inputs(args.inputs)
+    output_format = output_format_for(args)
+
+    if not inputs:
+        print("Error: no input files matched", file=sys.stderr)
+        sys.exit(2)
+    if args.output and len(inputs) > 1:
+        print("Error: --output takes a single input; use --output-dir for several", file=sys.stderr)
+        sys.exit(2)
+    if args.output == '-' and output_format != 'csv':
+        print("Error: only CSV can be written to stdout", file=sys.stderr)
+        sys.exit(2)
+    if args.workers > 1 and args.score_store:
+        print("Error: --score-store cannot be shared between --workers processes", file=sys.stderr)
+        sys.exit(2)
+    if args.workers > 1 and (args.profile or args.profile_memory):
+        print("Error: --profile is only available without --workers", file=sys.stderr)
+        sys.exit(2)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = [(path, output_path_for(path, args, output_format)) for path in inputs]
+    outputs = [output for _, output in jobs if output is not sys.stdout]
+    if len(set(outputs)) < len(outputs):
+        print("Error: several inputs would write the same output file (same name, different format?)",
+              file=sys.stderr)
+        sys.exit(2)
+    failures = 0
+    total_rows = 0
+    total_seconds = 0.0
+    profile = StageProfile(trace_memory=args.profile_memory) if args.profile or args.profile_memory else None
+    for path, output, rows, seconds, error in run_jobs(jobs, args, output_format, profile):
+        if error is not None:
+            failures += 1
+            print(f"Error scoring '{path}': {error}", file=sys.stderr)
+            continue
+        total_rows += rows
+        total_seconds += seconds
+        destination = 'stdout' if output is sys.stdout else output
+        print(f"{path}: {rows:,} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:,.0f} rows/s) -> {destination}",
+              file=sys.stderr)
+
+    print(f"Scored {len(inputs) - failures}/{len(inputs)} files, {total_rows:,} rows in {total_seconds:.2f}s",
+          file=sys.stderr)
+    if profile is not None:
+        print(profile.format(), file=sys.stderr)
+        if isinstance(args.profile, str):
+            profile.dump(args.profile)
+    sys.exit(1 if failures else 0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,150 +1,282 @@
+import itertools
+import os
+import sys
+from contextlib import ExitStack
+
 import pandas as pd
 import numpy as np
-from tensorflow import keras
-from joblib import load
-model = keras.models.load_model('neural_net_model.h5', compile=False)
-label_encoders = load('label_encoders.bin')
-scaler = load('standard_scaler.bin')
-
-categorical_cols = list(label_encoders.keys())
-numerical_cols = [
-    'Length', 'Width', 'Height', 'Weight',
-    'Volume',
-    'weight_to_volume',
-    'length_to_width', 'length_to_height', 'width_to_height',
-    'length_squared', 'width_squared', 'height_squared',
-    'dimension_std',
-    'base_area_to_height',
-    'log_weight',
-    'cubed_length', 'cubed_width', 'cubed_height',
-    'cube_root_volume', 'square_root_volume',
-    'weight*volume',
-    'weight*length',
-    'length/(width+height)', 'width/(length+height)', 'height/(length+width)',
-    'weight/volume',
-    'weight**2/volume',
-    'Surface_Area',
-    'Diagonal',
-    'max_dimension', 'min_dimension', 'dimension_range',
-    'total_dimension',
-    'length_fraction', 'width_fraction', 'height_fraction',
-    'weight_times_total_dimension',
-    'diff_length_width', 'diff_length_height', 'diff_width_height',
-    'SA_to_Volume',
-        'log_Surface_Area',
-        'log_SA_to_Volume'
-    ]
-
-def predict_package_suspects(csv_path, threshold, batch_size=512):
-    # Load model
-
-    # Read and preprocess CSV
-    print("Reading CSV...")
-    df = pd.read_csv(csv_path)
-
-    # Feature engineering
-    #Volume
-    df['Volume'] = df['Length']*df['Width']*df['Height']
-    #Weight/Volume Ratio
-    df['weight_to_volume'] = df['Weight']/df['Volume']
-    #Dimension Ratios
-    df['length_to_width'] = df['Length']/df['Width']
-    df['length_to_height'] = df['Length']/df['Height']
-    df['width_to_height'] = df['Width']/df['Height']
-
-    df['length_squared'] = df['Length']**2
-    df['width_squared'] = df['Width']**2
-    df['height_squared'] = df['Height']**2
-
-
-    df['dimension_std'] = df[['Length', 'Width', 'Height']].std(axis=1)
-
-    df['base_area_to_height'] = (df['Length']*df['Width'])/df['Height']
-
-    df['log_weight'] = np.log(df['Weight']+1)
-
-    df['cubed_length'] = df['Length']**3
-    df['cubed_width'] = df['Width']**3
-    df['cubed_height'] = df['Height']**3
-
-    df['cube_root_volume'] = df['Volume']**(1/3)
-
-    df['square_root_volume'] = df['Volume']**(1/2)
-
-    df['weight*volume'] = df['Weight']*df['Volume']
-
-    df['weight*length'] = df['Weight']*df['Length']
-
-    df['length/(width+height)'] = df['Length'] / (df['Width'] + df['Height'])
-    df['width/(length+height)'] = df['Width'] / (df['Length'] + df['Height'])
-    df['height/(length+width)'] = df['Height'] / (df['Length'] + df['Width'])
-
-    df['weight/volume'] = df['Weight']/df['Volume']
-
-    df['weight**2/volume'] = (df['Weight']**2)/df['Volume']
-
-    # Surface Area
-    df['Surface_Area'] = 2 * (
-        df['Length'] * df['Width'] +
-        df['Length'] * df['Height'] +
-        df['Width'] * df['Height']
-    )
-
-    # Diagonal Length
-    df['Diagonal'] = np.sqrt(
-        df['Length']**2 + df['Width']**2 + df['Height']**2
-    )
-
-    # Dimension Comparison Features
-
-    # Max, Min, and Range of Dimensions
-    df['max_dimension'] = df[['Length', 'Width', 'Height']].max(axis=1)
-    df['min_dimension'] = df[['Length', 'Width', 'Height']].min(axis=1)
-    df['dimension_range'] = df['max_dimension'] - df['min_dimension']
-
-    # Fractions of Dimensions
-    df['total_dimension'] = df['Length'] + df['Width'] + df['Height']
-    df['length_fraction'] = df['Length'] / df['total_dimension']
-    df['width_fraction'] = df['Width'] / df['total_dimension']
-    df['height_fraction'] = df['Height'] / df['total_dimension']
-    # Composite & Interaction Features
-    df['weight_times_total_dimension'] = df['Weight'] * df['total_dimension']
-
-    # Differences Between Dimensions
-    df['diff_length_width'] = abs(df['Length'] - df['Width'])
-    df['diff_length_height'] = abs(df['Length'] - df['Height'])
-    df['diff_width_height'] = abs(df['Width'] - df['Height'])
-    # Efficiency Metrics
-    df['SA_to_Volume'] = df['Surface_Area'] / (df['Volume'] + 1e-8)  # add epsilon to avoid division by 0
-
-    # Log transformations of composite features
-    df['log_Surface_Area'] = np.log(df['Surface_Area']+1)
-
-    df['log_SA_to_Volume'] = np.log(df['SA_to_Volume']+1)
-    """
-    # Ensure feature alignment
-    cat_inputs = []
-    for col in categorical_cols:
-        encoded = label_encoders[col].transform(df[col].astype(str)).reshape(-1,1)
-        cat_inputs.append(encoded)
-    
-    numerical_data = scaler.transform(df[numerical_cols].values)
-    cat_inputs.append(numerical_data)
-    """
+from artifacts import registry
+from features import engineer_frame_features, numerical_cols
+from profiling import NULL_PROFILE, resolve_profile
+from readers import iter_input, read_input
+from scored_cartons import ScoredCartons
+from sku_memo import format_stats, predict_deduplicated
+from validation import report_rejects, validate_frame
+
+# model, label_encoders, scaler and categorical_cols used to be loaded eagerly
+# at import; they are now served lazily from the artifact registry
+def __getattr__(name):
+    if name in ('model', 'label_encoders', 'scaler', 'categorical_cols'):
+        return getattr(registry, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Rows per chunk in streaming mode; a multiple of the default predict batch size
+# so chunked runs feed the network exactly the same batches as a full read
+DEFAULT_CHUNK_SIZE = 512 * 128
+
+def encode_categoricals(df, artifacts=registry, profile=NULL_PROFILE):
+    # One (n, 1) code column per categorical input of the artifacts' network
+    encoders = artifacts.encoders
     model_inputs = {}
-    for col in categorical_cols:
-        model_inputs[col] = label_encoders[col].transform(df[col].astype(str)).reshape(-1,1)
-    
-    
-    model_inputs["numerical_input"] = scaler.transform(df[numerical_cols].values)
-    
-    # Predict
+    with profile.stage('encoding', rows=len(df)):
+        for col in artifacts.categorical_cols:
+            encoder = encoders[col]
+            codes, unseen = encoder.transform(df[col])
+            model_inputs[col] = codes.reshape(-1,1)
+            if unseen:
+                print(f"Warning: {unseen} unseen '{col}' values scored as code "
+                      f"{encoder.unseen_code} ({encoder.classes[encoder.unseen_code]})", file=sys.stderr)
+    return model_inputs
+
+def load_artifacts(backend=None, profile=NULL_PROFILE):
+    """
+    Resolve the lazily loaded encoders and scaler, and given a backend its
+    predictor, which is returned. A cold load is timed as its own 'load'
+    stage, so the encoding, scaling and predict stages time only their work.
+    """
+    cold = not (registry.is_loaded('encoders') and registry.is_loaded('scaler')
+                and (backend is None or registry.predictor_loaded(backend)))
+    with (profile if cold else NULL_PROFILE).stage('load'):
+        registry.encoders, registry.scaler
+        return None if backend is None else registry.predictor(backend)
+
+def build_model_inputs(df, scaled=True, profile=NULL_PROFILE):
+    load_artifacts(profile=profile)
+    model_inputs = encode_categoricals(df, profile=profile)
+
+    with profile.stage('features', rows=len(df)):
+        features = engineer_frame_features(df)
+    with profile.stage('scaling', rows=len(df)):
+        model_inputs["numerical_input"] = registry.scaler.transform(features) if scaled else features
+    return model_inputs
+
+def predictor_inputs(df, predictor, profile=NULL_PROFILE):
+    # Fused artifacts take raw engineered features: their first layer does the scaling
+    return build_model_inputs(df, scaled=not getattr(predictor, 'fused_scaler', None), profile=profile)
+
+def predict_probabilities(df, batch_size=512, verbose="auto", backend='keras', profile=NULL_PROFILE):
+    predictor = load_artifacts(backend, profile)
+    model_inputs = predictor_inputs(df, predictor, profile)
+    with profile.stage('predict', rows=len(df)):
+        return predictor.predict(model_inputs, batch_size=batch_size, verbose=verbose).flatten()
+
+def predict_unscaled(model_inputs, batch_size=512, verbose="auto", backend='keras', profile=NULL_PROFILE):
+    # Score inputs built with scaled=False (e.g. from the feature cache)
+    predictor = load_artifacts(backend, profile)
+    rows = len(model_inputs['numerical_input'])
+    if not getattr(predictor, 'fused_scaler', None):
+        with profile.stage('scaling', rows=rows):
+            model_inputs = dict(model_inputs, numerical_input=registry.scaler.transform(model_inputs['numerical_input']))
+    with profile.stage('predict', rows=rows):
+        return predictor.predict(model_inputs, batch_size=batch_size, verbose=verbose).flatten()
+
+def format_results(df, preds, threshold, profile=NULL_PROFILE):
+    with profile.stage('output', rows=len(df)):
+        predicted_labels = (preds > threshold).astype(int)
+
+        # Format output
+        df['Suspect'] = predicted_labels
+        df['Probability'] = preds
+        return df[['SKU', 'DESCRIPTION','Suspect', 'Probability']]
+
+def score_frame(df, threshold, batch_size=512, verbose="auto", backend='keras', dedupe=False, store=None,
+                profile=None, quarantine=None):
+    """
+    Validate and score a frame of raw inputs. Rows that can't be scored are
+    left out of the results and go to quarantine (a validation.Quarantine),
+    or are just counted on stderr without one.
+    """
+    if store is not None and store.backend != backend:
+        raise ValueError(f"The score store holds {store.backend!r} scores; it can't serve backend {backend!r}")
+    profile = resolve_profile(profile)
+    df, rejects = validate_frame(df, profile)
+    report_rejects(rejects, quarantine)
+    # Predict; with dedupe (implied by a score store) only distinct model inputs are scored
+    if dedupe or store is not None:
+        # Load artifacts first so the time-saved estimate reflects scoring cost only
+        registry.scaler, registry.predictor(backend)
+        preds, stats = predict_deduplicated(
+            df, lambda unique: predict_probabilities(unique, batch_size, verbose, backend, profile), store)
+        print(format_stats(stats), file=sys.stderr)
+    else:
+        preds = predict_probabilities(df, batch_size, verbose, backend, profile)
+    return format_results(df, preds, threshold, profile)
+
+def score_with_features(csv_path, features, threshold, batch_size=512, backend='keras', profile=NULL_PROFILE,
+                        quarantine=None):
+    """
+    Score a whole file through a FeatureCache: a hit maps the stored feature
+    matrix and goes straight to scaling and predict; a miss reads, validates
+    and engineers the file as usual and stores the valid rows for next time
+    (rejected rows are reported on that first run only).
+    """
+    with profile.stage('feature_cache') as stage:
+        entry = features.get(csv_path)
+        stage.rows = 0 if entry is None else len(entry[0])
+    if entry is not None:
+        print("Loaded cached features...")
+        df, model_inputs = entry
+    else:
+        print("Reading file...")
+        with profile.stage('read') as stage:
+            df = read_input(csv_path)
+            stage.rows = len(df)
+        df, rejects = validate_frame(df, profile)
+        report_rejects(rejects, quarantine)
+        model_inputs = build_model_inputs(df, scaled=False, profile=profile)
+        with profile.stage('feature_cache', rows=len(df)):
+            features.put(csv_path, df, model_inputs)
+
     print("Generating predictions...")
-    preds = model.predict(model_inputs, batch_size=batch_size).flatten()
-    predicted_labels = (preds > threshold).astype(int)
-    
-    # Format output
-    df['Suspect'] = predicted_labels
-    df['Probability'] = preds
-
-    return df[['SKU', 'DESCRIPTION','Suspect', 'Probability']]
+    preds = predict_unscaled(model_inputs, batch_size, backend=backend, profile=profile)
+    return format_results(df, preds, threshold, profile)
+
+def predict_package_suspects(csv_path, threshold, batch_size=512, backend='keras', cache=None,
+                             dedupe=False, store=None, profile=None, features=None, compact=False, quarantine=None):
+    """
+    Score a whole file. With profile=True (or a StageProfile to accumulate
+    into) the per-stage breakdown is returned in results.attrs['profile'].
+    features, a FeatureCache, keeps the engineered inputs between runs so
+    re-scoring with another threshold or model skips reading and features.
+    compact=True returns a ScoredCartons instead of a DataFrame. Rows that
+    fail validation go to quarantine (a validation.Quarantine) if given.
+    """
+    if features is not None and (dedupe or store is not None):
+        # Deduplication keys on the raw input columns, which the feature cache doesn't keep
+        raise ValueError("features= cannot be combined with dedupe or a score store")
+    requested = profile
+    profile = resolve_profile(profile)
+    # Previously scored files are served from the prediction cache when given
+    if cache is not None:
+        with profile.stage('cache') as stage:
+            cached = cache.get(csv_path, threshold, backend)
+            stage.rows = 0 if cached is None else len(cached)
+        if cached is not None:
+            print("Loaded cached predictions...")
+            if profile.enabled:
+                cached.attrs['profile'] = profile
+            return ScoredCartons.from_pandas(cached) if compact else cached
+
+    if features is not None:
+        results = score_with_features(csv_path, features, threshold, batch_size, backend, profile, quarantine)
+    else:
+        # Read only the columns scoring needs (CSV, Parquet or Arrow IPC)
+        print("Reading file...")
+        with profile.stage('read') as stage:
+            df = read_input(csv_path)
+            stage.rows = len(df)
+
+        print("Generating predictions...")
+        results = score_frame(df, threshold, batch_size, backend=backend, dedupe=dedupe, store=store,
+                              profile=profile, quarantine=quarantine)
+    if store is not None:
+        store.save()
+    if cache is not None:
+        with profile.stage('cache', rows=len(results)):
+            cache.put(csv_path, results, backend)
+    if requested:
+        results.attrs['profile'] = profile
+    return ScoredCartons.from_pandas(results) if compact else results
+
+def iter_package_suspects(csv_path, threshold, batch_size=512, chunk_size=DEFAULT_CHUNK_SIZE, backend='keras',
+                          dedupe=False, store=None, profile=None, quarantine=None):
+    """
+    Score a CSV (or Parquet/Arrow IPC file) chunk_size rows at a time, yielding
+    one result frame per chunk. Only one chunk (and its engineered features) is
+    held in memory at once. Stage timings accumulate into profile if given.
+    """
+    profile = resolve_profile(profile)
+    chunks = iter_input(csv_path, chunk_size)
+    while True:
+        with profile.stage('read') as stage:
+            chunk = next(chunks, None)
+            stage.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        yield score_frame(chunk, threshold, batch_size, verbose=0, backend=backend, dedupe=dedupe, store=store,
+                          profile=profile, quarantine=quarantine)
+    if store is not None:
+        store.save()
+
+# Results formats write_results accepts, with their file extensions
+OUTPUT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet'}
+
+def write_results(output, output_format, stack):
+    """
+    Open a results sink on output (a path, or an open text file for CSV) and
+    return a function that appends one result chunk to it.
+    """
+    if output_format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+
+        def write_parquet(results):
+            nonlocal writer
+            # Identifier columns are written as strings so every chunk shares
+            # one schema, whatever dtype pandas inferred for that chunk
+            table = pa.Table.from_pandas(
+                results.astype({'SKU': 'string', 'DESCRIPTION': 'string'}), preserve_index=False)
+            if writer is None:
+                writer = stack.enter_context(pq.ParquetWriter(output, table.schema))
+            writer.write_table(table)
+        return write_parquet
+
+    if output_format != 'csv':
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {', '.join(OUTPUT_EXTENSIONS)}")
+    if isinstance(output, (str, os.PathLike)):
+        output = stack.enter_context(open(output, 'w', newline=''))
+    first = True
+
+    def write_csv(results):
+        nonlocal first
+        results.to_csv(output, header=first, index=False)
+        first = False
+    return write_csv
+
+def stream_package_suspects(csv_path, output, threshold, batch_size=512, chunk_size=DEFAULT_CHUNK_SIZE, backend='keras',
+                            dedupe=False, store=None, output_format='csv', profile=None, quarantine=None):
+    """
+    Score csv_path in chunks and append each chunk's results to output
+    (a path, or an open text file for CSV) as CSV or Parquet. Returns the
+    number of rows written.
+    """
+    profile = resolve_profile(profile)
+    chunks = iter_package_suspects(csv_path, threshold, batch_size, chunk_size, backend, dedupe, store, profile,
+                                   quarantine)
+    rows = write_stream(chunks, output, output_format, progress=True, profile=profile)
+    if quarantine is not None and quarantine.rows:
+        print(quarantine.summary(), file=sys.stderr)
+    return rows
+
+def write_stream(chunks, output, output_format='csv', progress=False, profile=NULL_PROFILE):
+    """
+    Write result chunks to output and return the number of rows written. The
+    output is only opened once the first chunk is in hand, so an input that
+    can't be read leaves no empty result file behind.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return 0
+    rows = 0
+    with ExitStack() as stack:
+        write = write_results(output, output_format, stack)
+        for results in itertools.chain([first], chunks):
+            with profile.stage('write', rows=len(results)):
+                write(results)
+            rows += len(results)
+            if progress:
+                print(f"Scored {rows} rows...", file=sys.stderr)
+    return rows
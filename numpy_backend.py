@@ -0,0 +1,330 @@
+"""
+TensorFlow-free inference for the suspect network.
+
+export_npz() reads the Keras .h5 file once (only h5py is needed) and writes the
+layer graph plus weights to a compact .npz. NumpyModel evaluates that graph
+with batched NumPy matmuls and mirrors the keras Model.predict call signature,
+so it can stand in for registry.model. Exported graphs record digests of the
+.h5 (and, once fused, the scaler parameters) they were built from, so the
+artifact registry can re-export them when the model is retrained.
+
+    python numpy_backend.py [model.h5] [model.npz] [--float16]
+    python numpy_backend.py --fuse-scaler [model.npz] [scaler.bin] [fused.npz]
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from disk_cache import file_digest
+
+GRAPH_KEY = '__graph__'
+
+SUPPORTED_LAYERS = {'InputLayer', 'Embedding', 'Flatten', 'Concatenate',
+                    'Dense', 'Dropout', 'BatchNormalization'}
+
+def _inbound_names(node):
+    # Keras 3 stores nodes as {'args': [...]} with __keras_tensor__ entries;
+    # Keras 2 stores them as nested [layer_name, node_index, tensor_index, kwargs]
+    names = []
+    if isinstance(node, dict):
+        if node.get('class_name') == '__keras_tensor__':
+            names.append(node['config']['keras_history'][0])
+        else:
+            for arg in node.get('args', []):
+                names.extend(_inbound_names(arg))
+    elif isinstance(node, list):
+        if len(node) >= 3 and isinstance(node[0], str) and isinstance(node[1], int):
+            names.append(node[0])
+        else:
+            for item in node:
+                names.extend(_inbound_names(item))
+    return names
+
+def _endpoint_names(endpoints):
+    # input_layers/output_layers is either [name, 0, 0] or a list of those
+    if endpoints and isinstance(endpoints[0], str):
+        return [endpoints[0]]
+    return [endpoint[0] for endpoint in endpoints]
+
+def _layer_weights(group):
+    weights = {}
+    for weight_name in group.attrs.get('weight_names', []):
+        if isinstance(weight_name, bytes):
+            weight_name = weight_name.decode()
+        key = weight_name.split('/')[-1].split(':')[0]
+        weights[key] = group[weight_name][()]
+    return weights
+
+def export_npz(h5_path, npz_path, dtype=np.float32):
+    """
+    Convert a Keras functional model saved as .h5 into a .npz holding the layer
+    graph (as JSON) and the weights needed for inference, in the given dtype.
+    """
+    import h5py
+
+    arrays = {}
+    layers = []
+    with h5py.File(h5_path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])['config']
+        weight_root = f['model_weights']
+        for layer in config['layers']:
+            cls = layer['class_name']
+            name = layer['config']['name']
+            if cls not in SUPPORTED_LAYERS:
+                raise NotImplementedError(f"Layer {name!r} of type {cls} is not supported")
+            inbound = []
+            for node in layer.get('inbound_nodes', []):
+                inbound.extend(_inbound_names(node))
+            weights = _layer_weights(weight_root[name]) if name in weight_root else {}
+            spec = {'name': name, 'class_name': cls, 'inbound': inbound}
+
+            if cls == 'Dense':
+                spec['activation'] = layer['config'].get('activation', 'linear')
+                arrays[f'{name}/kernel'] = weights['kernel']
+                if layer['config'].get('use_bias', True):
+                    arrays[f'{name}/bias'] = weights['bias']
+            elif cls == 'Embedding':
+                arrays[f'{name}/embeddings'] = weights['embeddings']
+            elif cls == 'BatchNormalization':
+                # Inference-mode batch norm is an affine map; precompute it
+                cfg = layer['config']
+                var = weights['moving_variance']
+                scale = 1.0 / np.sqrt(var.astype(np.float64) + cfg.get('epsilon', 1e-3))
+                if cfg.get('scale', True):
+                    scale = scale * weights['gamma']
+                shift = -weights['moving_mean'] * scale
+                if cfg.get('center', True):
+                    shift = shift + weights['beta']
+                arrays[f'{name}/scale'] = scale
+                arrays[f'{name}/shift'] = shift
+            elif cls == 'Concatenate':
+                spec['axis'] = layer['config'].get('axis', -1)
+            layers.append(spec)
+
+        graph = {
+            'inputs': _endpoint_names(config['input_layers']),
+            'outputs': _endpoint_names(config['output_layers']),
+            'layers': layers,
+            'source': {'model': file_digest(h5_path)},
+        }
+
+    arrays = {key: np.asarray(value, dtype=dtype) for key, value in arrays.items()}
+    arrays[GRAPH_KEY] = np.array(json.dumps(graph))
+    _save_npz(npz_path, arrays)
+    return npz_path
+
+def _save_npz(path, arrays):
+    # Written aside and moved into place, so worker processes re-exporting a
+    # stale graph at the same time never load a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+def scaler_digest(scaler):
+    # Digest of the fitted parameters fuse_scaler folds into the weights
+    digest = hashlib.blake2b(digest_size=20)
+    for values in (scaler.mean_, scaler.scale_):
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def export_source(npz_path):
+    """
+    The source digests recorded in an exported graph, or None if the file is
+    missing or predates them.
+    """
+    if not os.path.exists(npz_path):
+        return None
+    with np.load(npz_path, allow_pickle=False) as data:
+        return json.loads(str(data[GRAPH_KEY])).get('source')
+
+def _feature_width(graph, params, name):
+    # Width of the tensor a layer produces, for the layers that can feed the
+    # first Dense: inputs, flattened (length-1) embeddings and concatenations
+    layer = next(layer for layer in graph['layers'] if layer['name'] == name)
+    cls = layer['class_name']
+    if cls == 'Embedding':
+        return params[f'{name}/embeddings'].shape[1]
+    if cls in ('Flatten', 'Dropout'):
+        return _feature_width(graph, params, layer['inbound'][0])
+    if cls == 'Concatenate':
+        return sum(_feature_width(graph, params, inbound) for inbound in layer['inbound'])
+    raise NotImplementedError(f"Can't infer the width of {cls} layer {name!r}")
+
+def fuse_scaler(npz_path, scaler, fused_path, input_name='numerical_input'):
+    """
+    Fold a fitted StandardScaler into the first Dense layer fed by input_name:
+    ((x - mean) / scale) @ W + b == x @ (W / scale) + (b - (mean / scale) @ W).
+    The fused .npz takes raw engineered features on that input.
+    """
+    with np.load(npz_path, allow_pickle=False) as data:
+        graph = json.loads(str(data[GRAPH_KEY]))
+        params = {key: data[key] for key in data.files if key != GRAPH_KEY}
+    dtype = params[next(iter(params))].dtype
+
+    dense, offset = None, 0
+    for layer in graph['layers']:
+        if input_name not in layer['inbound']:
+            continue
+        if layer['class_name'] == 'Dense':
+            dense = layer
+        elif layer['class_name'] == 'Concatenate' and layer['axis'] in (-1, 1):
+            # Rows of the Dense kernel after the concat that belong to this input
+            position = layer['inbound'].index(input_name)
+            offset = sum(_feature_width(graph, params, inbound) for inbound in layer['inbound'][:position])
+            dense = next((consumer for consumer in graph['layers']
+                          if consumer['inbound'] == [layer['name']] and consumer['class_name'] == 'Dense'), None)
+        break
+    if dense is None:
+        raise NotImplementedError(f"{input_name!r} does not feed a Dense layer directly")
+
+    name = dense['name']
+    mean = np.asarray(scaler.mean_, dtype=np.float64)
+    scale = np.asarray(scaler.scale_, dtype=np.float64)
+    rows = slice(offset, offset + len(mean))
+    kernel = params[f'{name}/kernel'].astype(np.float64)
+    bias = params.get(f'{name}/bias', np.zeros(kernel.shape[1])).astype(np.float64)
+    bias = bias - (mean / scale) @ kernel[rows]
+    kernel[rows] = kernel[rows] / scale[:, None]
+    params[f'{name}/kernel'] = kernel.astype(dtype)
+    params[f'{name}/bias'] = bias.astype(dtype)
+
+    graph['fused_scaler'] = input_name
+    graph['source'] = dict(graph.get('source', {}), scaler=scaler_digest(scaler))
+    params[GRAPH_KEY] = np.array(json.dumps(graph))
+    _save_npz(fused_path, params)
+    return fused_path
+
+def _sigmoid(x):
+    with np.errstate(over='ignore'):
+        return 1.0 / (1.0 + np.exp(-x))
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'tanh': np.tanh,
+}
+
+class NumpyModel:
+    """
+    Evaluates a graph exported by export_npz. Parameters and activations are
+    held in `dtype` (float32 by default; float16 halves the footprint at some
+    cost in precision and speed, since NumPy has no float16 BLAS).
+    """
+
+    def __init__(self, graph, params, dtype=np.float32):
+        self.dtype = np.dtype(dtype)
+        self.input_names = graph['inputs']
+        self.output_names = graph['outputs']
+        self.layers = graph['layers']
+        # Name of the input whose StandardScaler is folded into the weights
+        # (see fuse_scaler); that input takes raw features
+        self.fused_scaler = graph.get('fused_scaler')
+        # Inputs that index Embedding tables: category codes, kept as integers
+        # (float16 can't represent codes above 2048 exactly)
+        inbound = {layer['name']: layer['inbound'] for layer in self.layers}
+        self.code_inputs = {name for layer in self.layers if layer['class_name'] == 'Embedding'
+                            for name in inbound[layer['name']] if name in self.input_names}
+        self.params = {key: value.astype(self.dtype) for key, value in params.items()}
+        for layer in self.layers:
+            if layer['class_name'] == 'Dense' and layer['activation'] not in ACTIVATIONS:
+                raise NotImplementedError(f"Activation {layer['activation']!r} is not supported")
+
+    @classmethod
+    def load(cls, npz_path, dtype=np.float32):
+        with np.load(npz_path, allow_pickle=False) as data:
+            graph = json.loads(str(data[GRAPH_KEY]))
+            params = {key: data[key] for key in data.files if key != GRAPH_KEY}
+        return cls(graph, params, dtype=dtype)
+
+    def _run(self, inputs):
+        values = {}
+        p = self.params
+        for layer in self.layers:
+            name = layer['name']
+            cls = layer['class_name']
+            args = [values[inbound] for inbound in layer['inbound']]
+            if cls == 'InputLayer':
+                out = inputs[name]
+            elif cls == 'Embedding':
+                ids = args[0].astype(np.intp, copy=False)
+                out = p[f'{name}/embeddings'][ids]
+            elif cls == 'Flatten':
+                out = args[0].reshape(len(args[0]), -1)
+            elif cls == 'Concatenate':
+                out = np.concatenate(args, axis=layer['axis'])
+            elif cls == 'Dense':
+                out = args[0] @ p[f'{name}/kernel']
+                if f'{name}/bias' in p:
+                    out += p[f'{name}/bias']
+                out = ACTIVATIONS[layer['activation']](out)
+            elif cls == 'BatchNormalization':
+                out = args[0] * p[f'{name}/scale'] + p[f'{name}/shift']
+            else:  # Dropout is the identity at inference time
+                out = args[0]
+            values[name] = out
+        # Probabilities come back as float32 whatever the compute dtype, as from
+        # keras; float16 has no Parquet type and would leak into results files
+        return values[self.output_names[0]].astype(np.float32, copy=False)
+
+    def _coerce_inputs(self, x):
+        if not isinstance(x, dict):
+            x = dict(zip(self.input_names, x if isinstance(x, (list, tuple)) else [x]))
+        return {name: self._code_input(x[name]) if name in self.code_inputs else np.asarray(x[name], dtype=self.dtype)
+                for name in self.input_names}
+
+    @staticmethod
+    def _code_input(value):
+        value = np.asarray(value)
+        return value if np.issubdtype(value.dtype, np.integer) else value.astype(np.intp)
+
+    def predict(self, x, batch_size=None, verbose=None):
+        """
+        Same contract as keras Model.predict for this network: x is a dict (or
+        list) of input arrays, the result is an (n, 1) array. verbose is
+        accepted for call compatibility and ignored.
+        """
+        inputs = self._coerce_inputs(x)
+        n = len(next(iter(inputs.values())))
+        if not batch_size or batch_size >= n:
+            return self._run(inputs)
+        out = None
+        for start in range(0, n, batch_size):
+            batch = {name: value[start:start + batch_size] for name, value in inputs.items()}
+            result = self._run(batch)
+            if out is None:
+                out = np.empty((n,) + result.shape[1:], dtype=result.dtype)
+            out[start:start + batch_size] = result
+        return out
+
+    def predict_on_batch(self, x):
+        return self._run(self._coerce_inputs(x))
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    if '--fuse-scaler' in args:
+        from joblib import load
+        args.remove('--fuse-scaler')
+        npz_path = args[0] if len(args) > 0 else 'neural_net_model.npz'
+        scaler_path = args[1] if len(args) > 1 else 'standard_scaler.bin'
+        fused_path = args[2] if len(args) > 2 else npz_path.rsplit('.', 1)[0] + '_fused.npz'
+        fuse_scaler(npz_path, load(scaler_path), fused_path)
+        print(f"Fused {scaler_path} into {npz_path} -> {fused_path}")
+        return
+    dtype = np.float32
+    if '--float16' in args:
+        args.remove('--float16')
+        dtype = np.float16
+    h5_path = args[0] if len(args) > 0 else 'neural_net_model.h5'
+    npz_path = args[1] if len(args) > 1 else h5_path.rsplit('.', 1)[0] + '.npz'
+    export_npz(h5_path, npz_path, dtype=dtype)
+    print(f"Exported {h5_path} -> {npz_path}")
+
+if __name__ == "__main__":
+    main()
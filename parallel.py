@@ -0,0 +1,212 @@
+"""
+Multi-process scoring. Large files are split into shards that workers read
+and score independently (newline-aligned byte ranges for CSV, runs of row
+groups or record batches for Parquet and Arrow IPC); many files are spread
+across workers whole. Every worker loads the artifacts once, in its initializer, and
+results come back in input order. Rows rejected by validation come back with
+each shard and are renumbered to their position in the whole file.
+
+Byte-range sharding assumes no quoted field spans a line break, which holds
+for the carton exports.
+"""
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import multiprocessing
+
+import pandas as pd
+
+from artifacts import registry
+from readers import arrow_frame, column_map, input_format_for, read_csv_frame
+from model import score_frame, stream_package_suspects, write_stream
+from validation import Quarantine, report_rejects
+
+DEFAULT_SHARD_BYTES = 64 * 1024 ** 2
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                   'TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS')
+
+def default_workers():
+    return os.cpu_count() or 1
+
+@contextmanager
+def _worker_thread_limit(workers):
+    # Split the cores between workers so BLAS/TensorFlow thread pools in each
+    # process don't oversubscribe the machine; spawned children inherit this
+    threads = str(max(1, default_workers() // workers))
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: threads for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def _init_worker(backend):
+    registry.scaler
+    registry.encoders
+    registry.predictor(backend)
+
+@contextmanager
+def worker_pool(workers, backend='keras'):
+    # spawn rather than fork: the parent may already have TensorFlow loaded
+    with _worker_thread_limit(workers):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(backend,)) as executor:
+            yield executor
+
+def _ordered_results(executor, fn, arg_tuples, window):
+    # Keep at most `window` tasks in flight so finished shards don't pile up
+    pending = deque()
+    for args in arg_tuples:
+        pending.append(executor.submit(fn, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def byte_ranges(csv_path, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Return the header line and the (start, end) byte offsets of shards of
+    roughly shard_bytes, each ending on a line boundary.
+    """
+    size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        ranges = []
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + shard_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+def _score_shard(df, threshold, batch_size, backend, dedupe):
+    # (results, rejects, rows read); rejects are numbered within the shard
+    rows = len(df)
+    quarantine = Quarantine()
+    results = score_frame(df, threshold, batch_size, verbose=0, backend=backend, dedupe=dedupe,
+                          quarantine=quarantine)
+    return results, quarantine.frame(), rows
+
+def _score_byte_range(csv_path, header, start, end, threshold, batch_size, backend, dedupe):
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = read_csv_frame(io.BytesIO(header + data))
+    return _score_shard(df, threshold, batch_size, backend, dedupe)
+
+def arrow_pieces(path, input_format, shard_bytes=DEFAULT_SHARD_BYTES):
+    """
+    Group a Parquet file's row groups (or an Arrow IPC file's record batches)
+    into runs of roughly shard_bytes, returned as lists of indices.
+    """
+    if input_format == 'parquet':
+        import pyarrow.parquet as pq
+        metadata = pq.ParquetFile(path).metadata
+        sizes = [metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups)]
+    else:
+        import pyarrow as pa
+        count = pa.ipc.open_file(pa.memory_map(path)).num_record_batches
+        sizes = [os.path.getsize(path) / max(count, 1)] * count
+    pieces, current, current_bytes = [], [], 0
+    for i, size in enumerate(sizes):
+        current.append(i)
+        current_bytes += size
+        if current_bytes >= shard_bytes:
+            pieces.append(current)
+            current, current_bytes = [], 0
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _score_arrow_pieces(path, input_format, pieces, threshold, batch_size, backend, dedupe):
+    import pyarrow as pa
+    if input_format == 'parquet':
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        table = parquet.read_row_groups(pieces, columns=list(column_map(parquet.schema_arrow.names)))
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        table = pa.Table.from_batches([reader.get_batch(i) for i in pieces], schema=reader.schema)
+    df = arrow_frame(table)
+    return _score_shard(df, threshold, batch_size, backend, dedupe)
+
+def iter_package_suspects_parallel(csv_path, threshold, workers=None, batch_size=512, backend='keras',
+                                   dedupe=False, shard_bytes=DEFAULT_SHARD_BYTES, quarantine=None):
+    """
+    Score one CSV (or Parquet/Arrow IPC file) across worker processes,
+    yielding shard results in file order. Rejected rows go to quarantine.
+    """
+    workers = workers or default_workers()
+    input_format = input_format_for(csv_path)
+    if input_format == 'csv':
+        header, ranges = byte_ranges(csv_path, shard_bytes)
+        score = _score_byte_range
+        tasks = ((csv_path, header, start, end, threshold, batch_size, backend, dedupe) for start, end in ranges)
+    else:
+        score = _score_arrow_pieces
+        tasks = ((csv_path, input_format, pieces, threshold, batch_size, backend, dedupe)
+                 for pieces in arrow_pieces(csv_path, input_format, shard_bytes))
+    offset = 0
+    with worker_pool(workers, backend) as executor:
+        for results, rejects, rows in _ordered_results(executor, score, tasks, window=2 * workers):
+            if len(rejects):
+                rejects['row'] += offset
+                report_rejects(rejects, quarantine)
+            offset += rows
+            yield results
+
+def predict_package_suspects_parallel(csv_path, threshold, workers=None, batch_size=512, backend='keras',
+                                      dedupe=False, shard_bytes=DEFAULT_SHARD_BYTES, quarantine=None):
+    shards = list(iter_package_suspects_parallel(csv_path, threshold, workers, batch_size, backend,
+                                                 dedupe, shard_bytes, quarantine))
+    if not shards:
+        return pd.DataFrame(columns=['SKU', 'DESCRIPTION', 'Suspect', 'Probability'])
+    return pd.concat(shards, ignore_index=True)
+
+def stream_package_suspects_parallel(csv_path, output, threshold, workers=None, batch_size=512, backend='keras',
+                                     dedupe=False, output_format='csv', shard_bytes=DEFAULT_SHARD_BYTES,
+                                     quarantine=None):
+    chunks = iter_package_suspects_parallel(csv_path, threshold, workers, batch_size, backend, dedupe, shard_bytes,
+                                            quarantine)
+    rows = write_stream(chunks, output, output_format)
+    if quarantine is not None and quarantine.rows:
+        print(quarantine.summary(), file=sys.stderr)
+    return rows
+
+def _score_file(csv_path, output, rejects_path, options):
+    start = time.perf_counter()
+    try:
+        quarantine = Quarantine(rejects_path, replace=True) if rejects_path else None
+        rows = stream_package_suspects(csv_path, output, quarantine=quarantine, **options)
+    except FileNotFoundError:
+        return csv_path, 0, time.perf_counter() - start, f"File '{csv_path}' not found"
+    except Exception as e:
+        return csv_path, 0, time.perf_counter() - start, str(e)
+    return csv_path, rows, time.perf_counter() - start, None
+
+def score_files_parallel(jobs, threshold, workers=None, batch_size=512, backend='keras', dedupe=False,
+                         output_format='csv', rejects_paths=None):
+    """
+    Score (csv_path, output_path) jobs with one whole file per task. Yields
+    (csv_path, rows, seconds, error) in job order; error is None on success.
+    rejects_paths maps csv_path to where its rejected rows are written.
+    """
+    rejects_paths = rejects_paths or {}
+    workers = workers or default_workers()
+    options = {'threshold': threshold, 'batch_size': batch_size, 'backend': backend,
+               'dedupe': dedupe, 'output_format': output_format}
+    tasks = ((csv_path, output, rejects_paths.get(csv_path), options) for csv_path, output in jobs)
+    with worker_pool(workers, backend) as executor:
+        yield from _ordered_results(executor, _score_file, tasks, window=2 * workers)
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import uuid
+
+import pandas as pd
+
+from artifacts import BACKENDS, registry
+from disk_cache import DEFAULT_CACHE_DIR, DiskCache, file_digest
+from feature_cache import feature_fingerprint
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+CACHED_COLUMNS = ['SKU', 'DESCRIPTION', 'Probability']
+
+def artifact_fingerprint(artifacts=registry, backend='keras', digest_file=file_digest):
+    """
+    Hash of everything that affects a prediction: model, encoders, scaler and
+    the SavedModel fingerprint when present, the unseen-value code, the
+    feature and validation code, and the backend with the artifact it runs
+    (its .npz or .tflite), since backends don't score identically.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    paths = [artifacts.model_file, artifacts.encoders_file, artifacts.scaler_file,
+             os.path.join('neural_net_model', 'fingerprint.pb'), artifacts.backend_file(backend)]
+    for relative in paths:
+        path = artifacts.path(relative)
+        if os.path.exists(path):
+            digest.update(relative.encode())
+            digest.update(digest_file(path).encode())
+    # The reserved code for unseen categories changes those rows' scores too
+    digest.update(f"unseen_code={artifacts.unseen_code}".encode())
+    digest.update(f"features={feature_fingerprint(artifacts)}".encode())
+    digest.update(f"backend={backend}".encode())
+    return digest.hexdigest()
+
+class PredictionCache(DiskCache):
+    """
+    On-disk cache of scored files, one Parquet file per (input content,
+    artifact fingerprint of the scoring backend). Suspect is recomputed from
+    Probability on load so any threshold can be served. Entries are evicted
+    least-recently-used once the directory exceeds max_bytes, and entries
+    that match no backend's current fingerprint are dropped whenever a new
+    result is stored.
+    """
+    suffix = '.parquet'
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, artifacts=registry):
+        super().__init__(cache_dir, max_bytes, artifacts)
+
+    def fingerprint(self, backend='keras'):
+        # Recomputed per call (file hashes are memoized by size and mtime), so an
+        # .npz exported or a .tflite replaced mid-session keys new entries
+        return artifact_fingerprint(self.artifacts, backend, self.digest)
+
+    def current_fingerprints(self):
+        return [self.fingerprint(backend) for backend in BACKENDS]
+
+    def entry_path(self, csv_path, backend='keras'):
+        return self.entry_name(self.fingerprint(backend), csv_path)
+
+    def get(self, csv_path, threshold, backend='keras'):
+        path = self.entry_path(csv_path, backend)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path)
+        os.utime(path)  # mark as recently used
+        df.insert(2, 'Suspect', (df['Probability'] > threshold).astype(int))
+        return df
+
+    def put(self, csv_path, results_df, backend='keras'):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(csv_path, backend)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            results_df[CACHED_COLUMNS].to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+        return path
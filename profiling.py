@@ -0,0 +1,168 @@
+"""
+Stage-level profiling for the scoring pipeline. Code under measurement wraps
+each stage in `with profile.stage('predict', rows=len(df)):`; a StageProfile
+accumulates wall time, calls, rows and peak memory per stage across chunks
+and files. Passing no profile gives NULL_PROFILE, whose stages are a shared
+no-op context manager, so instrumented code costs nothing measurable when
+profiling is off.
+
+By default each stage records the process's peak RSS so far
+('process_peak_bytes'): cheap, but a high-water mark for the whole process
+that never goes down, so it only shows which stage first pushed memory up.
+With trace_memory=True each stage's own peak allocation is measured with
+tracemalloc instead ('peak_bytes'), at a noticeable cost in speed.
+"""
+import json
+import resource
+import time
+import tracemalloc
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass  # `stage.rows = n` is accepted and dropped
+
+_NULL_STAGE = _NullStage()
+
+class NullProfile:
+    enabled = False
+
+    def stage(self, name, rows=None):
+        return _NULL_STAGE
+
+NULL_PROFILE = NullProfile()
+
+class _Stage:
+    __slots__ = ('profile', 'name', 'rows', 'start', 'traced_start')
+
+    def __init__(self, profile, name, rows):
+        self.profile = profile
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        if self.profile.trace_memory:
+            tracemalloc.reset_peak()
+            self.traced_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak = None
+        if self.profile.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] - self.traced_start
+        self.profile.record(self.name, seconds, self.rows, peak)
+        return False
+
+class StageProfile:
+    """
+    Per-stage totals: seconds, calls, rows, and peak memory in bytes.
+    """
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        # Named for what is measured: the stage's own peak, or the process's so far
+        self.memory_key = 'peak_bytes' if trace_memory else 'process_peak_bytes'
+        self.stages = {}
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name, rows=None):
+        return _Stage(self, name, rows)
+
+    def _stats(self, name):
+        if name not in self.stages:
+            self.stages[name] = {'seconds': 0.0, 'calls': 0, 'rows': 0, self.memory_key: 0}
+        return self.stages[name]
+
+    def record(self, name, seconds, rows=None, peak_bytes=None):
+        stats = self._stats(name)
+        stats['seconds'] += seconds
+        stats['calls'] += 1
+        stats['rows'] += rows or 0
+        if peak_bytes is None:
+            # ru_maxrss is in KiB on Linux
+            peak_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        stats[self.memory_key] = max(stats[self.memory_key], peak_bytes)
+
+    def merge(self, other):
+        if other.memory_key != self.memory_key:
+            raise ValueError("Can't merge profiles that measure memory differently (trace_memory)")
+        for name, stats in other.stages.items():
+            mine = self._stats(name)
+            mine['seconds'] += stats['seconds']
+            mine['calls'] += stats['calls']
+            mine['rows'] += stats['rows']
+            mine[self.memory_key] = max(mine[self.memory_key], stats[self.memory_key])
+        return self
+
+    @property
+    def total_seconds(self):
+        return sum(stats['seconds'] for stats in self.stages.values())
+
+    def as_dict(self):
+        return {
+            'total_seconds': self.total_seconds,
+            'peak_memory': 'tracemalloc' if self.trace_memory else 'process_rss',
+            'stages': {
+                name: dict(stats, rows_per_second=stats['rows'] / stats['seconds'] if stats['seconds'] else None)
+                for name, stats in self.stages.items()
+            },
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2)
+
+    def to_prometheus(self, prefix='suspect_genie_stage'):
+        # Prometheus text exposition format, one labelled series per stage
+        metrics = [
+            ('seconds_total', 'counter', 'Wall time spent in the stage', 'seconds'),
+            ('calls_total', 'counter', 'Times the stage ran', 'calls'),
+            ('rows_total', 'counter', 'Rows processed by the stage', 'rows'),
+            ('peak_bytes', 'gauge', 'Peak memory allocated by the stage (tracemalloc)', 'peak_bytes')
+            if self.trace_memory else
+            ('process_peak_bytes', 'gauge', 'Peak process RSS as of the end of the stage', 'process_peak_bytes'),
+        ]
+        lines = []
+        for suffix, kind, help_text, key in metrics:
+            name = f"{prefix}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, stats in self.stages.items():
+                lines.append(f'{name}{{stage="{stage}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # .prom/.txt get Prometheus text, anything else JSON
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def format(self):
+        total = self.total_seconds
+        width = max([10, *map(len, self.stages)])
+        label = 'peak' if self.trace_memory else 'process peak'
+        lines = []
+        for name, stats in self.stages.items():
+            share = stats['seconds'] / total * 100 if total else 0.0
+            rate = f"{stats['rows'] / stats['seconds']:,.0f} rows/s" if stats['rows'] and stats['seconds'] else ""
+            lines.append(f"{name:<{width}} {stats['seconds']:8.3f}s {share:5.1f}%  {rate:>18}  "
+                         f"{label} {stats[self.memory_key] / 1024 ** 2:,.0f} MB")
+        return "\n".join(lines)
+
+def resolve_profile(profile):
+    # None/False -> no-op profile; True -> a fresh StageProfile; else as given
+    if profile is None or profile is False:
+        return NULL_PROFILE
+    if profile is True:
+        return StageProfile()
+    return profile
@@ -0,0 +1,248 @@
+"""
+Post-training int8 quantization of the suspect network for CPU-only scoring.
+
+export_int8() converts the Keras model to TensorFlow Lite with int8 weights,
+scores a held-out slice of real exports with both models and writes a report
+(probability drift, suspect flags flipped at the threshold, throughput) next
+to the .tflite file. The model is only installed if its flags agree with the
+float model's on at least min_agreement of the rows. Int8Model runs the
+result through the TFLite interpreter with the keras Model.predict call
+signature and is the 'int8' backend of the artifact registry.
+
+By default activations are quantized per batch at run time (dynamic range).
+activations='int8' instead calibrates fixed int8 activation ranges on a
+representative slice; the scaled features span very different ranges (a few
+ratios reach 100+ standard deviations while most stay within 5), so a single
+input scale leaves the typical row a handful of levels and flags drift badly.
+
+    python quantized_backend.py exports/site_a.csv exports/site_b.parquet
+
+Exporting needs TensorFlow; scoring needs only an interpreter
+(tflite_runtime or ai_edge_litert, falling back to tf.lite).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CALIBRATION_ROWS = 2000
+DEFAULT_EVALUATION_ROWS = 50_000
+# Share of suspect flags at the threshold that must match the float model
+DEFAULT_MIN_AGREEMENT = 0.99
+ACTIVATION_MODES = ('dynamic', 'int8')
+
+def _interpreter_class():
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+class Int8Model:
+    """
+    TFLite interpreter wrapper with predict(x, batch_size, verbose) and
+    predict_on_batch(x), like the other backends. Inputs are matched to the
+    model's by name; the interpreter's float input/output tensors take
+    scaled features and return probabilities. Not thread-safe.
+    """
+
+    def __init__(self, tflite_path):
+        self.path = tflite_path
+        self.interpreter = _interpreter_class()(model_path=tflite_path)
+        self.interpreter.allocate_tensors()
+        self.inputs = self.interpreter.get_input_details()
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_rows = None
+
+    def _input_index(self, name):
+        # Converted signatures name inputs like 'serving_default_numerical_input:0'
+        for detail in self.inputs:
+            if detail['name'] == name or detail['name'].split(':')[0].endswith(name):
+                return detail['index']
+        raise KeyError(f"Model has no input named {name!r}")
+
+    def _run(self, inputs):
+        rows = len(next(iter(inputs.values())))
+        if rows != self._batch_rows:
+            for name, value in inputs.items():
+                self.interpreter.resize_tensor_input(self._input_index(name), [rows] + list(value.shape[1:]))
+            self.interpreter.allocate_tensors()
+            self._batch_rows = rows
+        for name, value in inputs.items():
+            self.interpreter.set_tensor(self._input_index(name), value)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output['index']).copy()
+
+    def _coerce_inputs(self, x):
+        dtypes = {detail['index']: detail['dtype'] for detail in self.inputs}
+        return {name: np.ascontiguousarray(value, dtype=dtypes[self._input_index(name)])
+                for name, value in x.items()}
+
+    def predict(self, x, batch_size=512, verbose=None):
+        inputs = self._coerce_inputs(x)
+        n = len(next(iter(inputs.values())))
+        batch_size = batch_size or n
+        out = np.empty((n, 1), dtype=np.float32)
+        for start in range(0, n, batch_size):
+            out[start:start + batch_size] = self._run({name: value[start:start + batch_size]
+                                                       for name, value in inputs.items()})
+        return out
+
+    def predict_on_batch(self, x):
+        return self._run(self._coerce_inputs(x))
+
+def _sample_inputs(paths, rows, seed):
+    # Read the scoring columns of every path and draw up to `rows` valid rows;
+    # rows validation rejects are never scored, so they neither calibrate nor evaluate
+    from readers import read_input
+    from validation import report_rejects, validate_frame
+    frames = [read_input(path) for path in paths]
+    df, rejects = validate_frame(pd.concat(frames, ignore_index=True))
+    report_rejects(rejects)
+    rng = np.random.default_rng(seed)
+    return df.iloc[rng.permutation(len(df))[:rows]].reset_index(drop=True)
+
+def _throughput(predictor, inputs, batch_size, repeat=3):
+    rows = len(next(iter(inputs.values())))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predictor.predict(inputs, batch_size=batch_size, verbose=0)
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+def export_int8(calibration_paths, tflite_path=None, calibration_rows=DEFAULT_CALIBRATION_ROWS,
+                evaluation_rows=DEFAULT_EVALUATION_ROWS, threshold=0.5, batch_size=512, seed=0,
+                activations='dynamic', min_agreement=DEFAULT_MIN_AGREEMENT):
+    """
+    Quantize the registry's Keras model to int8, evaluate it against the float
+    model on rows drawn from calibration_paths and return the report dict
+    (also written to <tflite_path>.report.json). Raises ValueError, leaving
+    any installed model in place, if flag agreement is below min_agreement.
+    """
+    import tensorflow as tf
+    from artifacts import registry
+    from model import build_model_inputs
+
+    if activations not in ACTIVATION_MODES:
+        raise ValueError(f"Unknown activations {activations!r}; expected one of {', '.join(ACTIVATION_MODES)}")
+    tflite_path = tflite_path or registry.path(registry.int8_model_file)
+    # Dynamic range needs no calibration rows; every sampled row evaluates
+    calibration_rows = calibration_rows if activations == 'int8' else 0
+    sample = _sample_inputs(calibration_paths, calibration_rows + evaluation_rows, seed)
+    calibration = build_model_inputs(sample.iloc[:calibration_rows]) if calibration_rows else None
+    evaluation = build_model_inputs(sample.iloc[calibration_rows:].reset_index(drop=True))
+    if not len(evaluation['numerical_input']):
+        raise ValueError(f"Need more than {calibration_rows} rows to both calibrate and evaluate")
+
+    model = registry.model
+    input_names = [tensor.name.split(':')[0] for tensor in model.inputs]
+
+    def representative_dataset():
+        for i in range(len(calibration['numerical_input'])):
+            yield [np.asarray(calibration[name][i:i + 1], dtype=np.float32) for name in input_names]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if activations == 'int8':
+        converter.representative_dataset = representative_dataset
+        # Integer-only kernels; float tensors remain only at the model's edges
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    # Written aside and only moved into place once it passes the agreement check
+    candidate_path = f"{tflite_path}.candidate"
+    with open(candidate_path, 'wb') as f:
+        f.write(converter.convert())
+
+    quantized = Int8Model(candidate_path)
+    float_probs = model.predict(evaluation, batch_size=batch_size, verbose=0).flatten()
+    int8_probs = quantized.predict(evaluation, batch_size=batch_size).flatten()
+    diff = np.abs(int8_probs.astype(np.float64) - float_probs)
+    float_flags = float_probs > threshold
+    int8_flags = int8_probs > threshold
+
+    report = {
+        'model': os.path.basename(tflite_path),
+        'activations': activations,
+        'calibration_rows': calibration_rows,
+        'evaluation_rows': len(float_probs),
+        'threshold': threshold,
+        'probability_abs_diff': {
+            'max': float(diff.max()),
+            'mean': float(diff.mean()),
+            'p99': float(np.percentile(diff, 99)),
+        },
+        'flag_agreement': float(np.mean(float_flags == int8_flags)),
+        'flags_flipped_to_suspect': int(np.sum(int8_flags & ~float_flags)),
+        'flags_flipped_to_clear': int(np.sum(float_flags & ~int8_flags)),
+        'suspects_float': int(float_flags.sum()),
+        'suspects_int8': int(int8_flags.sum()),
+        'rows_per_second': {
+            'keras': _throughput(model, evaluation, batch_size),
+            'int8': _throughput(quantized, evaluation, batch_size),
+        },
+        'size_bytes': {
+            'keras_h5': os.path.getsize(registry.path(registry.model_file)),
+            'int8_tflite': os.path.getsize(candidate_path),
+        },
+        'min_agreement': min_agreement,
+    }
+    report['installed'] = report['flag_agreement'] >= min_agreement
+    if report['installed']:
+        os.replace(candidate_path, tflite_path)
+    else:
+        os.remove(candidate_path)
+    with open(f"{tflite_path}.report.json", 'w') as f:
+        json.dump(report, f, indent=2)
+    if not report['installed']:
+        raise ValueError(f"int8 model agrees with the float model on {report['flag_agreement']:.2%} of flags, "
+                         f"below the required {min_agreement:.2%}; not installed (see {tflite_path}.report.json)")
+    return report
+
+def format_report(report):
+    diff = report['probability_abs_diff']
+    rates = report['rows_per_second']
+    sizes = report['size_bytes']
+    return "\n".join([
+        f"{report['activations']} activations, calibrated on {report['calibration_rows']:,} rows, "
+        f"evaluated on {report['evaluation_rows']:,}",
+        f"|p_int8 - p_float|: max {diff['max']:.4f}, mean {diff['mean']:.5f}, p99 {diff['p99']:.4f}",
+        f"Suspect flags at {report['threshold']}: {report['flag_agreement']:.4%} agree "
+        f"({report['flags_flipped_to_suspect']} flipped to suspect, {report['flags_flipped_to_clear']} to clear; "
+        f"{report['suspects_float']} -> {report['suspects_int8']} suspects)",
+        f"Throughput: keras {rates['keras']:,.0f} rows/s, int8 {rates['int8']:,.0f} rows/s "
+        f"({rates['int8'] / rates['keras']:.1f}x)",
+        f"Size: {sizes['keras_h5'] / 1024:,.0f} KB h5 -> {sizes['int8_tflite'] / 1024:,.0f} KB tflite",
+    ])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export an int8 TFLite model calibrated on real exports")
+    parser.add_argument("inputs", nargs="+", help="CSV/Parquet/Arrow exports to draw calibration and evaluation rows from")
+    parser.add_argument("-o", "--output", help="Destination .tflite (default: next to the model)")
+    parser.add_argument("--calibration-rows", type=int, default=DEFAULT_CALIBRATION_ROWS,
+                        help="Rows used to calibrate --activations int8")
+    parser.add_argument("--evaluation-rows", type=int, default=DEFAULT_EVALUATION_ROWS)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--activations", choices=ACTIVATION_MODES, default="dynamic",
+                        help="Quantize activations per batch at run time, or to calibrated int8 ranges")
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="Minimum share of suspect flags matching the float model to install the model")
+    args = parser.parse_args(argv)
+    try:
+        report = export_int8(args.inputs, args.output, args.calibration_rows, args.evaluation_rows,
+                             args.threshold, seed=args.seed, activations=args.activations,
+                             min_agreement=args.min_agreement)
+    except ValueError as e:
+        parser.exit(1, f"Error: {e}\n")
+    print(format_report(report), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Projected input readers. Scoring needs only SKU, DESCRIPTION, the four
+dimension/weight columns and the categorical columns, so every reader asks
+for just those: CSV via usecols with explicit dtypes, Parquet and Arrow IPC
+(Feather v2) via column projection in pyarrow. The dimension and weight
+columns are found under any alias the feature registry declares for them
+('Carton Length' as well as 'Length') and renamed to their scoring names
+here, so everything downstream sees one set of names. Frames from every
+format come back with category dtype categoricals; dimension and weight
+columns are left as parsed, so a stray non-numeric cell reaches
+validation.validate_frame (which casts them to float32 and quarantines bad
+rows) instead of failing the whole read.
+"""
+import os
+
+import pandas as pd
+
+from artifacts import registry
+from features import FEATURES
+
+ID_COLS = ['SKU', 'DESCRIPTION']
+# Raw measurements the feature registry is computed from, under their scoring names
+DIMENSION_COLS = list(FEATURES.sources)
+# Every name a raw measurement may have in an export
+SOURCE_ALIASES = {alias for source in DIMENSION_COLS for alias in FEATURES.aliases[source]}
+
+INPUT_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+def input_format_for(path):
+    return INPUT_FORMATS.get(os.path.splitext(str(path))[1].lower(), 'csv')
+
+def required_columns(artifacts=registry):
+    return ID_COLS + DIMENSION_COLS + artifacts.categorical_cols
+
+def input_dtypes(artifacts=registry):
+    # Categorical columns parse to category dtype, so the encoders only ever
+    # look up each file's distinct values. Dimensions are not forced to a
+    # dtype: clean columns parse as floats, and the float32 cast happens in
+    # validation, where unparseable cells become reject reasons
+    return {col: 'category' for col in artifacts.categorical_cols}
+
+def column_map(columns, artifacts=registry, extra_columns=(), optional_columns=()):
+    """
+    {file column: scoring name} for the columns scoring reads from a file
+    with these columns: the feature sources under whichever alias the file
+    uses, then the identifiers, categoricals and extra columns as named.
+    Columns in optional_columns may be absent; anything else missing raises
+    ValueError.
+    """
+    present = set(columns)
+    try:
+        mapping = {found: source for source, found in FEATURES.resolve(present).items()}
+    except KeyError as e:
+        raise ValueError(e.args[0]) from None
+    others = [col for col in ID_COLS + artifacts.categorical_cols + list(extra_columns) if col not in DIMENSION_COLS]
+    missing = [col for col in others if col not in present and col not in optional_columns]
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+    mapping.update((col, col) for col in others if col in present)
+    return mapping
+
+def csv_options(artifacts=registry, extra_columns=(), optional_columns=()):
+    # usecols as a predicate, so the file's header decides which alias is read
+    # (and a buffer needn't be read twice); column_map then checks and renames
+    wanted = SOURCE_ALIASES.union(ID_COLS, artifacts.categorical_cols, extra_columns, optional_columns)
+    return {'usecols': wanted.__contains__, 'dtype': input_dtypes(artifacts)}
+
+def normalize_frame(df, artifacts=registry):
+    # Arrow hands back whatever the file stored; match the CSV reader's dtypes
+    return df.astype(input_dtypes(artifacts))
+
+def scoring_frame(df, mapping):
+    # Keep the mapped columns (a file may carry two aliases of one source) under their scoring names
+    if len(mapping) < len(df.columns):
+        df = df.drop(columns=[col for col in df.columns if col not in mapping])
+    df.columns = [mapping[col] for col in df.columns]
+    return df
+
+def read_csv_frame(source, artifacts=registry, extra_columns=(), optional_columns=()):
+    """
+    Read the scoring columns of CSV text (a path or a file object) into a
+    frame with scoring names.
+    """
+    df = pd.read_csv(source, **csv_options(artifacts, extra_columns, optional_columns))
+    return scoring_frame(df, column_map(df.columns, artifacts, extra_columns, optional_columns))
+
+def arrow_frame(table, artifacts=registry, extra_columns=(), optional_columns=()):
+    # A pyarrow Table (or one already projected with column_map) as a frame with scoring names
+    mapping = column_map(table.schema.names, artifacts, extra_columns, optional_columns)
+    df = scoring_frame(table.select(list(mapping)).to_pandas(), mapping)
+    return normalize_frame(df, artifacts)
+
+def _arrow_dataset(path, input_format):
+    import pyarrow.dataset as ds
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return ds.dataset(path, format='parquet' if input_format == 'parquet' else 'ipc')
+
+def input_columns(path):
+    # Column names present in a file, without reading its rows
+    input_format = input_format_for(path)
+    if input_format == 'csv':
+        return list(pd.read_csv(path, nrows=0).columns)
+    return list(_arrow_dataset(path, input_format).schema.names)
+
+def read_input(path, artifacts=registry, extra_columns=(), optional_columns=(), input_format=None):
+    """
+    Read the scoring columns of a CSV, Parquet or Arrow IPC file into one
+    frame. extra_columns are read too (with whatever dtype the file gives
+    them); optional_columns are read when present. input_format defaults to
+    the one the file extension names; CSV may also come as a file object.
+    """
+    input_format = input_format or input_format_for(path)
+    if input_format == 'csv':
+        return read_csv_frame(path, artifacts, extra_columns, optional_columns)
+    dataset = _arrow_dataset(path, input_format)
+    mapping = column_map(dataset.schema.names, artifacts, extra_columns, optional_columns)
+    return arrow_frame(dataset.to_table(columns=list(mapping)), artifacts, extra_columns, optional_columns)
+
+def iter_input(path, chunk_size, artifacts=registry, extra_columns=(), optional_columns=()):
+    """
+    Yield the scoring columns of a CSV, Parquet or Arrow IPC file in frames of
+    at most chunk_size rows.
+    """
+    input_format = input_format_for(path)
+    if input_format == 'csv':
+        with pd.read_csv(path, chunksize=chunk_size,
+                         **csv_options(artifacts, extra_columns, optional_columns)) as reader:
+            mapping = None
+            for chunk in reader:
+                if mapping is None:
+                    mapping = column_map(chunk.columns, artifacts, extra_columns, optional_columns)
+                yield scoring_frame(chunk, mapping)
+        return
+    dataset = _arrow_dataset(path, input_format)
+    mapping = column_map(dataset.schema.names, artifacts, extra_columns, optional_columns)
+    start = 0
+    for batch in dataset.to_batches(columns=list(mapping), batch_size=chunk_size):
+        if batch.num_rows:
+            frame = normalize_frame(scoring_frame(batch.to_pandas(), mapping), artifacts)
+            # Row positions continue across batches, as the CSV reader's do
+            frame.index = pd.RangeIndex(start, start + len(frame))
+            start += len(frame)
+            yield frame
@@ -0,0 +1,197 @@
+"""
+Compact in-memory form of scored results for multi-million-row files.
+
+A results DataFrame holds SKU and DESCRIPTION as Python string objects
+(~60-80 bytes a row each), Suspect as int64 and a Probability column, and
+the GUI used to add a formatted string per row on top. ScoredCartons keeps
+the same four columns as:
+
+- SKU: int64 when the SKUs are numeric, else an Arrow-backed string array
+- DESCRIPTION: dictionary-encoded (pd.Categorical, categories sorted so code
+  order is text order)
+- Probability: float32
+- Suspect: a bit-packed mask (np.packbits), one bit a row
+
+Display strings are produced only for the rows a view asks for
+(ProbabilityText). from_pandas()/to_pandas() convert in both directions.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+RESULT_COLUMNS = ['SKU', 'DESCRIPTION', 'Suspect', 'Probability']
+
+def format_probabilities(probabilities):
+    # Vectorized equivalent of f"{p*100:.2f}%" over an array
+    return np.char.mod('%.2f%%', np.asarray(probabilities, dtype=np.float64) * 100)
+
+class ProbabilityText:
+    """
+    Lazily formatted "12.34%" strings over a probability array. Indexing with
+    an int formats one value; a slice or index array gives another
+    ProbabilityText over that selection without formatting anything.
+    """
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def __getitem__(self, rows):
+        if isinstance(rows, (int, np.integer)):
+            return str(format_probabilities(self.probabilities[[rows]])[0])
+        return ProbabilityText(self.probabilities[rows])
+
+    def to_numpy(self):
+        return format_probabilities(self.probabilities)
+
+def _take_bits(bits, rows, count):
+    """
+    Bit-packed suspect mask of the selected rows, touching only those rows'
+    bytes: a slice starting on a byte boundary is a view (bits past its end
+    are ignored, since unpacking is always bounded by the row count), other
+    slices unpack just their own bytes, and positions are read bit by bit.
+    """
+    if isinstance(rows, slice):
+        start, stop, step = rows.indices(count)
+        if step == 1:
+            stop = max(start, stop)
+            first, last = start // 8, -(-stop // 8)
+            if start % 8 == 0:
+                return bits[first:last]
+            return np.packbits(np.unpackbits(bits[first:last])[start % 8:start % 8 + stop - start])
+        rows = np.arange(start, stop, step)
+    rows = np.asarray(rows, dtype=np.intp)
+    return np.packbits((bits[rows >> 3] >> (7 - (rows & 7))) & 1)
+
+class ScoredCartons:
+    """
+    Scored results with compact column storage; see the module docstring.
+    Build with from_pandas() or concat(), select rows with take().
+    """
+    columns = RESULT_COLUMNS
+
+    def __init__(self, sku, description, probability, suspect_bits, rows):
+        self.sku = sku
+        self.description = description
+        self.probability = probability
+        self.suspect_bits = suspect_bits
+        self._rows = rows
+        self.attrs = {}
+
+    @staticmethod
+    def _compact_sku(values):
+        values = pd.Series(values)
+        if pd.api.types.is_integer_dtype(values.dtype):
+            return values.to_numpy(dtype=np.int64)
+        if not pd.api.types.is_string_dtype(values.dtype) or values.dtype == object:
+            # Mixed or non-string SKUs are kept as their text; missing ones stay missing
+            missing = values.isna()
+            values = values.astype(object).astype(str).where(~missing, None)
+        return pd.array(values, dtype='string[pyarrow]')
+
+    @classmethod
+    def from_pandas(cls, df):
+        # Suspect is taken as given, so any threshold the frame was scored at is kept
+        description = pd.Categorical(df['DESCRIPTION'])
+        description = description.reorder_categories(sorted(description.categories, key=str))
+        cartons = cls(
+            sku=cls._compact_sku(df['SKU']),
+            description=description,
+            probability=df['Probability'].to_numpy(dtype=np.float32),
+            suspect_bits=np.packbits(df['Suspect'].to_numpy() == 1),
+            rows=len(df),
+        )
+        cartons.attrs.update(df.attrs)
+        return cartons
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.from_pandas(pd.DataFrame(columns=RESULT_COLUMNS))
+        if len(parts) == 1:
+            return parts[0]
+        skus = [part.sku for part in parts]
+        if all(isinstance(sku, np.ndarray) for sku in skus):
+            sku = np.concatenate(skus)
+        else:
+            sku = cls._compact_sku(pd.concat([pd.Series(cls._compact_sku(s)) for s in skus], ignore_index=True))
+        description = union_categoricals([part.description for part in parts], sort_categories=True)
+        return cls(
+            sku=sku,
+            description=description,
+            probability=np.concatenate([part.probability for part in parts]),
+            suspect_bits=np.packbits(np.concatenate([part.suspect for part in parts])),
+            rows=sum(len(part) for part in parts),
+        )
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def suspect(self):
+        return np.unpackbits(self.suspect_bits, count=self._rows).view(bool)
+
+    def suspect_count(self):
+        return int(np.unpackbits(self.suspect_bits, count=self._rows).sum())
+
+    def take(self, rows):
+        """
+        The selected rows (a slice or an array of positions) as a new
+        ScoredCartons; slices of the numeric columns are views.
+        """
+        probability = self.probability[rows]
+        return ScoredCartons(
+            sku=self.sku[rows],
+            description=self.description[rows],
+            probability=probability,
+            suspect_bits=_take_bits(self.suspect_bits, rows, self._rows),
+            rows=len(probability),
+        )
+
+    def column(self, name):
+        # Indexable per-row values for display; nothing is formatted up front
+        if name == 'SKU':
+            return self.sku
+        if name == 'DESCRIPTION':
+            return self.description
+        if name == 'Suspect':
+            return self.suspect.view(np.uint8)
+        if name == 'Probability':
+            return self.probability
+        raise KeyError(name)
+
+    def argsort(self, name):
+        # Stable ascending order of a column; descriptions sort by code since categories are sorted
+        if name == 'DESCRIPTION':
+            return np.argsort(self.description.codes, kind='stable')
+        if name == 'SKU' and not isinstance(self.sku, np.ndarray):
+            return np.asarray(self.sku.argsort(kind='stable'))
+        return np.argsort(self.column(name), kind='stable')
+
+    def probability_text(self):
+        return ProbabilityText(self.probability)
+
+    @property
+    def nbytes(self):
+        sku = self.sku.nbytes
+        description = self.description.codes.nbytes + int(
+            pd.Series(self.description.categories).memory_usage(deep=True, index=False))
+        return sku + description + self.probability.nbytes + self.suspect_bits.nbytes
+
+    def to_pandas(self, compact=False):
+        """
+        A results DataFrame. By default it has the usual dtypes (object
+        strings, int Suspect); compact=True keeps category/Arrow-string
+        columns and a bool Suspect, which is far smaller and writes to Parquet
+        as dictionary-encoded columns.
+        """
+        suspect = self.suspect
+        if compact:
+            return pd.DataFrame({'SKU': self.sku, 'DESCRIPTION': self.description,
+                                 'Suspect': suspect, 'Probability': self.probability})
+        sku = self.sku if isinstance(self.sku, np.ndarray) else self.sku.to_numpy(dtype=object, na_value=None)
+        return pd.DataFrame({'SKU': sku, 'DESCRIPTION': np.asarray(self.description, dtype=object),
+                             'Suspect': suspect.astype(np.int64), 'Probability': self.probability})
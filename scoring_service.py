@@ -0,0 +1,348 @@
+"""
+Long-lived local HTTP scoring service. The model, label encoders and scaler
+stay resident, and concurrent requests are coalesced into micro-batches so
+one vectorized predict serves many cartons.
+
+    python scoring_service.py --port 8765 --max-latency-ms 5
+
+    POST /score   {"Length": 300, "Width": 200, "Height": 150, "Weight": 2500, "SKU": "123"}
+                  [{...}, {...}]  or  {"records": [{...}], "threshold": 0.7}
+                  (dimensions and weight also as "Carton Length", ... like the training exports)
+    GET  /stats   request count, p50/p99 latency (ms), rows/s, batch sizes
+    GET  /health
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from artifacts import BACKENDS, registry
+from features import FEATURES, numerical_cols
+from model import predictor_inputs
+from readers import DIMENSION_COLS
+from validation import check_sources
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_LATENCY_MS = 5.0
+DEFAULT_MAX_BATCH_ROWS = 4096
+MAX_BODY_BYTES = 64 * 1024 ** 2
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class LatencyStats:
+    """
+    Rolling window of the last `window` requests: end-to-end latency and rows,
+    plus totals since start.
+    """
+
+    def __init__(self, window=10_000):
+        self.started = time.perf_counter()
+        self.samples = deque(maxlen=window)
+        self.batch_rows = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record_request(self, seconds, rows):
+        self.samples.append((time.perf_counter(), seconds, rows))
+        self.requests += 1
+        self.rows += rows
+
+    def record_batch(self, rows):
+        self.batch_rows.append(rows)
+        self.batches += 1
+
+    def snapshot(self):
+        stats = {
+            'requests': self.requests,
+            'rows': self.rows,
+            'batches': self.batches,
+            'uptime_seconds': round(time.perf_counter() - self.started, 3),
+        }
+        if self.samples:
+            finished, latency, rows = (np.array(column) for column in zip(*self.samples))
+            span = finished[-1] - (finished[0] - latency[0])
+            stats.update({
+                'p50_ms': round(float(np.percentile(latency, 50)) * 1000, 3),
+                'p99_ms': round(float(np.percentile(latency, 99)) * 1000, 3),
+                'rows_per_second': round(float(rows.sum() / span), 1) if span > 0 else None,
+                'requests_per_second': round(len(latency) / span, 1) if span > 0 else None,
+            })
+        if self.batch_rows:
+            stats['mean_batch_rows'] = round(float(np.mean(self.batch_rows)), 1)
+            stats['max_batch_rows'] = int(np.max(self.batch_rows))
+        return stats
+
+class MicroBatcher:
+    """
+    Queue of pending frames. The first frame to arrive opens a batch that
+    stays open for at most max_latency seconds (or until max_batch_rows rows
+    are waiting); the batch is then scored with one predict call on a worker
+    thread, and each caller gets back its own slice of the probabilities.
+    """
+
+    def __init__(self, predict, max_latency=DEFAULT_MAX_LATENCY_MS / 1000,
+                 max_batch_rows=DEFAULT_MAX_BATCH_ROWS, stats=None):
+        self.predict = predict
+        self.max_latency = max_latency
+        self.max_batch_rows = max_batch_rows
+        self.stats = stats
+        self._queue = asyncio.Queue()
+        # A single thread: predict calls never overlap, and the event loop
+        # keeps accepting requests (and filling the next batch) meanwhile
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, frame):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = loop.time() + self.max_latency
+        while rows < self.max_batch_rows:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            frames = [frame for frame, _ in batch]
+            try:
+                probs = await loop.run_in_executor(
+                    self._executor, self.predict, pd.concat(frames, ignore_index=True))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if self.stats is not None:
+                self.stats.record_batch(len(probs))
+            offsets = np.cumsum([0] + [len(frame) for frame in frames])
+            for (_, future), start, end in zip(batch, offsets[:-1], offsets[1:]):
+                if not future.done():  # the client may have gone away
+                    future.set_result(probs[start:end])
+
+def records_frame(payload, required_columns):
+    # Accept one record, a list of records, or {"records": [...], "threshold": t}
+    threshold = None
+    if isinstance(payload, dict) and 'records' in payload:
+        threshold = payload.get('threshold')
+        payload = payload['records']
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not payload or not all(isinstance(r, dict) for r in payload):
+        raise RequestError(400, "Expected a record object or a non-empty list of records")
+    # bool is an int subclass, but true/false is not a threshold or a dimension
+    if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))):
+        raise RequestError(400, "threshold must be a number")
+
+    # Built column by column: DataFrame.from_records costs milliseconds per
+    # request, which at one carton per request dwarfs the predict itself
+    # Dimensions and weight may use any alias the feature registry declares ('Carton Length', ...)
+    try:
+        fields = FEATURES.resolve(set().union(*payload))
+    except KeyError as e:
+        raise RequestError(400, e.args[0])
+    missing = [fields.get(col, col) for col in required_columns
+               if any(fields.get(col, col) not in record for record in payload)]
+    if missing:
+        raise RequestError(400, f"Missing fields: {', '.join(missing)}")
+    columns = {}
+    for col in DIMENSION_COLS:
+        field = fields[col]
+        if any(isinstance(record[field], bool) for record in payload):
+            raise RequestError(400, f"Dimensions and weight must be numeric: {field} is a boolean")
+        try:
+            columns[col] = np.array([record[field] for record in payload], dtype=np.float64)
+        except (ValueError, TypeError) as e:
+            raise RequestError(400, f"Dimensions and weight must be numeric: {e}")
+        if np.isnan(columns[col]).any():
+            raise RequestError(400, "Dimensions and weight must not be null")
+    # Same rules as batch scoring (positive dimensions, finite features), and the same float32 values
+    coerced, rejected, reasons = check_sources(columns)
+    if rejected.any():
+        invalid = '; '.join(f"record {row}: {reason}" for row, reason in zip(np.flatnonzero(rejected), reasons))
+        raise RequestError(400, f"Invalid records: {invalid}")
+    columns.update(coerced)
+    for col in required_columns[len(DIMENSION_COLS):]:
+        columns[col] = [record[col] for record in payload]
+    identifiers = {col: [record.get(col) for record in payload]
+                   for col in ('SKU', 'DESCRIPTION') if any(col in record for record in payload)}
+    return pd.DataFrame(columns), identifiers, threshold
+
+class ScoringService:
+    """
+    HTTP/1.1 front end (keep-alive, JSON bodies) over a MicroBatcher.
+    """
+
+    def __init__(self, threshold=0.5, backend='keras', max_latency_ms=DEFAULT_MAX_LATENCY_MS, max_batch_rows=DEFAULT_MAX_BATCH_ROWS):
+        self.threshold = threshold
+        self.backend = backend
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(self._predict, max_latency_ms / 1000, max_batch_rows, self.stats)
+        self.required_columns = DIMENSION_COLS + registry.categorical_cols
+
+    def _predict(self, frame):
+        # Micro-batches are capped at max_batch_rows, so score each in a single
+        # call: predict() builds a tf.data pipeline per call, which costs ~100x
+        # more than the network itself at these sizes
+        predictor = registry.predictor(self.backend)
+        return np.asarray(predictor.predict_on_batch(predictor_inputs(frame, predictor))).flatten()
+
+    def warm(self):
+        # Load every artifact and run one predict so the first request doesn't
+        # pay for graph tracing
+        inputs = {col: np.zeros((1, 1), dtype=np.int64) for col in registry.categorical_cols}
+        inputs['numerical_input'] = np.zeros((1, len(numerical_cols)), dtype=np.float32)
+        registry.scaler
+        registry.predictor(self.backend).predict_on_batch(inputs)
+
+    async def score(self, payload):
+        frame, identifiers, threshold = records_frame(payload, self.required_columns)
+        probs = await self.batcher.submit(frame)
+        threshold = self.threshold if threshold is None else threshold
+        # Identifiers are echoed back as sent, null where a record omitted one
+        columns = {'Suspect': (probs > threshold).astype(int).tolist(), 'Probability': probs.tolist()}
+        columns.update(identifiers)
+        return {'results': [dict(zip(columns, values)) for values in zip(*columns.values())]}
+
+    async def route(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/score':
+            if method != 'POST':
+                raise RequestError(405, "Use POST")
+            try:
+                payload = json.loads(body)
+            except ValueError as e:
+                raise RequestError(400, f"Invalid JSON: {e}")
+            return await self.score(payload)
+        if path == '/stats' and method == 'GET':
+            return self.stats.snapshot()
+        if path == '/health' and method == 'GET':
+            return {'status': 'ok', 'backend': self.backend}
+        raise RequestError(404, f"No route for {method} {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                method, path, version = (request_line.split(' ', 2) + ['', ''])[:3]
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0) or 0)
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                rows = 0
+                if length > MAX_BODY_BYTES:
+                    status, response, keep_alive = 413, {'error': "Request body too large"}, False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        response = await self.route(method, path, body)
+                        status = 200
+                        rows = len(response.get('results', ()))
+                    except RequestError as e:
+                        status, response = e.status, {'error': str(e)}
+                    except Exception as e:
+                        status, response = 500, {'error': str(e)}
+
+                data = json.dumps(response, default=str).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if rows:
+                    self.stats.record_request(time.perf_counter() - start, rows)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.warm()
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Scoring service listening on http://{host}:{port} (backend {self.backend})", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.close()
+
+def parse_args(argv=None):
+    """
+    Parse command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Serve suspect scores over HTTP with request micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threshold", type=float, default=0.5, help="Default suspect probability cutoff")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras")
+    parser.add_argument("--max-latency-ms", type=float, default=DEFAULT_MAX_LATENCY_MS,
+                        help="Longest a request waits for others to join its micro-batch")
+    parser.add_argument("--max-batch-rows", type=int, default=DEFAULT_MAX_BATCH_ROWS,
+                        help="Rows at which a micro-batch is scored without waiting further")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = ScoringService(args.threshold, args.backend, args.max_latency_ms, args.max_batch_rows)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print(json.dumps(service.stats.snapshot()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
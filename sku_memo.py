@@ -0,0 +1,125 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from artifacts import registry
+from prediction_cache import DEFAULT_CACHE_DIR, artifact_fingerprint
+from readers import DIMENSION_COLS
+
+# Kept out of the prediction cache's own directory, whose eviction removes
+# every Parquet file it doesn't recognise
+DEFAULT_STORE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'score_store')
+
+def model_key_columns(artifacts=registry):
+    # Everything the network sees for a row; rows equal on these score the same
+    return DIMENSION_COLS + artifacts.categorical_cols
+
+class ScoreStore:
+    """
+    Persistent map from a model input tuple (dimensions, weight and
+    categorical values) to its probability, kept in one Parquet file per
+    backend and artifact fingerprint (which covers the feature code) so a
+    retrained model, changed features or another backend never reuse
+    these scores. The
+    measured scoring cost per row is kept with it (in the Parquet attrs) so
+    runs served entirely from the store can still report time saved.
+    """
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, artifacts=registry, backend='keras'):
+        self.artifacts = artifacts
+        self.backend = backend
+        self.key_columns = model_key_columns(artifacts)
+        self.path = os.path.join(store_dir, f"score_store-{backend}-{artifact_fingerprint(artifacts, backend)}.parquet")
+        self._pending = []
+        if os.path.exists(self.path):
+            self.table = pd.read_parquet(self.path)
+        else:
+            self.table = pd.DataFrame(columns=self.key_columns + ['Probability'])
+        self.seconds_per_row = self.table.attrs.get('seconds_per_row')
+
+    def __len__(self):
+        return len(self.table) + sum(len(frame) for frame in self._pending)
+
+    def lookup(self, keys):
+        # Probability for each row of keys, NaN where the tuple hasn't been scored
+        self._flush_pending()
+        if self.table.empty:
+            return np.full(len(keys), np.nan, dtype=np.float32)
+        merged = keys.merge(self.table, on=self.key_columns, how='left')
+        return merged['Probability'].to_numpy(dtype=np.float32)
+
+    def add(self, keys, probabilities):
+        frame = keys.reset_index(drop=True).copy()
+        frame['Probability'] = probabilities
+        self._pending.append(frame)
+
+    def record_cost(self, seconds, rows):
+        if rows:
+            self.seconds_per_row = seconds / rows
+
+    def _flush_pending(self):
+        if self._pending:
+            frames = [self.table] if not self.table.empty else []
+            self.table = pd.concat(frames + self._pending, ignore_index=True)
+            self.table = self.table.drop_duplicates(self.key_columns, keep='last')
+            self._pending = []
+
+    def save(self):
+        self._flush_pending()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        self.table.attrs['seconds_per_row'] = self.seconds_per_row
+        self.table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+
+def predict_deduplicated(df, predict, store=None, artifacts=registry):
+    """
+    Score only the distinct model input tuples in df (and, with a store, only
+    the ones never scored before), then scatter the probabilities back to every
+    row. predict takes a frame of unique rows and returns their probabilities.
+    Returns (probabilities, stats).
+    """
+    key_columns = model_key_columns(artifacts)
+    keys = df[key_columns].astype({col: np.float64 for col in DIMENSION_COLS})
+
+    codes = keys.groupby(key_columns, sort=False, dropna=False).ngroup().to_numpy()
+    first_rows = np.unique(codes, return_index=True)[1]
+    unique_keys = keys.iloc[first_rows].reset_index(drop=True)
+
+    if store is not None:
+        unique_probs = store.lookup(unique_keys)
+    else:
+        unique_probs = np.full(len(unique_keys), np.nan, dtype=np.float32)
+    missing = np.flatnonzero(np.isnan(unique_probs))
+
+    start = time.perf_counter()
+    if len(missing):
+        unique_probs[missing] = predict(df.iloc[first_rows[missing]].reset_index(drop=True))
+    seconds = time.perf_counter() - start
+    if store is not None and len(missing):
+        store.add(unique_keys.iloc[missing], unique_probs[missing])
+        store.record_cost(seconds, len(missing))
+
+    rows = len(df)
+    if len(missing):
+        per_row = seconds / len(missing)
+    else:
+        per_row = (store.seconds_per_row if store is not None else None) or 0.0
+    stats = {
+        'rows': rows,
+        'unique': len(unique_keys),
+        'store_hits': len(unique_keys) - len(missing),
+        'scored': len(missing),
+        'dedup_ratio': rows / len(unique_keys) if len(unique_keys) else 1.0,
+        'predict_seconds': seconds,
+        # Estimated from the measured cost of the rows that were scored
+        'seconds_saved': per_row * (rows - len(missing)),
+    }
+    return unique_probs[codes], stats
+
+def format_stats(stats):
+    return (f"Deduplicated {stats['rows']:,} rows to {stats['unique']:,} unique inputs "
+            f"(ratio {stats['dedup_ratio']:.1f}x); {stats['store_hits']:,} from score store, "
+            f"{stats['scored']:,} scored; ~{stats['seconds_saved']:.2f}s saved")
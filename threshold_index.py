@@ -0,0 +1,80 @@
+import numpy as np
+
+from scored_cartons import ScoredCartons, format_probabilities
+
+class ThresholdIndex:
+    """
+    Scored results (a ScoredCartons, or a results DataFrame which is
+    converted) held in descending probability order with suspect prefix
+    counts precomputed, so filtering at any threshold is a binary search plus
+    a slice of the sorted results. Probability display strings are formatted
+    lazily, only for the rows a view shows.
+    """
+
+    def __init__(self, results):
+        if not isinstance(results, ScoredCartons):
+            results = ScoredCartons.from_pandas(results)
+        # Stable descending sort; NaN probabilities sort last and never pass a threshold
+        order = np.argsort(-results.probability, kind='stable')
+        self.results = results.take(order)
+
+        probability = self.results.probability
+        self._valid = int(np.count_nonzero(~np.isnan(probability)))
+        # Searched in float64 so cutoffs match `Probability >= threshold` exactly
+        self._ascending = probability[:self._valid][::-1].astype(np.float64)
+
+        suspect = self.results.suspect
+        self._suspect_prefix = np.concatenate(([0], np.cumsum(suspect)))
+        self._suspect_total = int(self._suspect_prefix[-1])
+        # Suspect is derived from probability, so suspects normally form a prefix
+        # of the sorted rows; fall back to a mask if that ever isn't the case
+        self._suspects_leading = bool(suspect[:self._suspect_total].all())
+        self._suspect = suspect
+
+        self.probability_text = self.results.probability_text()
+        self._sort_orders = {}
+
+    def __len__(self):
+        return len(self.results)
+
+    def cutoff(self, threshold):
+        # Number of rows with Probability >= threshold
+        return self._valid - int(np.searchsorted(self._ascending, threshold, side='left'))
+
+    def suspect_count(self, threshold):
+        return int(self._suspect_prefix[self.cutoff(threshold)])
+
+    def rows(self, threshold, suspects_only=False):
+        """
+        Positions in `results` passing the filters: a slice (zero-copy) in the
+        common case, an index array otherwise.
+        """
+        cut = self.cutoff(threshold)
+        if not suspects_only:
+            return slice(0, cut)
+        if self._suspects_leading:
+            return slice(0, min(cut, self._suspect_total))
+        return np.flatnonzero(self._suspect[:cut])
+
+    def select(self, threshold, suspects_only=False):
+        # Filtered results and their matching (lazy) probability display strings
+        rows = self.rows(threshold, suspects_only)
+        return self.results.take(rows), self.probability_text[rows]
+
+    def sorted_positions(self, rows, column, descending=False):
+        """
+        Order of the rows selected by `rows` (from rows()) when sorted by
+        column, as positions within that selection. The full argsort is
+        computed once per column; each selection then only costs a mask.
+        """
+        if column not in self._sort_orders:
+            self._sort_orders[column] = self.results.argsort(column)
+        order = self._sort_orders[column]
+        if descending:
+            order = order[::-1]
+        if isinstance(rows, slice):
+            # Selections are prefixes of the probability-sorted results
+            return order[order < rows.stop]
+        selected = np.zeros(len(self.results), dtype=bool)
+        selected[rows] = True
+        return np.searchsorted(rows, order[selected[order]])
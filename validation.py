@@ -0,0 +1,188 @@
+"""
+Input validation ahead of feature engineering. Exports occasionally carry
+non-numeric weights, blank or zero dimensions, and the like; fed through,
+a zero Width makes length_to_width infinite and a NaN reaches the scaler
+and the network. validate_frame() coerces Length/Width/Height/Weight to
+float32 and splits off the rows that can't be scored, each with a reason
+code, so a few bad rows cost nothing more than their own exclusion.
+
+Reason codes, reported per column as "<column>:<code>" (several joined by
+';'):
+
+- missing: empty cell
+- non_numeric: text that doesn't parse as a number
+- non_finite: inf, or a value beyond float32 range
+- non_positive: a dimension <= 0 (weights may be 0)
+- negative: a weight < 0
+- features:overflow: valid inputs whose engineered features overflow float32
+
+Rows inside SAFE_RANGE provably give finite features; only rows outside it
+(normally none) have their features computed to check. Every row that
+passes therefore yields finite model inputs.
+"""
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from features import engineer_frame_features
+from profiling import NULL_PROFILE
+from readers import DIMENSION_COLS
+
+# Lowest valid value per source: dimensions must be positive, weights non-negative
+MINIMUM = {'Length': 'positive', 'Width': 'positive', 'Height': 'positive', 'Weight': 'non_negative'}
+# Within these bounds (mm and g) every engineered feature is at most ~1e27
+SAFE_RANGE = {'positive': (1e-3, 1e6), 'non_negative': (0.0, 1e9)}
+
+REASONS = ['missing', 'non_numeric', 'non_finite', 'non_positive', 'negative']
+OVERFLOW_REASON = 'features:overflow'
+
+def coerce_numeric(values):
+    """
+    float32 values of a column plus a reason code per row (0 for valid
+    numbers, else 1 + an index into REASONS for missing/non_numeric/
+    non_finite). Numeric columns pass through with a cast.
+    """
+    values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    codes = np.zeros(len(values), dtype=np.uint8)
+    if values.dtype.kind in 'fiu':
+        coerced = values.astype(np.float32, copy=False)
+        missing = np.isnan(coerced)
+    else:
+        # Same coercion the training notebook applied to Carton Weight
+        missing = pd.isna(values)
+        coerced = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float32)
+        codes[np.isnan(coerced) & ~missing] = REASONS.index('non_numeric') + 1
+    codes[np.isinf(coerced)] = REASONS.index('non_finite') + 1
+    codes[missing] = REASONS.index('missing') + 1
+    return coerced, codes
+
+def _range_codes(values, minimum):
+    # Codes for finite values below the column's minimum
+    if minimum == 'positive':
+        return np.where(values <= 0, REASONS.index('non_positive') + 1, 0).astype(np.uint8)
+    return np.where(values < 0, REASONS.index('negative') + 1, 0).astype(np.uint8)
+
+def _reason_text(codes, rejected, extra=None):
+    labels = {col: np.array([''] + [f"{col}:{reason}" for reason in REASONS], dtype=object)[col_codes[rejected]]
+              for col, col_codes in codes.items()}
+    columns = list(labels.values()) + ([extra[rejected]] if extra is not None else [])
+    return [';'.join(filter(None, parts)) for parts in zip(*columns)]
+
+def check_sources(columns):
+    """
+    Validate the raw source columns (a mapping of DIMENSION_COLS to arrays or
+    Series). Returns the float32 values, a mask of rejected rows and the
+    reason text of each rejected row, in row order.
+    """
+    codes, coerced = {}, {}
+    for col in DIMENSION_COLS:
+        values, col_codes = coerce_numeric(columns[col])
+        col_codes = np.where(col_codes == 0, _range_codes(values, MINIMUM[col]), col_codes)
+        codes[col], coerced[col] = col_codes, values
+    rejected = np.zeros(len(coerced[DIMENSION_COLS[0]]), dtype=bool)
+    for col_codes in codes.values():
+        rejected |= col_codes != 0
+
+    # Valid rows outside the safe range get their features checked exactly
+    unsafe = np.zeros(len(rejected), dtype=bool)
+    for col in DIMENSION_COLS:
+        low, high = SAFE_RANGE[MINIMUM[col]]
+        unsafe |= (coerced[col] < low) | (coerced[col] > high)
+    unsafe &= ~rejected
+    overflow = None
+    if unsafe.any():
+        rows = np.flatnonzero(unsafe)
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            features = engineer_frame_features(pd.DataFrame({col: coerced[col][rows] for col in DIMENSION_COLS}))
+        overflowed = rows[~np.isfinite(features).all(axis=1)]
+        if len(overflowed):
+            overflow = np.full(len(rejected), '', dtype=object)
+            overflow[overflowed] = OVERFLOW_REASON
+            rejected[overflowed] = True
+    reasons = _reason_text(codes, rejected, overflow) if rejected.any() else []
+    return coerced, rejected, reasons
+
+def validate_frame(df, profile=NULL_PROFILE):
+    """
+    Split df into (valid, rejects). valid has float32 source columns
+    (assigned in place when every row passes, a filtered copy otherwise);
+    rejects holds the rejected rows as read, with their input position in
+    'row' (df's index) and the reason codes in 'reason'.
+    """
+    with profile.stage('validate', rows=len(df)):
+        coerced, rejected, reasons = check_sources(df)
+        # Rejected rows are reported with their cells as read, so taken before coercion
+        if reasons:
+            rejects = df.iloc[np.flatnonzero(rejected)].copy()
+            rejects['reason'] = reasons
+            rejects = rejects.reset_index(names='row')
+        else:
+            rejects = pd.DataFrame(columns=['row', *df.columns, 'reason'])
+        for col in DIMENSION_COLS:
+            if df[col].dtype != np.float32:
+                df[col] = coerced[col]
+        # take() rather than a boolean mask, so later column assignments don't warn about a copy
+        return (df.take(np.flatnonzero(~rejected)) if reasons else df), rejects
+
+class Quarantine:
+    """
+    Collects rows rejected by validation. With a path, each batch is
+    appended there as CSV (header written when the file is new; replace=True
+    first removes a file left by an earlier run); without one they are kept
+    in memory (frame()). source, when given, fills a Source column naming
+    the input the rows came from; row_offset is added to each 'row', for
+    rows read from a later piece of that input.
+    """
+
+    def __init__(self, path=None, source=None, replace=False, row_offset=0):
+        if path is not None and replace and os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.source = source
+        self.row_offset = row_offset
+        self.rows = 0
+        self.reasons = Counter()
+        self._frames = []
+
+    def add(self, rejects):
+        if not len(rejects):
+            return
+        self.rows += len(rejects)
+        self.reasons.update(count_reasons(rejects['reason']))
+        if self.row_offset:
+            rejects = rejects.assign(row=rejects['row'] + self.row_offset)
+        if self.source is not None:
+            rejects = rejects.assign(Source=self.source)
+        if self.path is None:
+            self._frames.append(rejects)
+        else:
+            rejects.to_csv(self.path, mode='a', header=not os.path.exists(self.path), index=False)
+
+    def frame(self):
+        if not self._frames:
+            return pd.DataFrame(columns=['row', 'reason'])
+        return pd.concat(self._frames, ignore_index=True)
+
+    def summary(self):
+        destination = f" -> {self.path}" if self.path else ""
+        return f"Quarantined {self.rows:,} invalid rows ({format_reasons(self.reasons)}){destination}"
+
+def count_reasons(reasons):
+    counts = Counter()
+    for reason in reasons:
+        counts.update(reason.split(';'))
+    return counts
+
+def format_reasons(counts):
+    return ', '.join(f"{reason} {count:,}" for reason, count in counts.most_common())
+
+def report_rejects(rejects, quarantine=None):
+    # Rejected rows go to the quarantine when there is one, else they are only counted
+    if quarantine is not None:
+        quarantine.add(rejects)
+    elif len(rejects):
+        print(f"Skipped {len(rejects):,} invalid rows ({format_reasons(count_reasons(rejects['reason']))})",
+              file=sys.stderr)
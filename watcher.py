@@ -0,0 +1,373 @@
+"""
+Watch-folder ingestion daemon. Polls a directory for carton exports and
+scores what is new through model.score_frame, with the model loaded once
+for the life of the process:
+
+    python watcher.py /share/exports --output-dir /share/suspects --interval 10
+
+CSV files are tracked by byte offset, so a snapshot that keeps being
+appended to only has its new complete lines scored; Parquet and Arrow files
+are scored whole once they stop changing, and again if they are replaced.
+Each scored piece becomes a result shard <name>_suspects_<n>.<format> in the
+output directory, suspect rows are appended to suspects.csv, rows that
+fail input validation to rejects.csv (with their reason codes; 'row' is
+the data line in the whole file, counted from 0 after the header), and
+summary.json keeps rolling
+per-file and overall totals.
+
+A poller thread finds new work and a single scorer consumes it through a
+bounded queue: when scoring falls behind, the poller blocks instead of
+reading ahead. Offsets are saved after every shard in .watch_state.json, so
+a restart picks up where the last run stopped.
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from artifacts import BACKENDS, registry
+from model import OUTPUT_EXTENSIONS, score_frame, write_results
+from readers import INPUT_FORMATS, input_format_for, read_input
+from validation import Quarantine
+
+STATE_FILE = '.watch_state.json'
+SUMMARY_FILE = 'summary.json'
+SUSPECTS_FILE = 'suspects.csv'
+REJECTS_FILE = 'rejects.csv'
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_QUEUE_SIZE = 4
+# Largest CSV byte range scored as one shard; bounds memory on big appends
+DEFAULT_SHARD_BYTES = 64 * 1024 ** 2
+# Shards listed in summary.json's recent history
+RECENT_SHARDS = 50
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _first_line(path):
+    with open(path, 'rb') as f:
+        return f.readline()
+
+def _last_newline(f, start, end):
+    # Offset just past the last b'\n' in [start, end), or start if there is none
+    block = 1 << 16
+    position = end
+    while position > start:
+        read_from = max(start, position - block)
+        f.seek(read_from)
+        found = f.read(position - read_from).rfind(b'\n')
+        if found >= 0:
+            return read_from + found + 1
+        position = read_from
+    return start
+
+class FolderWatcher:
+    """
+    Polls watch_dir and scores new CSV lines and new or replaced Parquet/Arrow
+    files into shards under output_dir.
+    """
+
+    def __init__(self, watch_dir, output_dir, threshold=0.5, backend='keras', batch_size=512,
+                 output_format='csv', interval=DEFAULT_INTERVAL, queue_size=DEFAULT_QUEUE_SIZE,
+                 shard_bytes=DEFAULT_SHARD_BYTES):
+        self.watch_dir = watch_dir
+        self.output_dir = output_dir
+        self.threshold = threshold
+        self.backend = backend
+        self.batch_size = batch_size
+        self.output_format = output_format
+        self.interval = interval
+        self.shard_bytes = shard_bytes
+        self.work = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self.state = {'files': {}, 'recent': []}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        # Poller-side view of each file: how far it has been queued (an offset,
+        # or the signature of a whole file) and the identity it was queued under.
+        # Runs ahead of the committed state, which only the scorer touches.
+        self._queued = {path: (entry['offset'] if input_format_for(path) == 'csv' else entry['identity'],
+                               entry['identity'])
+                        for path, entry in self.state['files'].items()}
+        # Parquet/Arrow signatures from the previous poll, to wait until a file settles
+        self._last_seen = {}
+
+    def _entry(self, path):
+        return self.state['files'].setdefault(path, {
+            'offset': 0, 'lines': 0, 'identity': None, 'shards': 0, 'rows': 0, 'suspects': 0,
+            'errors': 0, 'rejected': 0, 'last_error': None, 'updated': None,
+        })
+
+    def candidates(self):
+        try:
+            names = sorted(os.listdir(self.watch_dir))
+        except FileNotFoundError:
+            return []
+        return [os.path.join(self.watch_dir, name) for name in names
+                if os.path.splitext(name)[1].lower() in INPUT_FORMATS and not name.startswith('.')]
+
+    def scan(self):
+        """
+        Yield (path, start, end, identity, replaced) work items for everything
+        new since the last queued offsets. end is None for a whole
+        Parquet/Arrow file.
+        """
+        for path in self.candidates():
+            try:
+                stat = os.stat(path)
+                if input_format_for(path) == 'csv':
+                    yield from self._scan_csv(path, stat)
+                else:
+                    yield from self._scan_whole(path, stat)
+            except FileNotFoundError:
+                continue  # removed between listing and reading
+
+    def _scan_csv(self, path, stat):
+        header = _first_line(path)
+        if not header.endswith(b'\n'):
+            return  # header still being written
+        identity = [stat.st_ino, hashlib.blake2b(header, digest_size=8).hexdigest()]
+        queued, queued_identity = self._queued.get(path, (0, None))
+        replaced = queued_identity is not None and (identity != queued_identity or stat.st_size < queued)
+        if replaced:
+            print(f"{path}: file was replaced; scoring it from the start", file=sys.stderr)
+            queued = 0
+
+        start = max(queued, len(header))
+        with open(path, 'rb') as f:
+            while start < stat.st_size:
+                # Only complete lines; a partially written last line waits for the next poll
+                end = _last_newline(f, start, min(stat.st_size, start + self.shard_bytes))
+                if end == start:
+                    end = _last_newline(f, start, stat.st_size)
+                    if end == start:
+                        break
+                self._queued[path] = (end, identity)
+                yield path, start, end, identity, replaced
+                replaced = False
+                start = end
+
+    def _scan_whole(self, path, stat):
+        identity = [stat.st_size, stat.st_mtime_ns]
+        previous, self._last_seen[path] = self._last_seen.get(path), identity
+        queued, _ = self._queued.get(path, (None, None))
+        if identity == queued or previous != identity:
+            return  # already scored, or still changing: wait until it is stable for a poll
+        self._queued[path] = (identity, identity)
+        yield path, 0, None, identity, queued is not None
+
+    def _read_piece(self, path, start, end):
+        # CSV byte ranges get the header prepended so they parse on their own
+        if end is None:
+            return path, 0
+        with open(path, 'rb') as f:
+            header = f.readline()
+            f.seek(start)
+            data = f.read(end - start)
+        return io.BytesIO(header + data), data.count(b'\n')
+
+    def _lines_before(self, path, entry, start, replaced):
+        # Data lines ahead of a CSV piece, so rejected rows keep their place in the
+        # whole file. Normally the running count saved with the offset; counted
+        # from the file when the state doesn't line up (e.g. an older state file).
+        if replaced or start <= len(_first_line(path)):
+            return 0
+        if entry['offset'] == start and 'lines' in entry:
+            return entry['lines']
+        lines = 0
+        with open(path, 'rb') as f:
+            f.readline()
+            remaining = start - f.tell()
+            for block in iter(lambda: f.read(min(1 << 20, remaining)), b''):
+                lines += block.count(b'\n')
+                remaining -= len(block)
+        return lines
+
+    def score(self, path, start, end, identity, replaced):
+        entry = self._entry(path)
+        began = time.perf_counter()
+        lines = None
+        try:
+            piece, piece_lines = self._read_piece(path, start, end)
+            before = self._lines_before(path, entry, start, replaced) if end is not None else 0
+            lines = before + piece_lines
+            quarantine = Quarantine(os.path.join(self.output_dir, REJECTS_FILE), source=os.path.basename(path),
+                                    row_offset=before)
+            # Read and scored directly: no per-piece progress output from the whole-file helpers or keras
+            df = read_input(piece, input_format=input_format_for(path))
+            results = score_frame(df, self.threshold, self.batch_size, verbose=0, backend=self.backend,
+                                  quarantine=quarantine)
+            entry['rejected'] = entry.get('rejected', 0) + quarantine.rows
+            if quarantine.rows:
+                print(f"{path}: {quarantine.summary()}", file=sys.stderr)
+        except Exception as e:
+            # Skip the piece rather than retrying it forever; it stays listed in the summary
+            entry['errors'] += 1
+            where = f"bytes {start}-{end}: " if end is not None else ""
+            entry['last_error'] = f"{_now()}: {where}{e}"
+            print(f"Error scoring '{path}': {e}", file=sys.stderr)
+            results = None
+
+        if results is not None and len(results):
+            entry['shards'] += 1
+            stem = os.path.splitext(os.path.basename(path))[0]
+            shard = os.path.join(self.output_dir, f"{stem}_suspects_{entry['shards']:05d}"
+                                                  f"{OUTPUT_EXTENSIONS[self.output_format]}")
+            self._write_shard(shard, results)
+            suspects = results[results['Suspect'] == 1]
+            self._append_suspects(path, suspects)
+            entry['rows'] += len(results)
+            entry['suspects'] += len(suspects)
+            self.state['recent'] = (self.state['recent'] + [{
+                'file': path, 'shard': os.path.basename(shard), 'rows': len(results),
+                'suspects': len(suspects), 'seconds': round(time.perf_counter() - began, 3), 'at': _now(),
+            }])[-RECENT_SHARDS:]
+            print(f"{path}: {len(results):,} {'replaced' if replaced else 'new'} rows, "
+                  f"{len(suspects):,} suspects -> {shard}", file=sys.stderr)
+
+        entry['offset'] = end if end is not None else 0
+        if lines is None:
+            entry.pop('lines', None)  # unknown after a failed read; recounted for the next piece
+        else:
+            entry['lines'] = lines
+        entry['identity'] = identity
+        entry['updated'] = _now()
+        self.save()
+
+    def _write_shard(self, shard, results):
+        # Written under a temporary name so anything reading the output directory
+        # never sees a half-written shard
+        tmp_path = f"{shard}.{uuid.uuid4().hex}.tmp"
+        try:
+            with ExitStack() as stack:
+                write_results(tmp_path, self.output_format, stack)(results)
+            os.replace(tmp_path, shard)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _append_suspects(self, path, suspects):
+        if not len(suspects):
+            return
+        out_path = os.path.join(self.output_dir, SUSPECTS_FILE)
+        rows = suspects.assign(Source=os.path.basename(path), Scored=_now())
+        rows.to_csv(out_path, mode='a', header=not os.path.exists(out_path), index=False)
+
+    def summary(self):
+        files = self.state['files']
+        return {
+            'updated': _now(),
+            'threshold': self.threshold,
+            'backend': self.backend,
+            'totals': {
+                'files': len(files),
+                'rows': sum(entry['rows'] for entry in files.values()),
+                'suspects': sum(entry['suspects'] for entry in files.values()),
+                'errors': sum(entry['errors'] for entry in files.values()),
+                'rejected': sum(entry.get('rejected', 0) for entry in files.values()),
+            },
+            'files': {path: {key: entry.get(key, 0) for key in ('rows', 'suspects', 'shards', 'errors', 'rejected',
+                                                                'last_error', 'updated')}
+                      for path, entry in files.items()},
+            'recent': self.state['recent'],
+        }
+
+    def save(self):
+        _write_json(self.state_path, self.state)
+        _write_json(os.path.join(self.output_dir, SUMMARY_FILE), self.summary())
+
+    def poll(self):
+        # Producer: blocks on the bounded queue when the scorer is behind
+        while not self.stop_event.is_set():
+            for item in self.scan():
+                while not self.stop_event.is_set():
+                    try:
+                        self.work.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if self.stop_event.is_set():
+                    return
+            self.stop_event.wait(self.interval)
+
+    def run(self, once=False):
+        """
+        Score until stop() (or SIGINT/SIGTERM from main()); with once=True,
+        score whatever is there now and return.
+        """
+        # Keep the model resident before the first file arrives
+        registry.scaler, registry.encoders, registry.predictor(self.backend)
+        print(f"Watching {self.watch_dir} every {self.interval:g}s -> {self.output_dir}", file=sys.stderr)
+        if once:
+            for item in self.scan():
+                self.score(*item)
+            # Parquet/Arrow files are only scored once seen unchanged on a second look
+            for item in self.scan():
+                self.score(*item)
+            self.save()
+            return
+
+        poller = threading.Thread(target=self.poll, name='watch-poller', daemon=True)
+        poller.start()
+        while not self.stop_event.is_set():
+            try:
+                item = self.work.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.score(*item)
+        poller.join()
+        self.save()
+
+    def stop(self):
+        self.stop_event.set()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously score carton exports dropped into a folder")
+    parser.add_argument("watch_dir", help="Directory to poll for CSV/Parquet/Arrow exports")
+    parser.add_argument("--output-dir", required=True, help="Where result shards, suspects.csv and summary.json go")
+    parser.add_argument("--format", choices=sorted(OUTPUT_EXTENSIONS), default='csv', help="Shard format")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Suspect probability cutoff")
+    parser.add_argument("--batch-size", type=int, default=512, help="Rows per model.predict batch")
+    parser.add_argument("--backend", choices=BACKENDS, default="keras", help="Inference engine")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Pieces found ahead of the scorer before polling blocks")
+    parser.add_argument("--shard-mb", type=float, default=DEFAULT_SHARD_BYTES / 1024 ** 2,
+                        help="Largest CSV append scored as one shard")
+    parser.add_argument("--once", action="store_true", help="Score what is there now and exit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    watcher = FolderWatcher(args.watch_dir, args.output_dir, args.threshold, args.backend, args.batch_size,
+                            args.format, args.interval, args.queue_size, int(args.shard_mb * 1024 ** 2))
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: watcher.stop())
+    watcher.run(once=args.once)
+
+if __name__ == "__main__":
+    main()